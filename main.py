@@ -28,11 +28,46 @@ def _configure_pi_mode():
         pass
     return False
 
+def _pop_option(name):
+    """Quita `name VALOR` de sys.argv y devuelve VALOR (None si no está)."""
+    if name not in sys.argv:
+        return None
+    i = sys.argv.index(name)
+    if i + 1 >= len(sys.argv):
+        print(f"{name} necesita un valor.")
+        sys.exit(2)
+    value = sys.argv[i + 1]
+    del sys.argv[i:i + 2]
+    return value
+
+def _export_mirror(dest):
+    """Vuelca lo que este host ya descargó en un mirror para hosts sin Internet."""
+    from src.core import mirror
+    counts = mirror.export(dest)
+    print(f"[KubeControlMC] Mirror exportado en {dest}: "
+          f"{counts['documents']} respuestas de API, {counts['blobs']} artefactos.")
+    print(f"[KubeControlMC] Úsalo con: kcmc --mirror {os.path.abspath(dest)} "
+          f"(o sírvelo con 'python3 -m http.server' y --mirror http://host:8000)")
+
 def main():
     if "--version" in sys.argv or "-v" in sys.argv:
         print(f"{APP_NAME} {APP_VERSION}")
         return
 
+    # Mirror local/LAN: todas las descargas se resuelven contra él (src/core/mirror.py)
+    mirror_location = _pop_option("--mirror")
+    if mirror_location:
+        os.environ["KCMC_MIRROR"] = mirror_location
+    export_dest = _pop_option("--export-mirror")
+    if export_dest:
+        _export_mirror(export_dest)
+        return
+
+    # Log de GC unificado (logs/gc.log) para el análisis de pausas (src/core/gc_log.py)
+    if "--gc-log" in sys.argv:
+        os.environ["KCMC_GC_LOG"] = "1"
+        sys.argv.remove("--gc-log")
+
     pi_mode = _configure_pi_mode()
     force_gui = "--gui" in sys.argv
     if force_gui:
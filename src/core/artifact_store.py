@@ -0,0 +1,320 @@
+"""Almacén de artefactos direccionado por contenido, compartido entre instancias.
+
+Cada `JarManager(download_dir=...)` y `PluginManager(plugins_dir=...)` descargaba
+en su propio directorio: con varios servidores en el mismo host el mismo build
+de Paper, Geyser y Floodgate se bajaba y se guardaba N veces. Ahora todas las
+descargas pasan por `~/.cache/kcmc/` (`paths.cache_dir`):
+
+  blobs/<sha256>   contenido, de solo lectura
+  tmp/             descargas en curso (reanudables entre procesos) y sus locks
+  urls.json        URL -> sha256 de su última descarga (para `mirror.export`;
+                   al buscar solo se consulta en URLs inmutables sin checksum)
+  refs.json        ruta de destino -> sha256 (para reflinks y copias)
+
+Si el blob ya existe la instancia lo recibe sin red. El destino es un
+hardlink al blob; entre sistemas de archivos distintos se intenta un reflink
+(FICLONE: btrfs, XFS) y, si no, una copia normal.
+
+GC: un blob está vivo mientras tenga más de un enlace (algún servidor lo usa)
+o alguna ruta de refs.json siga existiendo con su mismo tamaño. Los blobs sin
+referencias se borran pasado GC_GRACE, contado desde su último uso.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin locks entre procesos
+    fcntl = None
+
+from src.core import http_client
+from src.core.paths import cache_dir
+
+FICLONE = 0x40049409
+GC_GRACE = 7 * 24 * 3600
+GC_INTERVAL = 3600
+
+_lock = threading.Lock()
+
+
+def file_hashes(path: str, algorithms: Iterable[str]) -> Dict[str, str]:
+    """Varios hashes de un archivo en una sola lectura."""
+    hashers = {algo: hashlib.new(algo) for algo in algorithms}
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            for h in hashers.values():
+                h.update(chunk)
+    return {algo: h.hexdigest() for algo, h in hashers.items()}
+
+
+def file_sha256(path: str) -> str:
+    return file_hashes(path, ["sha256"])["sha256"]
+
+
+class ArtifactStore:
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or cache_dir()
+        self.blobs_dir = os.path.join(self.root, "blobs")
+        self.tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self._last_gc = 0.0
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.blobs_dir, sha256.lower())
+
+    def has(self, sha256: str) -> bool:
+        return os.path.exists(self.blob_path(sha256))
+
+    # -- Índices JSON -------------------------------------------------------
+
+    def _load(self, name: str) -> Dict[str, str]:
+        try:
+            with open(os.path.join(self.root, name), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _update(self, name: str, **changes: Optional[str]):
+        """Lee-modifica-escribe bajo lock; un valor None borra la clave."""
+        path = os.path.join(self.root, name)
+        with _lock, self._file_lock(name):
+            data = self._load(name)
+            for key, value in changes.items():
+                if value is None:
+                    data.pop(key, None)
+                else:
+                    data[key] = value
+            tmp = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=1)
+                os.replace(tmp, path)
+            except OSError:
+                pass
+
+    def _file_lock(self, name: str, blocking: bool = True):
+        return _FileLock(os.path.join(self.tmp_dir, name + ".lock"), blocking)
+
+    # -- Descarga -----------------------------------------------------------
+
+    def urls(self) -> Dict[str, str]:
+        """URL -> sha256 de todo lo descargado (para exportar un mirror)."""
+        return self._load("urls.json")
+
+    def _resolve(self, url: str, sha256: Optional[str], immutable: bool) -> Optional[str]:
+        if sha256:
+            return sha256.lower()
+        if immutable:
+            return self._load("urls.json").get(url)
+        return None
+
+    def _adopt(self, tmp: str, url: str, sha256: Optional[str], executable: bool,
+               hashes: Optional[Dict[str, str]] = None) -> str:
+        """Verifica `hashes` y mueve una descarga terminada a blobs/. Devuelve su sha256."""
+        digest = sha256
+        if hashes or not digest:
+            computed = file_hashes(tmp, {"sha256", *(hashes or {})})
+            for algo, expected in (hashes or {}).items():
+                if computed[algo] != expected.lower():
+                    os.remove(tmp)
+                    raise http_client.ChecksumError(
+                        f"{algo.upper()} no coincide para {url}: esperado {expected}, obtenido {computed[algo]}")
+            digest = digest or computed["sha256"]
+        blob = self.blob_path(digest)
+        if os.path.exists(blob):
+            os.remove(tmp)
+        else:
+            os.chmod(tmp, 0o555 if executable else 0o444)
+            os.replace(tmp, blob)
+        self._update("urls.json", **{url: digest})
+        return digest
+
+    def _tmp_path(self, url: str) -> str:
+        return os.path.join(self.tmp_dir, hashlib.sha256(url.encode()).hexdigest()[:16])
+
+    def fetch(self, url: str, dest: str, sha256: Optional[str] = None, immutable: bool = False,
+              executable: bool = False, hashes: Optional[Dict[str, str]] = None, **kwargs) -> str:
+        """Deja en `dest` el artefacto de `url`, bajándolo solo si no está en el almacén.
+
+        `sha256` identifica el blob sin red; sin él, `immutable=True` permite
+        reutilizar lo que ya se bajó de esa misma URL (builds y versiones
+        fijadas). `hashes` ({"sha512": ...}) son checksums de otros algoritmos
+        que publica el origen (Modrinth) y se verifican antes de guardar el blob.
+        El resto de argumentos van a `http_client.download`.
+        """
+        digest = self._resolve(url, sha256, immutable)
+        if not (digest and self.has(digest)):
+            tmp = self._tmp_path(url)
+            # Otra instancia puede estar bajando lo mismo: se espera y se reutiliza
+            with self._file_lock(os.path.basename(tmp)):
+                digest = self._resolve(url, sha256, immutable)
+                if not (digest and self.has(digest)):
+                    http_client.download(url, tmp, sha256=sha256, **kwargs)
+                    digest = self._adopt(tmp, url, sha256, executable, hashes)
+        self.link(digest, dest, executable)
+        self.maybe_gc()
+        return dest
+
+    async def fetch_async(self, url: str, dest: str, sha256: Optional[str] = None,
+                          immutable: bool = False, executable: bool = False,
+                          hashes: Optional[Dict[str, str]] = None, **kwargs) -> str:
+        """Versión asyncio de `fetch`; el lock entre procesos se sondea sin bloquear el loop."""
+        digest = self._resolve(url, sha256, immutable)
+        if not (digest and self.has(digest)):
+            tmp = self._tmp_path(url)
+            lock = self._file_lock(os.path.basename(tmp), blocking=False)
+            while not lock.acquire():
+                await asyncio.sleep(0.5)
+            try:
+                digest = self._resolve(url, sha256, immutable)
+                if not (digest and self.has(digest)):
+                    await http_client.download_async(url, tmp, sha256=sha256, **kwargs)
+                    digest = await asyncio.to_thread(self._adopt, tmp, url, sha256, executable, hashes)
+            finally:
+                lock.release()
+        await asyncio.to_thread(self.link, digest, dest, executable)
+        self.maybe_gc()
+        return dest
+
+    # -- Enlaces ------------------------------------------------------------
+
+    def link(self, sha256: str, dest: str, executable: bool = False) -> str:
+        """Hardlink (o reflink, o copia) del blob en `dest`, reemplazándolo de forma atómica."""
+        blob = self.blob_path(sha256)
+        os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+        tmp = f"{dest}.{os.getpid()}.link"
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        try:
+            os.link(blob, tmp)
+            hardlinked = True
+        except OSError:
+            hardlinked = False
+            if not self._reflink(blob, tmp):
+                shutil.copyfile(blob, tmp)
+            if executable:
+                os.chmod(tmp, 0o755)
+        os.replace(tmp, dest)
+        os.utime(blob)  # último uso, para el GC
+        if not hardlinked:
+            self._update("refs.json", **{os.path.abspath(dest): sha256})
+        return dest
+
+    @staticmethod
+    def _reflink(src: str, dst: str) -> bool:
+        if fcntl is None:
+            return False
+        try:
+            with open(src, "rb") as s, open(dst, "wb") as d:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            return True
+        except OSError:
+            try:
+                os.remove(dst)
+            except OSError:
+                pass
+            return False
+
+    # -- Recolección --------------------------------------------------------
+
+    def maybe_gc(self):
+        """GC oportunista, como mucho una vez por GC_INTERVAL en este proceso."""
+        if time.time() - self._last_gc < GC_INTERVAL:
+            return
+        self._last_gc = time.time()
+        try:
+            self.gc()
+        except OSError:
+            pass
+
+    def gc(self, grace: float = GC_GRACE) -> int:
+        """Borra los blobs sin referencias más viejos que `grace`. Devuelve los bytes liberados."""
+        refs = self._load("refs.json")
+        live_refs, stale_refs = {}, []
+        for path, digest in refs.items():
+            try:
+                live_refs.setdefault(digest, []).append(os.stat(path).st_size)
+            except OSError:
+                stale_refs.append(path)
+        if stale_refs:
+            self._update("refs.json", **{path: None for path in stale_refs})
+
+        freed = 0
+        now = time.time()
+        try:
+            entries = list(os.scandir(self.blobs_dir))
+        except OSError:
+            entries = []
+        for entry in entries:
+            try:
+                st = entry.stat()
+            except OSError:
+                continue  # otro proceso lo adoptó o lo borró
+            if st.st_nlink > 1 or st.st_size in live_refs.get(entry.name, ()):
+                continue
+            if now - st.st_mtime < grace:
+                continue
+            try:
+                os.remove(entry.path)
+                freed += st.st_size
+            except OSError:
+                pass
+        if freed:
+            urls = self._load("urls.json")
+            gone = {url: None for url, digest in urls.items() if not self.has(digest)}
+            if gone:
+                self._update("urls.json", **gone)
+        return freed
+
+
+class _FileLock:
+    """flock exclusivo sobre un archivo de tmp/ (no-op sin fcntl)."""
+
+    def __init__(self, path: str, blocking: bool = True):
+        self.path = path
+        self.blocking = blocking
+        self._fd = None
+
+    def acquire(self) -> bool:
+        if fcntl is None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        flags = fcntl.LOCK_EX if self.blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(fd, flags)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+_store: Optional[ArtifactStore] = None
+
+
+def get_store() -> ArtifactStore:
+    global _store
+    if _store is None:
+        _store = ArtifactStore()
+    return _store
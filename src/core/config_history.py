@@ -0,0 +1,268 @@
+"""Historial de configuración: snapshots direccionados por contenido, diff y rollback.
+
+Optimizadores y editores escribían encima de server.properties y los YAML sin
+posibilidad de deshacer. `ConfigManager` y el catálogo de presets llaman a
+`snapshot()` antes de cada escritura; el historial vive en
+`server_bin/.kcmc/config-history`:
+
+  objects/<sha256[:2]>/<sha256[2:]>   contenido comprimido con zlib
+  snapshots.jsonl                    una línea por snapshot {id, time, label, files}
+
+Cada versión distinta de un archivo se guarda una sola vez, como blob zlib
+completo (no como delta); un snapshot es una línea JSON con hashes, y si
+nada cambió desde el anterior no se crea. Los hashes se cachean por
+(mtime_ns, size), así que un snapshot sin cambios cuesta un `stat` por
+archivo.
+
+`rollback()` sin id va retrocediendo: el snapshot tomado antes de restaurar
+guarda qué se restauró (`restores`) y la siguiente llamada sigue desde ahí
+hacia atrás en vez de volver al estado que se acaba de deshacer.
+"""
+
+import difflib
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+HISTORY_DIR = os.path.join(".kcmc", "config-history")
+MAX_SNAPSHOTS = 500
+
+TRACKED_FILES = (
+    "server.properties",
+    "bukkit.yml",
+    "spigot.yml",
+    "paper.yml",
+    "config/paper-global.yml",
+    "config/paper-world-defaults.yml",
+    "pufferfish.yml",
+    "purpur.yml",
+)
+
+# ruta absoluta -> ((mtime_ns, size), sha256)
+_hash_cache: Dict[str, Tuple[Tuple[int, int], str]] = {}
+_lock = threading.Lock()
+
+
+@dataclass
+class Snapshot:
+    id: str
+    time: float
+    label: str
+    files: Dict[str, str] = field(default_factory=dict)  # ruta relativa -> sha256
+    restores: Optional[str] = None  # id restaurado justo después de este snapshot
+
+    def describe(self) -> str:
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.time))
+        return f"{self.id}  {when}  {self.label}"
+
+
+def _root(server_dir: str) -> str:
+    return os.path.join(server_dir, HISTORY_DIR)
+
+
+def _local(server_dir: str, rel_path: str) -> str:
+    return os.path.join(server_dir, *rel_path.split("/"))
+
+
+def _object_path(server_dir: str, digest: str) -> str:
+    return os.path.join(_root(server_dir), "objects", digest[:2], digest[2:])
+
+
+def _store(server_dir: str, path: str) -> Optional[str]:
+    """Hash del archivo, guardando el objeto si es nuevo. None si no existe."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _hash_cache.get(path)
+    if cached and cached[0] == key and os.path.exists(_object_path(server_dir, cached[1])):
+        return cached[1]
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    obj = _object_path(server_dir, digest)
+    if not os.path.exists(obj):
+        os.makedirs(os.path.dirname(obj), exist_ok=True)
+        tmp = obj + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(zlib.compress(data, 6))
+        os.replace(tmp, obj)
+    _hash_cache[path] = (key, digest)
+    return digest
+
+
+def read_object(server_dir: str, digest: str) -> bytes:
+    with open(_object_path(server_dir, digest), "rb") as f:
+        return zlib.decompress(f.read())
+
+
+def list_snapshots(server_dir: str) -> List[Snapshot]:
+    """Snapshots del más antiguo al más reciente."""
+    snapshots = []
+    try:
+        with open(os.path.join(_root(server_dir), "snapshots.jsonl"), "r") as f:
+            for line in f:
+                try:
+                    snapshots.append(Snapshot(**json.loads(line)))
+                except (ValueError, TypeError):
+                    continue
+    except OSError:
+        pass
+    return snapshots
+
+
+def get_snapshot(server_dir: str, snapshot_id: str) -> Optional[Snapshot]:
+    for snap in list_snapshots(server_dir):
+        if snap.id == snapshot_id:
+            return snap
+    return None
+
+
+def _current_files(server_dir: str) -> Dict[str, str]:
+    files = {}
+    for rel in TRACKED_FILES:
+        digest = _store(server_dir, _local(server_dir, rel))
+        if digest:
+            files[rel] = digest
+    return files
+
+
+def snapshot(server_dir: str, label: str, restores: Optional[str] = None) -> Optional[Snapshot]:
+    """Guarda el estado actual. Devuelve el último snapshot si nada cambió desde él.
+
+    Con `restores` (lo usa `rollback`) siempre se añade, para que quede
+    constancia del rollback aunque el contenido no sea nuevo.
+    """
+    if not os.path.isdir(server_dir):
+        return None
+    with _lock:
+        files = _current_files(server_dir)
+        if not files:
+            return None
+        snapshots = list_snapshots(server_dir)
+        if snapshots and snapshots[-1].files == files and not restores:
+            return snapshots[-1]
+        snap_id = hashlib.sha256(json.dumps(files, sort_keys=True).encode()
+                                 + str(time.time()).encode()).hexdigest()[:10]
+        snap = Snapshot(snap_id, time.time(), label, files, restores)
+        index = os.path.join(_root(server_dir), "snapshots.jsonl")
+        os.makedirs(os.path.dirname(index), exist_ok=True)
+        with open(index, "a") as f:
+            f.write(json.dumps(snap.__dict__) + "\n")
+        if len(snapshots) + 1 > MAX_SNAPSHOTS:
+            _prune(server_dir, snapshots[-(MAX_SNAPSHOTS - 1):] + [snap])
+        return snap
+
+
+def _prune(server_dir: str, keep: List[Snapshot]):
+    """Reescribe el índice con `keep` y borra los objetos que ya nadie referencia."""
+    index = os.path.join(_root(server_dir), "snapshots.jsonl")
+    tmp = index + ".tmp"
+    with open(tmp, "w") as f:
+        for snap in keep:
+            f.write(json.dumps(snap.__dict__) + "\n")
+    os.replace(tmp, index)
+    live = {d for snap in keep for d in snap.files.values()}
+    objects = os.path.join(_root(server_dir), "objects")
+    for prefix in os.listdir(objects):
+        for name in os.listdir(os.path.join(objects, prefix)):
+            if prefix + name not in live:
+                os.remove(os.path.join(objects, prefix, name))
+
+
+def _contents(server_dir: str, snap: Optional[Snapshot], only: set) -> Dict[str, str]:
+    """{ruta: texto} de `only` en un snapshot, o en los archivos actuales si snap es None."""
+    texts = {}
+    if snap is None:
+        for rel in only:
+            path = _local(server_dir, rel)
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8", errors="replace") as f:
+                    texts[rel] = f.read()
+        return texts
+    for rel in only & set(snap.files):
+        texts[rel] = read_object(server_dir, snap.files[rel]).decode("utf-8", errors="replace")
+    return texts
+
+
+def diff(server_dir: str, old_id: str, new_id: Optional[str] = None) -> List[str]:
+    """Diff unificado entre dos snapshots (o entre un snapshot y los archivos actuales).
+
+    Los archivos con el mismo hash se saltan sin descomprimir.
+    """
+    old = get_snapshot(server_dir, old_id)
+    if old is None:
+        raise KeyError(f"Snapshot desconocido: {old_id}")
+    new = get_snapshot(server_dir, new_id) if new_id else None
+    if new_id and new is None:
+        raise KeyError(f"Snapshot desconocido: {new_id}")
+    new_files = new.files if new else _current_files(server_dir)
+    changed = {rel for rel in set(old.files) | set(new_files) if old.files.get(rel) != new_files.get(rel)}
+    if not changed:
+        return []
+    old_texts = _contents(server_dir, old, changed)
+    new_texts = _contents(server_dir, new, changed)
+    lines = []
+    for rel in sorted(changed):
+        lines += [line.rstrip("\n") for line in difflib.unified_diff(
+            old_texts.get(rel, "").splitlines(keepends=True), new_texts.get(rel, "").splitlines(keepends=True),
+            fromfile=f"{old.id}/{rel}", tofile=f"{new.id if new else 'actual'}/{rel}", n=1)]
+    return lines
+
+
+def rollback_target(server_dir: str) -> Optional[Snapshot]:
+    """Snapshot que restauraría `rollback()`: el último distinto del estado actual.
+
+    Los tramos ya deshechos se saltan: al encontrar un snapshot "antes de
+    restaurar X" la búsqueda sigue desde X hacia atrás.
+    """
+    current = _current_files(server_dir)
+    snapshots = list_snapshots(server_dir)
+    position = {s.id: i for i, s in enumerate(snapshots)}
+    i = len(snapshots) - 1
+    while i >= 0:
+        snap = snapshots[i]
+        if snap.restores and position.get(snap.restores, i) < i:
+            i = position[snap.restores]
+            continue
+        if snap.files != current:
+            return snap
+        i -= 1
+    return None
+
+
+def rollback(server_dir: str, snapshot_id: Optional[str] = None) -> List[str]:
+    """Restaura un snapshot (por defecto `rollback_target()`).
+
+    Devuelve los archivos restaurados. Antes se guarda el estado actual, así
+    que un rollback también se puede deshacer pasando el id de ese snapshot.
+    Llamadas sucesivas sin id retroceden un paso más cada vez. Los archivos
+    que no existían en el snapshot no se tocan.
+    """
+    if snapshot_id:
+        target = get_snapshot(server_dir, snapshot_id)
+        if target is None:
+            raise KeyError(f"Snapshot desconocido: {snapshot_id}")
+    else:
+        target = rollback_target(server_dir)
+        if target is None:
+            return []
+    current = _current_files(server_dir)
+    restored = [rel for rel, digest in target.files.items() if current.get(rel) != digest]
+    if not restored:
+        return []
+    snapshot(server_dir, f"antes de restaurar {target.id}", restores=target.id)
+    for rel in restored:
+        path = _local(server_dir, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(read_object(server_dir, target.files[rel]))
+        os.replace(tmp, path)
+    return restored
@@ -0,0 +1,250 @@
+"""Topología de CPU y tamaño de los pools de hilos de Paper/Folia.
+
+El instalador ofrece Folia como "alto rendimiento", pero nadie configuraba sus
+hilos de regiones ni los workers de chunks / hilos de IO de Paper, y los
+valores por defecto (-1 = calculados por Paper a partir de los procesadores
+que ve la JVM) se equivocan en los dos extremos: en una Pi de 4 núcleos
+compiten con el hilo principal, y en un host de 32 hilos con cuota de cgroup
+de 4 CPUs crean pools enormes que se pelean por la cuota.
+
+`detect()` lee de `/sys/devices/system/cpu`:
+  - CPUs online (y la afinidad del proceso)
+  - clusters big.LITTLE (cpu_capacity o cpuinfo_max_freq)
+  - hermanos SMT (topology/thread_siblings_list)
+y la cuota de CPU del cgroup (v2 `cpu.max` o v1 `cpu.cfs_quota_us`).
+
+`thread_plan()` reparte los núcleos efectivos entre hilo principal, red/GC,
+workers de chunks, IO y (en Folia) hilos de región. `apply_thread_config()`
+escribe el plan en `config/paper-global.yml` (o en el `paper.yml` antiguo)
+con `yaml_patch`, y `pi_profile.get_java_args` añade
+`-XX:ActiveProcessorCount` para que la JVM vea las mismas CPUs.
+"""
+
+import math
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from src.core import config_history
+from src.core.yaml_patch import YamlPatch
+
+SYS_CPU = "/sys/devices/system/cpu"
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def parse_cpu_list(text: str) -> List[int]:
+    """'0-3,6,8-9' -> [0, 1, 2, 3, 6, 8, 9]."""
+    cpus = []
+    for part in (text or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            cpus.extend(range(int(lo), int(hi) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+@dataclass
+class CpuTopology:
+    online: List[int]
+    clusters: List[List[int]] = field(default_factory=list)   # del más rápido al más lento
+    smt_groups: List[List[int]] = field(default_factory=list)  # CPUs lógicas por núcleo físico
+    quota_cpus: Optional[float] = None                         # cuota de cgroup en CPUs
+    host_cpus: Optional[int] = None                            # CPUs online del host (sin afinidad)
+
+    @property
+    def logical(self) -> int:
+        return len(self.online)
+
+    @property
+    def physical(self) -> int:
+        return len(self.smt_groups) or self.logical
+
+    @property
+    def big_cores(self) -> int:
+        """Núcleos físicos del cluster más rápido (todos si no hay big.LITTLE)."""
+        if len(self.clusters) < 2:
+            return self.physical
+        fast = set(self.clusters[0])
+        return sum(1 for group in self.smt_groups if fast & set(group)) or len(fast)
+
+    @property
+    def effective(self) -> int:
+        """Núcleos físicos limitados por la cuota: base para dimensionar los pools de hilos."""
+        cores = self.physical
+        if self.quota_cpus:
+            cores = min(cores, max(1, math.ceil(self.quota_cpus)))
+        return max(1, cores)
+
+    @property
+    def usable(self) -> int:
+        """CPUs lógicas que el proceso puede usar: afinidad limitada por la cuota."""
+        cpus = self.logical
+        if self.quota_cpus:
+            cpus = min(cpus, max(1, math.ceil(self.quota_cpus)))
+        return max(1, cpus)
+
+    @property
+    def restricted(self) -> bool:
+        """La JVM vería más CPUs de las que puede usar (cuota o afinidad, no SMT)."""
+        return self.usable < (self.host_cpus or os.cpu_count() or self.logical)
+
+    def describe(self) -> str:
+        parts = [f"{self.logical} CPUs lógicas, {self.physical} núcleos"]
+        if len(self.clusters) > 1:
+            parts.append("big.LITTLE " + "+".join(str(len(c)) for c in self.clusters))
+        if self.quota_cpus:
+            parts.append(f"cuota cgroup {self.quota_cpus:g} CPUs")
+        parts.append(f"efectivos {self.effective}")
+        return ", ".join(parts)
+
+
+def _cgroup_quota(cgroup_root: str) -> Optional[float]:
+    """Cuota de CPU en CPUs (cgroup v2 o v1), o None si no hay límite."""
+    cpu_max = _read(os.path.join(cgroup_root, "cpu.max"))
+    if cpu_max:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+        return None
+    quota = _read(os.path.join(cgroup_root, "cpu", "cpu.cfs_quota_us"))
+    period = _read(os.path.join(cgroup_root, "cpu", "cpu.cfs_period_us"))
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def detect(sys_cpu: str = SYS_CPU, cgroup_root: str = CGROUP_ROOT) -> CpuTopology:
+    """Topología del host. Sin /sys (macOS) se usa `os.cpu_count()` sin más detalle."""
+    online = parse_cpu_list(_read(os.path.join(sys_cpu, "online")) or "")
+    if not online:
+        return CpuTopology(online=list(range(os.cpu_count() or 1)))
+    host_cpus = len(online)
+    if hasattr(os, "sched_getaffinity") and sys_cpu == SYS_CPU:
+        allowed = os.sched_getaffinity(0)
+        online = [cpu for cpu in online if cpu in allowed] or online
+
+    # Clusters: misma capacidad (ARM) o misma frecuencia máxima
+    speed: Dict[int, List[int]] = {}
+    groups: Dict[str, List[int]] = {}
+    for cpu in online:
+        base = os.path.join(sys_cpu, f"cpu{cpu}")
+        value = (_read(os.path.join(base, "cpu_capacity"))
+                 or _read(os.path.join(base, "cpufreq", "cpuinfo_max_freq")) or "0")
+        speed.setdefault(int(value), []).append(cpu)
+        siblings = parse_cpu_list(_read(os.path.join(base, "topology", "thread_siblings_list")) or str(cpu))
+        key = ",".join(str(c) for c in sorted(siblings))
+        groups.setdefault(key, [c for c in sorted(siblings) if c in online] or [cpu])
+    clusters = [speed[k] for k in sorted(speed, reverse=True)]
+    return CpuTopology(online=online, clusters=clusters, smt_groups=list(groups.values()),
+                       quota_cpus=_cgroup_quota(cgroup_root), host_cpus=host_cpus)
+
+
+_topology: Optional[CpuTopology] = None
+
+
+def get_topology() -> CpuTopology:
+    """Topología detectada una vez por proceso."""
+    global _topology
+    if _topology is None:
+        _topology = detect()
+    return _topology
+
+
+# ---------------------------------------------------------------------------
+# Plan de hilos
+# ---------------------------------------------------------------------------
+
+@dataclass
+class ThreadPlan:
+    worker_threads: int
+    io_threads: int
+    region_threads: Optional[int]      # solo Folia
+    active_processors: Optional[int]   # -XX:ActiveProcessorCount, None si no hace falta
+
+    def values(self, paper_global: bool = True) -> Dict[str, int]:
+        """{ruta YAML: valor} para paper-global.yml (o paper.yml si `paper_global` es False)."""
+        if not paper_global:
+            return {"settings.async-chunks.threads": self.worker_threads}
+        values = {"chunk-system.worker-threads": self.worker_threads,
+                  "chunk-system.io-threads": self.io_threads}
+        if self.region_threads is not None:
+            values["threaded-regions.threads"] = self.region_threads
+        return values
+
+    def describe(self) -> str:
+        text = f"workers de chunks {self.worker_threads}, IO {self.io_threads}"
+        if self.region_threads is not None:
+            text = f"regiones {self.region_threads}, " + text
+        if self.active_processors:
+            text += f", JVM limitada a {self.active_processors} CPUs"
+        return text
+
+
+def thread_plan(topo: Optional[CpuTopology] = None, folia: bool = False) -> ThreadPlan:
+    """Reparte los núcleos efectivos.
+
+    Paper: el hilo principal se queda un núcleo (uno grande en big.LITTLE) y
+    otro se reserva para red y GC; los workers usan la mitad del resto (máx. 8).
+    Folia: las regiones son el trabajo principal, así que se llevan todo
+    salvo red/GC y los workers (1/4 de los núcleos, mín. 1).
+    IO: uno por cada 4 workers (mín. 1, máx. 4); el IO de chunks es secuencial
+    por región y más hilos solo compiten por el disco.
+    """
+    topo = topo or get_topology()
+    cores = topo.effective
+    if folia:
+        workers = max(1, cores // 4)
+        regions = max(1, cores - workers - 1)
+        # En big.LITTLE las regiones van mejor en los núcleos grandes
+        if len(topo.clusters) > 1:
+            regions = max(1, min(regions, topo.big_cores))
+    else:
+        workers = max(1, min((cores - 2) // 2, 8))
+        regions = None
+    io = max(1, min(workers // 4, 4))
+    return ThreadPlan(worker_threads=workers, io_threads=io, region_threads=regions,
+                      active_processors=topo.usable if topo.restricted else None)
+
+
+def apply_thread_config(server_dir: str, folia: bool = False,
+                        topo: Optional[CpuTopology] = None) -> List[str]:
+    """Escribe el plan en la configuración de Paper existente. Devuelve los cambios.
+
+    Los archivos aparecen tras el primer arranque; si no existen no se crean.
+    """
+    plan = thread_plan(topo, folia)
+    targets = [(os.path.join(server_dir, "config", "paper-global.yml"), True),
+               (os.path.join(server_dir, "paper.yml"), False)]
+    docs = []
+    for path, modern in targets:
+        if not os.path.exists(path):
+            continue
+        doc = YamlPatch.from_file(path)
+        # Claves nuevas solo en el formato moderno; en paper.yml se respeta lo que hay
+        for key_path, value in plan.values(modern).items():
+            try:
+                doc.set(key_path, value, create=modern)
+            except ValueError:
+                continue
+        if doc.changed:
+            docs.append((path, doc))
+    if not docs:
+        return []
+    config_history.snapshot(server_dir, "antes de ajustar hilos")
+    changes = []
+    for path, doc in docs:
+        changes += [f"{doc.name}: {c.describe()}" for c in doc.changes]
+        doc.save(path)
+    return changes
@@ -0,0 +1,315 @@
+"""Ajuste automático de view-distance y simulation-distance en lazo cerrado.
+
+Los presets fijan las distancias una vez (4/3 agresivo, 3/2 Pi), pero la carga
+cambia mucho entre una noche entre semana y un evento de fin de semana. El
+tuner recibe los TPS de `server-state.json` (`record_tps`) y las métricas de
+lag del log (`feed_log`: "Can't keep up!" y la salida de `/mspt`), evalúa
+ventanas de `window` segundos y, con histéresis, baja o sube las distancias
+un paso dentro de los límites configurados:
+
+  - baja si TPS medio < LOWER_TPS, o hay LOWER_LAG_EVENTS "Can't keep up",
+    o MSPT > LOWER_MSPT (una sola ventana mala basta)
+  - sube si TPS medio >= RAISE_TPS sin eventos de lag y MSPT < RAISE_MSPT
+    durante RAISE_AFTER ventanas buenas seguidas
+  - tras cada decisión hay COOLDOWN_WINDOWS ventanas sin cambios
+
+Los cambios quedan pendientes y se escriben en server.properties al próximo
+arranque (`apply_pending`). Si se configura `live_command` (plantilla con
+{view} y {sim}, p.ej. para un plugin de distancias) se aplican en caliente.
+Cada decisión y su efecto medido se registran en `.kcmc/distance-tuner.jsonl`.
+Configuración en `.kcmc/distance-tuner.json`.
+"""
+
+import json
+import os
+import re
+import statistics
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+from src.core import pi_profile
+from src.core.config_manager import ConfigManager
+
+CONFIG_FILE = os.path.join(".kcmc", "distance-tuner.json")
+LOG_FILE = os.path.join(".kcmc", "distance-tuner.jsonl")
+
+LOWER_TPS = 18.5
+LOWER_LAG_EVENTS = 3
+LOWER_MSPT = 45.0
+RAISE_TPS = 19.8
+RAISE_MSPT = 30.0
+RAISE_AFTER = 3
+COOLDOWN_WINDOWS = 2
+
+# "Can't keep up! Is the server overloaded? Running 2043ms or 40 ticks behind"
+_RE_CANT_KEEP_UP = re.compile(r"Can't keep up!.*?Running (\d+)ms or (\d+) ticks behind")
+# Salida de /mspt en Paper: "◴ 12.3/4.5/40.1, ..." (media/mín/máx de los últimos 5s primero)
+_RE_MSPT = re.compile(r"([\d.]+)/([\d.]+)/([\d.]+)")
+_RE_ANSI = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+
+
+@dataclass
+class TunerConfig:
+    enabled: bool = True
+    view_min: int = 4
+    view_max: int = 10
+    sim_min: int = 3
+    sim_max: int = 8
+    window: float = 600.0
+    live_command: Optional[str] = None
+
+    @classmethod
+    def defaults(cls) -> "TunerConfig":
+        if pi_profile.is_pi_mode():
+            return cls(view_min=3, view_max=6, sim_min=2, sim_max=4)
+        return cls()
+
+    @classmethod
+    def load(cls, server_dir: str) -> "TunerConfig":
+        config = cls.defaults()
+        try:
+            with open(os.path.join(server_dir, CONFIG_FILE), "r") as f:
+                data = json.load(f)
+            for key, value in data.items():
+                if hasattr(config, key):
+                    setattr(config, key, value)
+        except (OSError, ValueError):
+            pass
+        return config
+
+    def save(self, server_dir: str):
+        path = os.path.join(server_dir, CONFIG_FILE)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(asdict(self), f, indent=2)
+
+
+@dataclass
+class WindowStats:
+    tps_avg: Optional[float] = None
+    tps_min: Optional[float] = None
+    lag_events: int = 0
+    ticks_behind: int = 0
+    mspt: Optional[float] = None
+
+    def describe(self) -> str:
+        parts = []
+        if self.tps_avg is not None:
+            parts.append(f"TPS {self.tps_avg:.1f} (mín {self.tps_min:.1f})")
+        if self.mspt is not None:
+            parts.append(f"MSPT {self.mspt:.1f}")
+        parts.append(f"{self.lag_events} lag")
+        return ", ".join(parts)
+
+
+@dataclass
+class Decision:
+    time: float
+    action: str            # "lower" | "raise"
+    view_from: int
+    sim_from: int
+    view_to: int
+    sim_to: int
+    reason: str
+    metrics: Dict = field(default_factory=dict)
+
+    def describe(self) -> str:
+        verb = "Bajar" if self.action == "lower" else "Subir"
+        return (f"{verb} distancias: view {self.view_from}->{self.view_to}, "
+                f"sim {self.sim_from}->{self.sim_to} ({self.reason})")
+
+
+class DistanceTuner:
+    """Controlador con histéresis. Llamar `record_tps` y `feed_log`; `evaluate` por ventana."""
+
+    def __init__(self, server_dir: str, config: Optional[TunerConfig] = None):
+        self.server_dir = server_dir
+        self.config = config or TunerConfig.load(server_dir)
+        self.view = self._current("view-distance", self.config.view_max)
+        self.sim = self._current("simulation-distance", self.config.sim_max)
+        self.pending: Optional[Decision] = load_pending(server_dir)
+        self._reset_window()
+        self._good_windows = 0
+        self._cooldown = 0
+        # Última decisión aplicada cuyo efecto aún no se midió
+        self._awaiting_effect: Optional[Decision] = None
+
+    def _current(self, key: str, fallback: int) -> int:
+        try:
+            return int(ConfigManager.get_property(self.server_dir, key) or fallback)
+        except ValueError:
+            return fallback
+
+    def _reset_window(self):
+        self._window_start = time.time()
+        self._tps: List[float] = []
+        self._lag_events = 0
+        self._ticks_behind = 0
+        self._mspt: List[float] = []
+
+    # -- Entradas ----------------------------------------------------------
+
+    def record_tps(self, tps: float):
+        self._tps.append(tps)
+
+    def feed_log(self, line: str):
+        clean = _RE_ANSI.sub("", line)
+        m = _RE_CANT_KEEP_UP.search(clean)
+        if m:
+            self._lag_events += 1
+            self._ticks_behind += int(m.group(2))
+            return
+        if "◴" in clean or "tick times" in clean.lower():
+            m = _RE_MSPT.search(clean)
+            if m:
+                self._mspt.append(float(m.group(1)))
+
+    def window_stats(self) -> WindowStats:
+        return WindowStats(
+            tps_avg=statistics.fmean(self._tps) if self._tps else None,
+            tps_min=min(self._tps) if self._tps else None,
+            lag_events=self._lag_events,
+            ticks_behind=self._ticks_behind,
+            mspt=max(self._mspt) if self._mspt else None,
+        )
+
+    # -- Controlador -------------------------------------------------------
+
+    def _target(self, action: str):
+        """Siguiente (view, sim) un paso más abajo/arriba, o None si ya está en el límite."""
+        view, sim = self.view, self.sim
+        if self.pending:
+            view, sim = self.pending.view_to, self.pending.sim_to
+        cfg = self.config
+        if action == "lower":
+            # simulation-distance primero: es la que más CPU cuesta
+            if sim > cfg.sim_min:
+                return view, sim - 1
+            if view > cfg.view_min:
+                return view - 1, sim
+            return None
+        if view < cfg.view_max and view <= sim + 1:
+            return view + 1, sim
+        if sim < cfg.sim_max and sim < view:
+            return view, sim + 1
+        if view < cfg.view_max:
+            return view + 1, sim
+        return None
+
+    def evaluate(self, force: bool = False) -> Optional[Decision]:
+        """Cierra la ventana si ya pasó `window` y decide. Devuelve la decisión nueva, si la hay."""
+        if not self.config.enabled:
+            return None
+        if not force and time.time() - self._window_start < self.config.window:
+            return None
+        stats = self.window_stats()
+        self._reset_window()
+        if stats.tps_avg is None and stats.mspt is None and not stats.lag_events:
+            return None
+        self._log_effect(stats)
+
+        bad = ((stats.tps_avg is not None and stats.tps_avg < LOWER_TPS)
+               or stats.lag_events >= LOWER_LAG_EVENTS
+               or (stats.mspt is not None and stats.mspt > LOWER_MSPT))
+        good = ((stats.tps_avg is None or stats.tps_avg >= RAISE_TPS)
+                and stats.lag_events == 0
+                and (stats.mspt is None or stats.mspt < RAISE_MSPT))
+
+        if self._cooldown:
+            self._cooldown -= 1
+            return None
+        action = None
+        if bad:
+            self._good_windows = 0
+            action = "lower"
+        elif good:
+            self._good_windows += 1
+            if self._good_windows >= RAISE_AFTER:
+                action = "raise"
+        else:
+            self._good_windows = 0
+        if not action:
+            return None
+        target = self._target(action)
+        if not target:
+            return None
+
+        base = self.pending or None
+        decision = Decision(
+            time=time.time(), action=action,
+            view_from=base.view_to if base else self.view, sim_from=base.sim_to if base else self.sim,
+            view_to=target[0], sim_to=target[1], reason=stats.describe(), metrics=asdict(stats))
+        self.pending = decision
+        self._good_windows = 0
+        self._cooldown = COOLDOWN_WINDOWS
+        self._log("decision", asdict(decision))
+        return decision
+
+    def live_commands(self) -> List[str]:
+        """Comandos de consola para aplicar la decisión pendiente en caliente (si hay plantilla)."""
+        if not self.pending or not self.config.live_command:
+            return []
+        cmd = self.config.live_command.format(view=self.pending.view_to, sim=self.pending.sim_to)
+        self.mark_applied("live")
+        return [cmd]
+
+    def apply_pending(self) -> Optional[Decision]:
+        """Escribe la decisión pendiente en server.properties (antes de arrancar el servidor)."""
+        decision = self.pending
+        if not decision:
+            return None
+        ConfigManager.set_properties(self.server_dir, {
+            "view-distance": str(decision.view_to),
+            "simulation-distance": str(decision.sim_to),
+        })
+        self.mark_applied("restart")
+        return decision
+
+    def mark_applied(self, how: str):
+        decision = self.pending
+        self.view, self.sim = decision.view_to, decision.sim_to
+        self.pending = None
+        self._awaiting_effect = decision
+        # El cooldown cuenta desde que el cambio está activo, no desde la decisión
+        self._good_windows = 0
+        self._cooldown = COOLDOWN_WINDOWS
+        self._log("applied", {"how": how, "view": self.view, "sim": self.sim})
+
+    def _log_effect(self, stats: WindowStats):
+        """Primera ventana medida tras aplicar una decisión: registra antes/después."""
+        decision = self._awaiting_effect
+        if not decision:
+            return
+        self._awaiting_effect = None
+        self._log("effect", {"decision_time": decision.time, "view": self.view, "sim": self.sim,
+                             "before": decision.metrics, "after": asdict(stats)})
+
+    def _log(self, event: str, data: Dict):
+        path = os.path.join(self.server_dir, LOG_FILE)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "a") as f:
+                f.write(json.dumps({"time": time.time(), "event": event, **data}) + "\n")
+        except OSError:
+            pass
+
+
+def load_pending(server_dir: str) -> Optional[Decision]:
+    """Última decisión registrada que todavía no se aplicó (sobrevive a cerrar la app)."""
+    pending = None
+    try:
+        with open(os.path.join(server_dir, LOG_FILE), "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry.get("event") == "decision":
+                    entry.pop("event")
+                    pending = Decision(**{k: v for k, v in entry.items() if k in Decision.__dataclass_fields__})
+                elif entry.get("event") == "applied":
+                    pending = None
+    except OSError:
+        pass
+    return pending
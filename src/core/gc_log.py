@@ -0,0 +1,365 @@
+"""Captura y análisis del log de GC unificado de la JVM (-Xlog:gc*).
+
+Con `--gc-log` (o `KCMC_GC_LOG=1`) el servidor se lanza con
+`-Xlog:gc*:file=logs/gc.log:...` y rotación. Un tailer incremental lee solo los bytes nuevos y alimenta
+`GCStats`, que construye series temporales de:
+  - pausas (histograma por tramos de ms, p50/p95/máx, tiempo en GC)
+  - tasa de asignación (MB/s entre GCs consecutivos)
+  - heap tras cada GC (estimación del live set)
+  - fallos de promoción / evacuación y GCs completos
+
+Con esos datos `recommendations()` sugiere heap y colector, y
+`pi_profile.get_java_args` elige G1 o SerialGC con `choose_collector`: solo
+cuentan las pausas medidas con SerialGC (el log dice qué colector las
+produjo) y la elección de G1 se guarda en `.kcmc/gc-collector.json` para
+ese heap, así que una ejecución con G1 y pausas cortas no devuelve el
+servidor a SerialGC.
+"""
+
+import json
+import os
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Tuple
+
+GC_LOG_ENV = "KCMC_GC_LOG"
+GC_LOG_FILECOUNT = 5
+GC_LOG_FILESIZE = "10M"
+CHOICE_FILE = os.path.join(".kcmc", "gc-collector.json")
+
+# Tramos del histograma de pausas (ms). El último cubre todo lo que exceda.
+PAUSE_BUCKETS_MS = (5, 10, 20, 50, 100, 200, 500)
+
+# Un tick dura 50 ms: pausas por encima se comen ticks enteros.
+TICK_MS = 50.0
+
+_LINE_RE = re.compile(
+    r"^\[(?P<uptime>\d+(?:\.\d+)?)s\]\[(?P<level>\w+)\s*\]\[(?P<tags>[\w,]+)\s*\]\s?(?P<msg>.*)$"
+)
+_PAUSE_RE = re.compile(
+    r"GC\((?P<id>\d+)\) (?P<kind>Pause .*?) "
+    r"(?P<before>\d+)(?P<bu>[KMG])->(?P<after>\d+)(?P<au>[KMG])"
+    r"\((?P<cap>\d+)(?P<cu>[KMG])\) (?P<ms>\d+(?:\.\d+)?)ms"
+)
+_USING_RE = re.compile(r"^Using (?P<name>[A-Z][\w ]*?)\s*$")
+_FAILURE_RE = re.compile(r"GC\((?P<id>\d+)\).*(promotion failed|to-space exhausted|evacuation failure)",
+                         re.IGNORECASE)
+
+_UNIT_MB = {"K": 1.0 / 1024, "M": 1.0, "G": 1024.0}
+
+
+def enabled() -> bool:
+    """Logging de GC activado (`--gc-log` o KCMC_GC_LOG=1)."""
+    return os.environ.get(GC_LOG_ENV) == "1"
+
+
+def gc_log_args(log_path: str, filecount: int = GC_LOG_FILECOUNT,
+                filesize: str = GC_LOG_FILESIZE) -> str:
+    """Flag de logging unificado de GC con rotación."""
+    return (f"-Xlog:gc*:file={log_path}:uptime,level,tags:"
+            f"filecount={filecount},filesize={filesize}")
+
+
+@dataclass
+class GCPause:
+    uptime: float
+    gc_id: int
+    kind: str
+    pause_ms: float
+    before_mb: float
+    after_mb: float
+    capacity_mb: float
+
+    @property
+    def is_full(self) -> bool:
+        return self.kind.startswith("Pause Full")
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+class GCStats:
+    """Series temporales de GC construidas línea a línea."""
+
+    def __init__(self, max_samples: int = 500):
+        self.pauses: Deque[GCPause] = deque(maxlen=max_samples)
+        self.heap_after: Deque[Tuple[float, float]] = deque(maxlen=max_samples)
+        self.alloc_rate: Deque[Tuple[float, float]] = deque(maxlen=max_samples)
+        self.histogram: List[int] = [0] * (len(PAUSE_BUCKETS_MS) + 1)
+        self.promotion_failures = 0
+        self.full_gcs = 0
+        self.total_pause_ms = 0.0
+        self.first_uptime: Optional[float] = None
+        self.last_uptime: Optional[float] = None
+        self.collector: Optional[str] = None  # "Serial", "G1", "Parallel"...
+        self._failed_ids = set()
+        self._last_pause: Optional[GCPause] = None
+
+    @classmethod
+    def from_file(cls, path: str) -> Optional["GCStats"]:
+        """Analiza un log completo (p.ej. el de la ejecución anterior). None si no existe."""
+        if not os.path.exists(path):
+            return None
+        stats = cls()
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    stats.feed(line)
+        except OSError:
+            return None
+        return stats if stats.pauses else None
+
+    def feed(self, line: str) -> Optional[GCPause]:
+        """Procesa una línea del log. Devuelve la pausa si la línea era una."""
+        m = _LINE_RE.match(line.strip())
+        if not m:
+            return None
+        uptime = float(m.group("uptime"))
+        if self.first_uptime is None:
+            self.first_uptime = uptime
+        self.last_uptime = uptime
+        msg = m.group("msg")
+        self._detect_collector(m.group("tags"), msg)
+
+        failure = _FAILURE_RE.search(msg)
+        if failure and failure.group("id") not in self._failed_ids:
+            self._failed_ids.add(failure.group("id"))
+            self.promotion_failures += 1
+
+        p = _PAUSE_RE.search(msg)
+        if not p:
+            return None
+        pause = GCPause(
+            uptime=uptime,
+            gc_id=int(p.group("id")),
+            kind=p.group("kind").strip(),
+            pause_ms=float(p.group("ms")),
+            before_mb=int(p.group("before")) * _UNIT_MB[p.group("bu")],
+            after_mb=int(p.group("after")) * _UNIT_MB[p.group("au")],
+            capacity_mb=int(p.group("cap")) * _UNIT_MB[p.group("cu")],
+        )
+        self._record(pause)
+        return pause
+
+    def _detect_collector(self, tags: str, msg: str):
+        """'[gc] Using Serial' al arrancar; tras una rotación, por los nombres de las generaciones."""
+        using = _USING_RE.match(msg) if tags == "gc" else None
+        if using:
+            self.collector = using.group("name")
+        elif self.collector is None:
+            if "DefNew" in msg or "Tenured" in msg:
+                self.collector = "Serial"
+            elif "G1 " in msg:
+                self.collector = "G1"
+            elif "PSYoungGen" in msg:
+                self.collector = "Parallel"
+
+    def _record(self, pause: GCPause):
+        self.pauses.append(pause)
+        self.heap_after.append((pause.uptime, pause.after_mb))
+        self.total_pause_ms += pause.pause_ms
+        if pause.is_full:
+            self.full_gcs += 1
+
+        bucket = len(PAUSE_BUCKETS_MS)
+        for i, limit in enumerate(PAUSE_BUCKETS_MS):
+            if pause.pause_ms < limit:
+                bucket = i
+                break
+        self.histogram[bucket] += 1
+
+        # Asignado entre el final del GC anterior y el inicio de este
+        prev = self._last_pause
+        if prev and pause.uptime > prev.uptime and pause.before_mb >= prev.after_mb:
+            rate = (pause.before_mb - prev.after_mb) / (pause.uptime - prev.uptime)
+            self.alloc_rate.append((pause.uptime, rate))
+        self._last_pause = pause
+
+    # ------------------------------------------------------------------
+    # Resumen y recomendaciones
+    # ------------------------------------------------------------------
+
+    def pause_percentile(self, pct: float) -> float:
+        return _percentile([p.pause_ms for p in self.pauses], pct)
+
+    def live_set_mb(self) -> float:
+        """Estimación del live set: heap tras GC completo, o p90 del heap tras GC."""
+        full = [p.after_mb for p in self.pauses if p.is_full]
+        if full:
+            return max(full[-5:])
+        return _percentile([a for _, a in self.heap_after], 90)
+
+    def gc_time_percent(self) -> float:
+        if self.first_uptime is None or self.last_uptime is None:
+            return 0.0
+        span = self.last_uptime - self.first_uptime
+        if span <= 0:
+            return 0.0
+        return 100.0 * (self.total_pause_ms / 1000.0) / span
+
+    def summary(self) -> Dict:
+        rates = [r for _, r in self.alloc_rate]
+        return {
+            "pauses": len(self.pauses),
+            "p50_ms": self.pause_percentile(50),
+            "p95_ms": self.pause_percentile(95),
+            "max_ms": max((p.pause_ms for p in self.pauses), default=0.0),
+            "gc_time_percent": self.gc_time_percent(),
+            "alloc_rate_mb_s": sum(rates) / len(rates) if rates else 0.0,
+            "live_set_mb": self.live_set_mb(),
+            "full_gcs": self.full_gcs,
+            "promotion_failures": self.promotion_failures,
+            "histogram": dict(zip(self.histogram_labels(), self.histogram)),
+        }
+
+    @staticmethod
+    def histogram_labels() -> List[str]:
+        labels = [f"<{limit}ms" for limit in PAUSE_BUCKETS_MS]
+        labels.append(f">={PAUSE_BUCKETS_MS[-1]}ms")
+        return labels
+
+    def prefers_g1(self) -> bool:
+        """True si las pausas medidas con SerialGC se comen ticks.
+
+        Con heaps pequeños SerialGC es lo más eficiente, pero si el p95 de
+        pausa supera dos ticks (100 ms) G1 compensa su coste de CPU. Las
+        pausas de otro colector no dicen nada de SerialGC.
+        """
+        if self.collector != "Serial" or len(self.pauses) < 5:
+            return False
+        return self.pause_percentile(95) >= 2 * TICK_MS
+
+    def recommended_heap_mb(self, current_mb: int) -> int:
+        """Heap sugerido: ~3x el live set, sin bajar de 256 MB, múltiplo de 64."""
+        live = self.live_set_mb()
+        if live <= 0:
+            return current_mb
+        target = int(live * 3)
+        if self.full_gcs or self.promotion_failures or self.gc_time_percent() > 10:
+            target = max(target, int(current_mb * 1.25))
+        target = max(256, (target // 64) * 64)
+        return target
+
+    def recommendations(self, current_mb: int) -> List[str]:
+        """Recomendaciones legibles a partir de los datos medidos."""
+        if not self.pauses:
+            return ["Sin datos de GC todavía."]
+        recs = []
+        s = self.summary()
+        target = self.recommended_heap_mb(current_mb)
+        if s["promotion_failures"]:
+            recs.append(f"{s['promotion_failures']} fallo(s) de promoción/evacuación: "
+                        f"el heap se queda corto, sube a ~{target}M.")
+        if s["full_gcs"]:
+            recs.append(f"{s['full_gcs']} GC completo(s): congelan el servidor, sube el heap a ~{target}M.")
+        if s["gc_time_percent"] > 10:
+            recs.append(f"{s['gc_time_percent']:.0f}% del tiempo en pausas de GC: heap insuficiente.")
+        if target > current_mb * 1.1:
+            recs.append(f"Live set ~{s['live_set_mb']:.0f} MB: heap recomendado {target}M (actual {current_mb}M).")
+        elif target < current_mb * 0.5 and not s["full_gcs"]:
+            recs.append(f"Live set ~{s['live_set_mb']:.0f} MB: {target}M bastarían y liberan RAM al sistema.")
+        if self.prefers_g1():
+            recs.append(f"p95 de pausa {s['p95_ms']:.0f} ms (> 2 ticks): conviene G1GC.")
+        elif s["max_ms"] >= TICK_MS:
+            recs.append(f"Pausa máxima {s['max_ms']:.0f} ms: algún tick perdido, aceptable si es esporádico.")
+        if not recs:
+            recs.append(f"GC sano: p95 {s['p95_ms']:.0f} ms, {s['gc_time_percent']:.1f}% del tiempo en pausas.")
+        return recs
+
+
+def choose_collector(stats: Optional[GCStats], heap_mb: int,
+                     server_dir: Optional[str] = None) -> Optional[str]:
+    """'G1' si las pausas medidas con SerialGC lo piden o ya lo pidieron con este heap.
+
+    None deja la elección por tamaño de heap de `get_java_args`. La decisión
+    se guarda en `server_dir/.kcmc/gc-collector.json` y solo se descarta al
+    cambiar el heap (lo medido con otro heap ya no vale).
+    """
+    path = os.path.join(server_dir, CHOICE_FILE) if server_dir else None
+    if stats is not None and stats.prefers_g1():
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump({"collector": "G1", "heap_mb": heap_mb,
+                               "p95_ms": round(stats.pause_percentile(95), 1)}, f)
+            except OSError:
+                pass
+        return "G1"
+    if path:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                choice = json.load(f)
+            if choice.get("heap_mb") == heap_mb:
+                return choice.get("collector")
+        except (OSError, ValueError, AttributeError):
+            pass
+    return None
+
+
+class GCLogTailer:
+    """Lee incrementalmente el log de GC, tolerando rotación y líneas parciales."""
+
+    def __init__(self, path: str, stats: Optional[GCStats] = None):
+        self.path = path
+        self.stats = stats or GCStats()
+        self._offset = 0
+        self._inode: Optional[int] = None
+        self._partial = ""
+
+    def poll(self) -> List[GCPause]:
+        """Procesa lo escrito desde la última llamada. Devuelve las pausas nuevas."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return []
+        if st.st_ino != self._inode or st.st_size < self._offset:
+            # Archivo nuevo o rotado (la JVM renombra gc.log -> gc.log.N)
+            self._inode = st.st_ino
+            self._offset = 0
+            self._partial = ""
+        if st.st_size == self._offset:
+            return []
+
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read()
+        except OSError:
+            return []
+        self._offset += len(data)
+
+        text = self._partial + data.decode("utf-8", errors="replace")
+        lines = text.split("\n")
+        self._partial = lines.pop()
+        pauses = []
+        for line in lines:
+            pause = self.stats.feed(line)
+            if pause:
+                pauses.append(pause)
+        return pauses
+
+
+def format_report(stats: Optional[GCStats], current_mb: int) -> List[str]:
+    """Resumen en texto plano (sin markup) para la TUI/GUI."""
+    if not stats or not stats.pauses:
+        if not enabled():
+            return ["Log de GC desactivado: arranca con --gc-log (o KCMC_GC_LOG=1) para medir pausas."]
+        return ["Sin datos de GC todavía (el log se llena con las primeras pausas)."]
+    s = stats.summary()
+    lines = [f"Colector: {stats.collector}"] if stats.collector else []
+    lines += [
+        f"Pausas: {s['pauses']} | p50 {s['p50_ms']:.1f} ms | p95 {s['p95_ms']:.1f} ms | máx {s['max_ms']:.1f} ms",
+        f"Tiempo en GC: {s['gc_time_percent']:.1f}% | asignación {s['alloc_rate_mb_s']:.1f} MB/s"
+        f" | live set ~{s['live_set_mb']:.0f} MB",
+        f"GC completos: {s['full_gcs']} | fallos de promoción: {s['promotion_failures']}",
+        "Histograma: " + "  ".join(f"{k}:{v}" for k, v in s["histogram"].items() if v),
+    ]
+    lines += [f"→ {rec}" for rec in stats.recommendations(current_mb)]
+    return lines
@@ -0,0 +1,169 @@
+"""Caché en disco de respuestas JSON de las APIs (PaperMC, GeyserMC, GitHub).
+
+`http_client.get_json` hacía un GET completo en cada instalación, comprobación
+de actualizaciones y apertura de diálogo (la GUI pide las versiones cada vez
+que cambia el desplegable de proyecto). Cada respuesta se guarda por URL,
+con su ETag / Last-Modified, en `~/.cache/kcmc/http/<sha256(url)>.json`
+(`paths.cache_dir`, compartido por todas las instancias del usuario):
+
+  - fresca (dentro de max_age): se devuelve sin red
+  - caducada: petición condicional; un 304 solo renueva la marca de tiempo
+    (en GitHub los 304 no consumen cuota del rate limit)
+  - stale-while-revalidate: la UI recibe la copia caducada al instante y la
+    revalidación se hace en segundo plano
+  - sin red o con rate limit: se sirve la copia caducada
+
+La frescura lleva un jitter de hasta +20% para que muchos hosts con el mismo
+TTL no revaliden a la vez. Si una API responde 403/429 con la cuota agotada,
+el host queda bloqueado hasta `X-RateLimit-Reset` / `Retry-After`.
+El tamaño total se limita a MAX_BYTES expulsando las entradas menos usadas
+(LRU por mtime, que se actualiza en cada acierto).
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+from src.core.paths import cache_dir
+
+MAX_BYTES = 8 * 1024 * 1024
+TTL_JITTER = 0.2
+BLOCKS_FILE = "_blocked.json"
+
+_lock = threading.Lock()
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    body: str
+    stored_at: float
+    jitter: float = 1.0
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+    def is_fresh(self, max_age: float) -> bool:
+        return max_age > 0 and self.age() < max_age * self.jitter
+
+    def validators(self) -> Dict[str, str]:
+        """Cabeceras de petición condicional."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = MAX_BYTES):
+        self.directory = directory or cache_dir("http")
+        self.max_bytes = max_bytes
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode()).hexdigest() + ".json")
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        path = self._path(url)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = CacheEntry(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+        try:
+            os.utime(path)  # LRU
+        except OSError:
+            pass
+        return entry
+
+    def put(self, url: str, body: str, etag: Optional[str] = None,
+            last_modified: Optional[str] = None) -> CacheEntry:
+        entry = CacheEntry(url=url, body=body, stored_at=time.time(),
+                           jitter=1.0 + random.uniform(0, TTL_JITTER),
+                           etag=etag, last_modified=last_modified)
+        self._write(entry)
+        self._evict()
+        return entry
+
+    def touch(self, entry: CacheEntry) -> CacheEntry:
+        """Tras un 304: la copia vuelve a ser fresca."""
+        entry.stored_at = time.time()
+        self._write(entry)
+        return entry
+
+    def _write(self, entry: CacheEntry):
+        path = self._path(entry.url)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(asdict(entry), f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def _evict(self):
+        with _lock:
+            try:
+                files = [e for e in os.scandir(self.directory)
+                         if e.name.endswith(".json") and e.name != BLOCKS_FILE]
+            except OSError:
+                return
+            stats = []
+            for e in files:
+                try:
+                    st = e.stat()
+                except OSError:
+                    continue  # otro proceso la borró entre scandir y stat
+                stats.append((st.st_mtime, st.st_size, e.path))
+            stats.sort()
+            total = sum(size for _, size, _ in stats)
+            for _, size, path in stats:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+    # -- Rate limit por host -----------------------------------------------
+
+    def _blocks(self) -> Dict[str, float]:
+        try:
+            with open(os.path.join(self.directory, BLOCKS_FILE), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def blocked_until(self, host: str) -> float:
+        """Epoch hasta el que no hay que llamar a `host` (0 si no está bloqueado)."""
+        until = self._blocks().get(host, 0)
+        return until if until > time.time() else 0
+
+    def block(self, host: str, until: float):
+        with _lock:
+            blocks = {h: t for h, t in self._blocks().items() if t > time.time()}
+            blocks[host] = until
+            try:
+                with open(os.path.join(self.directory, BLOCKS_FILE), "w") as f:
+                    json.dump(blocks, f)
+            except OSError:
+                pass
+
+
+_cache: Optional[HttpCache] = None
+
+
+def get_cache() -> HttpCache:
+    global _cache
+    if _cache is None:
+        _cache = HttpCache()
+    return _cache
@@ -2,72 +2,1262 @@
 
 Reemplaza a `requests`/`aiohttp` para reducir drásticamente la huella de
 memoria y el tiempo de arranque en hardware de bajos recursos (Pi 3B+).
-Incluye reintentos con backoff, ideal para redes WiFi inestables.
+Incluye reintentos con backoff, ideal para redes WiFi inestables, y caché
+de respuestas JSON con revalidación condicional (`http_cache`).
+
+Las conexiones se reutilizan (keep-alive) con un pool pequeño por host:
+una instalación hace varias llamadas seguidas a fill.papermc.io y cada
+`urlopen` pagaba un handshake TLS nuevo, cientos de ms en WiFi de una Pi.
+Hay dos transportes con la misma semántica de caché y reintentos:
+  - síncrono (`get_json`, `download`): `http.client` con pool thread-safe
+  - asyncio (`get_json_async`, `download_async`): streams de asyncio con
+    pool por event loop, para la TUI sin hilos de trabajo
+Con un mirror configurado (`mirror`) todas las URLs se resuelven contra él.
 """
 
+import asyncio
+import concurrent.futures
+import email.message
+import hashlib
+import http.client
 import json
 import os
+import ssl
+import threading
 import time
-import urllib.error
-import urllib.request
+import urllib.parse
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+from src.core import http_cache, mirror
 
 USER_AGENT = "KubeControlMC/1.0 (https://github.com/bm0x/KubeControlMC)"
+POOL_SIZE = 4            # conexiones inactivas por host
+MAX_REDIRECTS = 5
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+_ssl_context: Optional[ssl.SSLContext] = None
+
+
+def _ssl() -> ssl.SSLContext:
+    """Contexto TLS compartido (cargar los certificados del sistema cuesta en una Pi)."""
+    global _ssl_context
+    if _ssl_context is None:
+        _ssl_context = ssl.create_default_context()
+    return _ssl_context
 
 
 class HTTPError(Exception):
     """Error de red o respuesta HTTP no satisfactoria."""
 
 
+class _StatusError(Exception):
+    def __init__(self, status: int, headers):
+        super().__init__(f"HTTP Error {status}")
+        self.status = status
+        self.headers = headers
+
+
+class _RateLimited(Exception):
+    def __init__(self, until: float):
+        super().__init__(f"rate limit hasta {time.strftime('%H:%M', time.localtime(until))}")
+        self.until = until
+
+
+def _rate_limit_until(status: int, headers) -> Optional[float]:
+    """Epoch de fin del rate limit si la respuesta es un 403/429 por cuota, si no None."""
+    if status not in (403, 429):
+        return None
+    retry_after = headers.get("Retry-After") or ""
+    if retry_after.isdigit():
+        return time.time() + int(retry_after)
+    reset = headers.get("X-RateLimit-Reset") or ""
+    if headers.get("X-RateLimit-Remaining") == "0" and reset.isdigit():
+        return float(reset)
+    return time.time() + 60 if status == 429 else None
+
+
+def _check_status(status: int, headers):
+    """Lanza si la respuesta no es 2xx/304."""
+    if status == 304 or 200 <= status < 300:
+        return
+    until = _rate_limit_until(status, headers)
+    if until:
+        raise _RateLimited(until)
+    raise _StatusError(status, headers)
+
+
+def _split(url: str) -> Tuple[Tuple[str, str, int], str]:
+    """((esquema, host, puerto), ruta con query)."""
+    parts = urllib.parse.urlsplit(url)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    return (parts.scheme, parts.hostname, port), path
+
+
+def _backoff(attempt: int) -> float:
+    return min(1.0 * (2 ** attempt), 4.0)
+
+
+# ---------------------------------------------------------------------------
+# Transporte síncrono: pool de http.client
+# ---------------------------------------------------------------------------
+
+def _new_connection(key, timeout: float) -> http.client.HTTPConnection:
+    scheme, host, port = key
+    if scheme == "https":
+        return http.client.HTTPSConnection(host, port, timeout=timeout, context=_ssl())
+    return http.client.HTTPConnection(host, port, timeout=timeout)
+
+
+class ConnectionPool:
+    """Conexiones `http.client` inactivas por (esquema, host, puerto)."""
+
+    def __init__(self, size: int = POOL_SIZE):
+        self.size = size
+        self._idle: Dict[Tuple[str, str, int], List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key, timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+        """(conexión, reutilizada)."""
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                conn = idle.pop()
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+        return _new_connection(key, timeout), False
+
+    def release(self, key, conn: http.client.HTTPConnection):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.size:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close_all(self):
+        with self._lock:
+            conns = [c for idle in self._idle.values() for c in idle]
+            self._idle.clear()
+        for conn in conns:
+            conn.close()
+
+
+_pool = ConnectionPool()
+
+
+class _Response:
+    """Respuesta en curso; devuelve la conexión al pool al leerse entera."""
+
+    def __init__(self, key, conn, resp: http.client.HTTPResponse):
+        self.key, self.conn, self.resp = key, conn, resp
+        self.status = resp.status
+        self.headers = resp.headers
+
+    def read(self) -> bytes:
+        data = self.resp.read()
+        self.release()
+        return data
+
+    def iter_chunks(self, chunk_size: int):
+        while True:
+            chunk = self.resp.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+        # read(amt) no avisa si la conexión se corta antes de Content-Length
+        if self.resp.length:
+            self.close()
+            raise http.client.IncompleteRead(b"", self.resp.length)
+        self.release()
+
+    def release(self):
+        if self.resp.will_close or not self.resp.isclosed():
+            self.close()
+        else:
+            _pool.release(self.key, self.conn)
+
+    def close(self):
+        self.conn.close()
+
+
+def _send(url: str, headers: dict, timeout: float) -> _Response:
+    """GET siguiendo redirecciones; reintenta una vez si una conexión reutilizada estaba muerta."""
+    for _ in range(MAX_REDIRECTS + 1):
+        key, path = _split(url)
+        host_header = key[1] if key[2] in (80, 443) else f"{key[1]}:{key[2]}"
+        req_headers = {"Host": host_header, "User-Agent": USER_AGENT, **headers}
+        conn, reused = _pool.acquire(key, timeout)
+        try:
+            conn.request("GET", path, headers=req_headers)
+            resp = conn.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            if not reused:
+                raise
+            conn = _new_connection(key, timeout)
+            try:
+                conn.request("GET", path, headers=req_headers)
+                resp = conn.getresponse()
+            except BaseException:
+                conn.close()
+                raise
+        except BaseException:
+            conn.close()
+            raise
+        response = _Response(key, conn, resp)
+        location = resp.headers.get("Location")
+        if resp.status in REDIRECT_CODES and location:
+            response.read()
+            url = urllib.parse.urljoin(url, location)
+            # Las validaciones son del recurso original
+            headers = {k: v for k, v in headers.items() if not k.startswith("If-")}
+            continue
+        response.url = url  # URL final tras redirecciones
+        return response
+    raise HTTPError(f"Demasiadas redirecciones: {url}")
+
+
+_NETWORK_ERRORS = (http.client.HTTPException, OSError, _StatusError)
+
+
 def _open(url: str, timeout: float, retries: int, headers: dict):
+    """GET con reintentos. Devuelve (status, cabeceras, cuerpo); un 304 no es error."""
     last_error = None
     for attempt in range(retries + 1):
         try:
-            req = urllib.request.Request(url, headers=headers)
-            with urllib.request.urlopen(req, timeout=timeout) as resp:
-                return resp.read()
-        except (urllib.error.URLError, urllib.error.HTTPError,
-                TimeoutError, OSError) as e:
+            response = _send(url, headers, timeout)
+            try:
+                _check_status(response.status, response.headers)
+            except Exception:
+                response.close()
+                raise
+            return response.status, response.headers, response.read()
+        except _NETWORK_ERRORS as e:
             last_error = e
-            if attempt < retries:
-                time.sleep(min(1.0 * (2 ** attempt), 4.0))
+        if attempt < retries:
+            time.sleep(_backoff(attempt))
     raise HTTPError(str(last_error)) from last_error
 
 
-def get_json(url: str, timeout: float = 30, retries: int = 2) -> dict:
-    """GET y parsea JSON con timeout y reintentos."""
-    data = _open(url, timeout, retries, {
-        "Accept": "application/json",
-        "User-Agent": USER_AGENT,
-    })
+# ---------------------------------------------------------------------------
+# Caché (común a ambos transportes)
+# ---------------------------------------------------------------------------
+
+def _parse(url: str, body: str):
     try:
-        return json.loads(data.decode("utf-8"))
-    except (ValueError, UnicodeDecodeError) as e:
+        return json.loads(body)
+    except ValueError as e:
         raise HTTPError(f"JSON inválido desde {url}: {e}") from e
 
 
+def _json_headers(entry) -> dict:
+    headers = {"Accept": "application/json"}
+    if entry:
+        headers.update(entry.validators())
+    return headers
+
+
+def _store(url: str, entry, status: int, headers, data: bytes):
+    """Actualiza la caché con la respuesta y devuelve el JSON."""
+    cache = http_cache.get_cache()
+    if status == 304 and entry:
+        return _parse(url, cache.touch(entry).body)
+    try:
+        body = data.decode("utf-8")
+    except UnicodeDecodeError as e:
+        raise HTTPError(f"JSON inválido desde {url}: {e}") from e
+    parsed = _parse(url, body)
+    cache.put(url, body, etag=headers.get("ETag"), last_modified=headers.get("Last-Modified"))
+    return parsed
+
+
+def _lookup(url: str, max_age: float, stale_ok: bool):
+    """Decide qué hacer con la caché: ("hit", json), ("stale", entry) o ("fetch", entry)."""
+    cache = http_cache.get_cache()
+    entry = cache.get(url)
+    if entry and entry.is_fresh(max_age):
+        return "hit", _parse(url, entry.body)
+    host = urllib.parse.urlsplit(url).netloc
+    blocked = cache.blocked_until(host)
+    if entry and blocked:
+        return "hit", _parse(url, entry.body)
+    if entry and stale_ok:
+        return "stale", entry
+    if blocked:
+        until = time.strftime("%H:%M", time.localtime(blocked))
+        raise HTTPError(f"{host}: rate limit hasta {until}")
+    return "fetch", entry
+
+
+def _rate_limited(url: str, e: _RateLimited) -> HTTPError:
+    host = urllib.parse.urlsplit(url).netloc
+    http_cache.get_cache().block(host, e.until)
+    return HTTPError(f"{host}: {e}")
+
+
+def _fetch(url: str, timeout: float, retries: int, entry):
+    """Petición (condicional si hay copia) que actualiza la caché. Devuelve el JSON."""
+    try:
+        status, headers, data = _open(url, timeout, retries, _json_headers(entry))
+    except _RateLimited as e:
+        raise _rate_limited(url, e) from e
+    return _store(url, entry, status, headers, data)
+
+
+_revalidating = set()
+_revalidating_lock = threading.Lock()
+
+
+def _claim_revalidation(url: str) -> bool:
+    with _revalidating_lock:
+        if url in _revalidating:
+            return False
+        _revalidating.add(url)
+        return True
+
+
+def _end_revalidation(url: str):
+    with _revalidating_lock:
+        _revalidating.discard(url)
+
+
+def _revalidate_in_thread(url: str, timeout: float, entry):
+    if not _claim_revalidation(url):
+        return
+
+    def run():
+        try:
+            _fetch(url, timeout, 0, entry)
+        except HTTPError:
+            pass
+        finally:
+            _end_revalidation(url)
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+# ---------------------------------------------------------------------------
+# Mirror (común a ambos transportes)
+# ---------------------------------------------------------------------------
+
+def _mirrored(url: str, artifact: bool = False,
+              sha256: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    """(url, ruta local): la URL en el mirror HTTP, o la ruta si el mirror es un directorio.
+
+    Sin mirror devuelve la URL tal cual. Lo que no está en el mirror es un
+    error: en modo mirror nunca se sale a Internet.
+    """
+    m = mirror.get_mirror()
+    if m is None or m.owns(url):
+        return url, None
+    try:
+        target = m.artifact(url, sha256) if artifact else m.document(url)
+    except mirror.MirrorError as e:
+        raise HTTPError(str(e)) from e
+    return (target, None) if m.remote else (url, target)
+
+
+def _read_local_json(url: str, path: str):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return _parse(url, f.read())
+    except OSError as e:
+        raise HTTPError(f"No se pudo leer {path}: {e}") from e
+
+
+def _copy_local(path: str, dest: str, sha256: Optional[str], chunk_size: int) -> str:
+    """Copia verificada desde un mirror en disco (mismo `.part` + rename que una descarga)."""
+    state = _PartialDownload(dest, sha256)
+    state.begin(200, {})
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                state.write(chunk)
+    except OSError as e:
+        state.discard()
+        raise HTTPError(f"No se pudo copiar {path}: {e}") from e
+    return state.finish()
+
+
+def get_json(url: str, timeout: float = 30, retries: int = 2,
+             max_age: float = 0, stale_ok: bool = False) -> dict:
+    """GET y parsea JSON con timeout, reintentos y caché en disco (`http_cache`).
+
+    max_age:  segundos durante los que la copia en caché se usa sin red.
+              Con 0 siempre se revalida (condicional: ETag / Last-Modified).
+    stale_ok: stale-while-revalidate; una copia caducada se devuelve al
+              instante y se revalida en segundo plano (para la UI).
+    Sin red o con rate limit se devuelve la copia caducada si existe.
+    """
+    url, local = _mirrored(url)
+    if local:
+        return _read_local_json(url, local)
+    action, value = _lookup(url, max_age, stale_ok)
+    if action == "hit":
+        return value
+    if action == "stale":
+        _revalidate_in_thread(url, timeout, value)
+        return _parse(url, value.body)
+    try:
+        return _fetch(url, timeout, retries, value)
+    except HTTPError:
+        if value:
+            return _parse(url, value.body)
+        raise
+
+
+class ChecksumError(HTTPError):
+    """El archivo descargado no coincide con el SHA-256 esperado."""
+
+
+def _strong_validator(value: Optional[str]) -> bool:
+    """If-Range no admite ETags débiles (W/...); con ellos el servidor respondería 200."""
+    return bool(value) and not value.startswith("W/")
+
+
+class _PartialDownload:
+    """Estado de una descarga reanudable en `<dest>.part`.
+
+    El SHA-256 se calcula sobre los bloques a medida que llegan; solo un
+    `.part` heredado de otra ejecución se relee una vez para sembrar el hash.
+    Tras un corte se pide `Range: bytes=N-` con `If-Range` (ETag o
+    Last-Modified de la primera respuesta) para no mezclar dos versiones.
+    El validador se guarda en `<dest>.part.json`; un `.part` heredado sin
+    validador fuerte no se reanuda (se empieza de cero).
+    """
+
+    def __init__(self, dest: str, sha256: Optional[str]):
+        self.dest = dest
+        self.part = dest + ".part"
+        self.sidecar = self.part + ".json"
+        self.expected = sha256.lower() if sha256 else None
+        self.hasher = hashlib.sha256()
+        self.size = 0
+        self.validator: Optional[str] = None
+        self.file = None
+        if os.path.exists(self.part):
+            self.validator = self._load_validator()
+            if not _strong_validator(self.validator):
+                self.discard()
+                return
+            with open(self.part, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    self.hasher.update(block)
+                    self.size += len(block)
+
+    def _load_validator(self) -> Optional[str]:
+        try:
+            with open(self.sidecar, "r", encoding="utf-8") as f:
+                return json.load(f).get("validator")
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def _save_validator(self):
+        if not _strong_validator(self.validator):
+            return
+        tmp = self.sidecar + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"validator": self.validator}, f)
+        os.replace(tmp, self.sidecar)
+
+    def request_headers(self) -> dict:
+        if not self.size:
+            return {}
+        headers = {"Range": f"bytes={self.size}-"}
+        if _strong_validator(self.validator):
+            headers["If-Range"] = self.validator
+        return headers
+
+    def begin(self, status: int, headers) -> bool:
+        """Prepara la escritura según la respuesta. False si ya estaba completo (416)."""
+        if status == 416 and self.size:
+            # El .part ya tiene todo lo que el servidor puede dar
+            return False
+        _check_status(status, headers)
+        append = status == 206 and self.size
+        if not append:
+            # 200: el servidor ignoró el Range (o el archivo cambió, o empezamos de cero)
+            self.hasher = hashlib.sha256()
+            self.size = 0
+            self.validator = headers.get("ETag") or headers.get("Last-Modified")
+            self._remove_sidecar()
+        self.file = open(self.part, "ab" if append else "wb")
+        if not append:
+            self._save_validator()
+        return True
+
+    def write(self, chunk: bytes):
+        self.file.write(chunk)
+        self.hasher.update(chunk)
+        self.size += len(chunk)
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def finish(self) -> str:
+        """Verifica el hash y mueve `.part` a su sitio de forma atómica."""
+        self.close()
+        digest = self.hasher.hexdigest()
+        if self.expected and digest != self.expected:
+            self.discard()
+            raise ChecksumError(f"SHA-256 no coincide para {os.path.basename(self.dest)}: "
+                                f"esperado {self.expected}, obtenido {digest}")
+        with open(self.part, "rb+") as f:
+            os.fsync(f.fileno())
+        os.replace(self.part, self.dest)
+        self._remove_sidecar()
+        return self.dest
+
+    def _remove_sidecar(self):
+        try:
+            os.remove(self.sidecar)
+        except OSError:
+            pass
+
+    def discard(self):
+        self.close()
+        self.hasher = hashlib.sha256()
+        self.size = 0
+        self.validator = None
+        self._remove_sidecar()
+        try:
+            os.remove(self.part)
+        except OSError:
+            pass
+
+
+# ---------------------------------------------------------------------------
+# Descargas segmentadas (Range en paralelo)
+# ---------------------------------------------------------------------------
+
+SEGMENTS = 4                          # segmentos concurrentes por descarga
+MIN_SEGMENT_BYTES = 2 * 1024 * 1024   # por debajo no compensa abrir más conexiones
+PROBE_BYTES = 65536                   # la sonda ya trae el primer bloque
+SEGMENTS_SUFFIX = ".segments"         # archivo preasignado de la descarga segmentada
+SIDECAR_SUFFIX = ".segments.json"     # rangos terminados de ese archivo
+SIDECAR_INTERVAL = 1.0                # segundos entre guardados del sidecar
+
+
+class _SegmentsUnsupported(Exception):
+    """El servidor no sirve rangos (o dejó de hacerlo): se usa un único stream."""
+
+
+def _content_range_total(headers) -> Optional[int]:
+    """Tamaño total de 'Content-Range: bytes 0-0/12345', o None."""
+    value = headers.get("Content-Range") or ""
+    total = value.rpartition("/")[2]
+    return int(total) if total.isdigit() else None
+
+
+class _SegmentedFile:
+    """Archivo `<dest>.segments` preasignado que varios segmentos escriben con `os.pwrite`.
+
+    El SHA-256 de extremo a extremo se va calculando en orden: cada vez que
+    un segmento escribe, el cursor de hash avanza sobre los bytes ya
+    contiguos desde el principio (releídos con `os.pread` al momento, aún en
+    la caché de páginas), de modo que al terminar el último segmento el
+    digest está listo sin una pasada extra por el archivo.
+
+    Al estar preasignado su tamaño no dice cuánto se ha bajado, así que no
+    comparte nombre con el `.part` de un solo stream (que lo daría por
+    completo). Lo terminado de cada rango se guarda en `<dest>.segments.json`
+    (tras un fsync de los datos, como mucho una vez por segundo): una
+    descarga cortada, o un proceso matado, sigue desde ahí si el servidor
+    sirve el mismo archivo (tamaño y validador fuerte); si no, se empieza de
+    cero.
+    """
+
+    def __init__(self, dest: str, total: int, count: int, sha256: Optional[str],
+                 validator: Optional[str] = None):
+        self.dest = dest
+        self.part = dest + SEGMENTS_SUFFIX
+        self.sidecar = dest + SIDECAR_SUFFIX
+        self.total = total
+        self.validator = validator
+        self.expected = sha256.lower() if sha256 else None
+        self.ranges, self.progress = self._resume()
+        if not any(self.progress):
+            size = -(-total // count)
+            self.ranges = [(start, min(start + size, total) - 1) for start in range(0, total, size)]
+            self.progress = [0] * len(self.ranges)
+        self.fd = os.open(self.part, os.O_RDWR | os.O_CREAT, 0o644)
+        if not any(self.progress):
+            os.ftruncate(self.fd, 0)
+            if hasattr(os, "posix_fallocate"):
+                try:
+                    os.posix_fallocate(self.fd, 0, total)
+                except OSError:
+                    os.ftruncate(self.fd, total)
+            else:
+                os.ftruncate(self.fd, total)
+        self.hasher = hashlib.sha256()
+        self.hashed = 0
+        self._progress_lock = threading.Lock()
+        self._hash_lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._saved_at = time.monotonic()
+        self.aborted = False  # otro segmento falló: los demás paran
+
+    def _resume(self) -> Tuple[List[Tuple[int, int]], List[int]]:
+        """(rangos, avance) del sidecar si es de este mismo archivo; si no, ([], [])."""
+        if not _strong_validator(self.validator):
+            return [], []
+        try:
+            with open(self.sidecar, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if (data["total"] != self.total or data["validator"] != self.validator
+                    or os.path.getsize(self.part) != self.total):
+                return [], []
+            ranges = [(int(start), int(end)) for start, end in data["ranges"]]
+            progress = [int(done) for done in data["progress"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            return [], []
+        # Los rangos tienen que cubrir el archivo entero, sin huecos
+        bounds = [0] + [end + 1 for _, end in ranges]
+        if (not ranges or len(progress) != len(ranges) or bounds[-1] != self.total
+                or any(start != bounds[i] for i, (start, _) in enumerate(ranges))):
+            return [], []
+        return ranges, [min(max(done, 0), end + 1 - start)
+                        for (start, end), done in zip(ranges, progress)]
+
+    def next_offset(self, index: int) -> int:
+        return self.ranges[index][0] + self.progress[index]
+
+    def write(self, index: int, chunk: bytes):
+        if self.aborted:
+            raise HTTPError("Descarga cancelada")
+        start, end = self.ranges[index]
+        offset = start + self.progress[index]
+        chunk = chunk[:end + 1 - offset]
+        while chunk:
+            written = os.pwrite(self.fd, chunk, offset)
+            offset += written
+            chunk = chunk[written:]
+        with self._progress_lock:
+            self.progress[index] = offset - start
+        self._advance_hash()
+        if time.monotonic() - self._saved_at >= SIDECAR_INTERVAL:
+            self.save(blocking=False)
+
+    def save(self, blocking: bool = True):
+        """Guarda el avance en el sidecar, después de llevar los datos a disco."""
+        if not _strong_validator(self.validator):
+            return  # sin validador no se podría reanudar: no se guarda nada
+        if not self._save_lock.acquire(blocking=blocking):
+            return
+        try:
+            if self.fd is None:
+                return
+            with self._progress_lock:
+                progress = list(self.progress)
+            self._saved_at = time.monotonic()
+            os.fsync(self.fd)
+            tmp = self.sidecar + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"total": self.total, "validator": self.validator,
+                           "ranges": self.ranges, "progress": progress}, f)
+            os.replace(tmp, self.sidecar)
+        finally:
+            self._save_lock.release()
+
+    def _contiguous(self) -> int:
+        """Bytes escritos sin huecos desde el inicio del archivo."""
+        with self._progress_lock:
+            for (start, end), done in zip(self.ranges, self.progress):
+                if start + done <= end:
+                    return start + done
+        return self.total
+
+    def _advance_hash(self):
+        # Si otro hilo ya está hasheando, él recogerá estos bytes
+        if not self._hash_lock.acquire(blocking=False):
+            return
+        try:
+            limit = self._contiguous()
+            while self.hashed < limit:
+                block = os.pread(self.fd, min(1 << 20, limit - self.hashed), self.hashed)
+                if not block:
+                    break
+                self.hasher.update(block)
+                self.hashed += len(block)
+        finally:
+            self._hash_lock.release()
+
+    def finish(self) -> str:
+        self._advance_hash()
+        if self.hashed != self.total:
+            self.discard()
+            raise HTTPError(f"Descarga incompleta: {self.hashed}/{self.total} bytes")
+        digest = self.hasher.hexdigest()
+        if self.expected and digest != self.expected:
+            self.discard()
+            raise ChecksumError(f"SHA-256 no coincide para {os.path.basename(self.dest)}: "
+                                f"esperado {self.expected}, obtenido {digest}")
+        os.fsync(self.fd)
+        os.close(self.fd)
+        self.fd = None
+        os.replace(self.part, self.dest)
+        _remove_segmented(self.dest, data=False)
+        return self.dest
+
+    def suspend(self):
+        """Cierra el archivo dejando el avance guardado para reanudar (o lo descarta si no se puede)."""
+        if self.fd is None:
+            return
+        if not _strong_validator(self.validator):
+            self.discard()
+            return
+        try:
+            self.save()
+        except OSError:
+            self.discard()
+            return
+        os.close(self.fd)
+        self.fd = None
+
+    def discard(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+        _remove_segmented(self.dest)
+
+
+def _remove_segmented(dest: str, data: bool = True):
+    """Borra el estado de una descarga segmentada (el sidecar y, con `data`, el archivo)."""
+    for path in ([dest + SEGMENTS_SUFFIX] if data else []) + [dest + SIDECAR_SUFFIX]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _segment_headers(sfile: _SegmentedFile, index: int, validator: Optional[str]) -> dict:
+    headers = {"Range": f"bytes={sfile.next_offset(index)}-{sfile.ranges[index][1]}"}
+    if _strong_validator(validator):
+        headers["If-Range"] = validator
+    return headers
+
+
+def _probe_segments(status: int, headers, segments: int) -> Optional[int]:
+    """Nº de segmentos según la respuesta a la sonda `Range: bytes=0-...` (None = un stream)."""
+    total = _content_range_total(headers) if status == 206 else None
+    if not total or segments < 2:
+        return None
+    count = min(segments, total // MIN_SEGMENT_BYTES)
+    return count if count >= 2 else None
+
+
+def _download_segment(url: str, sfile: _SegmentedFile, index: int, validator: Optional[str],
+                      timeout: float, retries: int, chunk_size: int):
+    failures = 0
+    while sfile.next_offset(index) <= sfile.ranges[index][1]:
+        progress = sfile.progress[index]
+        response = None
+        try:
+            response = _send(url, _segment_headers(sfile, index, validator), timeout)
+            if response.status != 206:
+                raise _SegmentsUnsupported(f"HTTP {response.status} a una petición Range")
+            for chunk in response.iter_chunks(chunk_size):
+                sfile.write(index, chunk)
+            continue
+        except _NETWORK_ERRORS as e:
+            if response:
+                response.close()
+            failures = 0 if sfile.progress[index] > progress else failures + 1
+            if failures > retries:
+                raise HTTPError(f"Segmento {index} fallido: {e}") from e
+        except BaseException:
+            if response:
+                response.close()
+            raise
+        time.sleep(_backoff(failures))
+
+
+def _download_segmented(url: str, dest: str, timeout: float, retries: int, chunk_size: int,
+                        sha256: Optional[str], segments: int) -> Optional[str]:
+    """Descarga en `segments` rangos paralelos.
+
+    Si el servidor ignora el Range (200) su respuesta se aprovecha como stream
+    único. None si hay que seguir por el camino de un solo stream (archivo
+    pequeño: el `.part` ya tiene el primer bloque). Un fallo de red deja el
+    avance guardado (`_SegmentedFile.suspend`) para la siguiente llamada.
+    """
+    probe = _send(url, {"Range": f"bytes=0-{PROBE_BYTES - 1}"}, timeout)
+    count = _probe_segments(probe.status, probe.headers, segments)
+    if count is None:
+        _remove_segmented(dest)  # lo de una ejecución anterior ya no sirve
+        if probe.status not in (200, 206):
+            probe.close()
+            return None
+        # Sin rangos (200) la sonda es el archivo entero; con un 206 pequeño es
+        # el principio y el camino de un solo stream reanuda desde ahí
+        state = _PartialDownload(dest, sha256)
+        state.begin(probe.status, probe.headers)
+        try:
+            for chunk in probe.iter_chunks(chunk_size):
+                state.write(chunk)
+        finally:
+            state.close()
+        total = _content_range_total(probe.headers) if probe.status == 206 else state.size
+        return state.finish() if state.size == total else None
+    validator = probe.headers.get("ETag") or probe.headers.get("Last-Modified")
+    try:
+        sfile = _SegmentedFile(dest, _content_range_total(probe.headers), count, sha256, validator)
+    except BaseException:
+        probe.close()
+        raise
+    try:
+        if sfile.progress[0]:
+            probe.close()  # se reanuda: el principio ya está en disco
+        else:
+            for chunk in probe.iter_chunks(chunk_size):
+                sfile.write(0, chunk)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(sfile.ranges)) as pool:
+            futures = [pool.submit(_download_segment, probe.url, sfile, i, validator,
+                                   timeout, retries, chunk_size)
+                       for i in range(len(sfile.ranges))]
+            for future in concurrent.futures.as_completed(futures):
+                if future.exception():
+                    sfile.aborted = True
+                    raise future.exception()
+    except _SegmentsUnsupported:
+        sfile.discard()
+        raise
+    except BaseException:
+        sfile.aborted = True
+        sfile.suspend()
+        raise
+    return sfile.finish()
+
+
 def download(url: str, dest: str, timeout: float = 60, retries: int = 2,
-             chunk_size: int = 65536) -> str:
-    """Descarga en streaming a `dest`. Borra el archivo parcial si falla."""
+             chunk_size: int = 65536, sha256: Optional[str] = None,
+             segments: int = SEGMENTS) -> str:
+    """Descarga reanudable a `dest` pasando por `dest.part`, verificando `sha256` si se da.
+
+    Si el servidor acepta rangos y el archivo es grande se baja en `segments`
+    trozos paralelos; si no (o si la descarga segmentada falla) se usa un único
+    stream. Un corte no tira lo descargado: el siguiente intento sigue desde el
+    último byte. `retries` cuenta intentos seguidos sin progreso; un hash
+    incorrecto descarta el `.part` y repite desde cero una vez. Una descarga
+    segmentada que falla con el avance guardado no cae al stream único (que
+    volvería a empezar): el error se propaga y la siguiente llamada reanuda.
+    """
+    url, local = _mirrored(url, artifact=True, sha256=sha256)
+    if local:
+        return _copy_local(local, dest, sha256, chunk_size)
+    if segments > 1 and not os.path.exists(dest + ".part"):
+        try:
+            done = _download_segmented(url, dest, timeout, retries, chunk_size, sha256, segments)
+            if done:
+                return done
+        except _SegmentsUnsupported:
+            pass  # un único stream desde cero
+        except (HTTPError, _RateLimited, *_NETWORK_ERRORS) as e:
+            if os.path.exists(dest + SIDECAR_SUFFIX):
+                raise HTTPError(f"Descarga fallida (se reanudará): {e}") from e
+    state = _PartialDownload(dest, sha256)
+    last_error = None
+    failures = 0
+    checksum_retry = True
+    while failures <= retries:
+        progress = state.size
+        response = None
+        try:
+            response = _send(url, state.request_headers(), timeout)
+            try:
+                writing = state.begin(response.status, response.headers)
+            except Exception:
+                response.close()
+                raise
+            if writing:
+                for chunk in response.iter_chunks(chunk_size):
+                    state.write(chunk)
+            else:
+                response.close()
+            return state.finish()
+        except ChecksumError as e:
+            last_error = e
+            if not checksum_retry:
+                raise
+            checksum_retry = False
+            continue
+        except (_RateLimited, *_NETWORK_ERRORS) as e:
+            last_error = e
+            state.close()
+            if response:
+                response.close()
+            if isinstance(e, _StatusError) and 400 <= e.status < 500:
+                state.discard()
+        failures = 0 if state.size > progress else failures + 1
+        if failures <= retries:
+            time.sleep(_backoff(failures))
+    raise HTTPError(f"Descarga fallida: {last_error}") from last_error
+
+
+# ---------------------------------------------------------------------------
+# Transporte asyncio: HTTP/1.1 sobre streams con keep-alive
+# ---------------------------------------------------------------------------
+
+class _AsyncConnection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader, self.writer = reader, writer
+
+    def close(self):
+        self.writer.close()
+
+
+class AsyncConnectionPool:
+    """Conexiones inactivas por host, ligadas al event loop que las creó.
+
+    Se indexan por el propio loop (referencia débil): al destruirse el loop
+    desaparece su entrada, y las de loops ya cerrados se descartan al pasar.
+    """
+
+    def __init__(self, size: int = POOL_SIZE):
+        self.size = size
+        # loop -> {(esquema, host, puerto): [conexiones]}
+        self._idle = weakref.WeakKeyDictionary()
+
+    def _idle_for(self, key) -> List[_AsyncConnection]:
+        for loop in [loop for loop in list(self._idle.keys()) if loop.is_closed()]:
+            self._idle.pop(loop, None)
+        per_loop = self._idle.setdefault(asyncio.get_running_loop(), {})
+        return per_loop.setdefault(key, [])
+
+    async def acquire(self, key, timeout: float, fresh: bool = False) -> Tuple[_AsyncConnection, bool]:
+        idle = self._idle_for(key)
+        while idle and not fresh:
+            conn = idle.pop()
+            if not conn.writer.is_closing() and not conn.reader.at_eof():
+                return conn, True
+            conn.close()
+        scheme, host, port = key
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(
+            host, port, ssl=_ssl() if scheme == "https" else None), timeout)
+        return _AsyncConnection(reader, writer), False
+
+    def release(self, key, conn: _AsyncConnection):
+        idle = self._idle_for(key)
+        if len(idle) < self.size:
+            idle.append(conn)
+        else:
+            conn.close()
+
+
+_async_pool = AsyncConnectionPool()
+
+
+class _AsyncResponse:
+    def __init__(self, key, conn: _AsyncConnection, status: int, headers: email.message.Message,
+                 keep_alive: bool, timeout: float):
+        self.key, self.conn, self.status, self.headers = key, conn, status, headers
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+
+    async def _read(self, coro):
+        return await asyncio.wait_for(coro, self.timeout)
+
+    async def iter_chunks(self, chunk_size: int):
+        reader = self.conn.reader
+        if self.status in (204, 304):
+            pass
+        elif (self.headers.get("Transfer-Encoding") or "").lower() == "chunked":
+            while True:
+                size = int((await self._read(reader.readline())).split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    while (await self._read(reader.readline())) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                remaining = size
+                while remaining:
+                    chunk = await self._read(reader.read(min(chunk_size, remaining)))
+                    if not chunk:
+                        raise ConnectionResetError("Conexión cerrada a mitad de respuesta")
+                    remaining -= len(chunk)
+                    yield chunk
+                await self._read(reader.readline())
+        elif self.headers.get("Content-Length") is not None:
+            remaining = int(self.headers["Content-Length"])
+            while remaining:
+                chunk = await self._read(reader.read(min(chunk_size, remaining)))
+                if not chunk:
+                    raise ConnectionResetError("Conexión cerrada a mitad de respuesta")
+                remaining -= len(chunk)
+                yield chunk
+        else:
+            self.keep_alive = False
+            while True:
+                chunk = await self._read(reader.read(chunk_size))
+                if not chunk:
+                    break
+                yield chunk
+        self.release()
+
+    async def read(self) -> bytes:
+        return b"".join([chunk async for chunk in self.iter_chunks(65536)])
+
+    def release(self):
+        if self.keep_alive:
+            _async_pool.release(self.key, self.conn)
+        else:
+            self.conn.close()
+
+    def close(self):
+        self.conn.close()
+
+
+async def _async_request(key, path: str, headers: dict, timeout: float, fresh: bool):
+    conn, reused = await _async_pool.acquire(key, timeout, fresh=fresh)
+    host_header = key[1] if key[2] in (80, 443) else f"{key[1]}:{key[2]}"
+    lines = [f"GET {path} HTTP/1.1", f"Host: {host_header}", f"User-Agent: {USER_AGENT}",
+             "Accept-Encoding: identity", "Connection: keep-alive"]
+    lines += [f"{k}: {v}" for k, v in headers.items()]
+    try:
+        conn.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        await conn.writer.drain()
+        status_line = await asyncio.wait_for(conn.reader.readline(), timeout)
+        if not status_line:
+            raise ConnectionResetError("Conexión cerrada por el servidor")
+        version, status = status_line.decode("latin-1").split(" ", 2)[:2]
+        resp_headers = email.message.Message()
+        while True:
+            line = await asyncio.wait_for(conn.reader.readline(), timeout)
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            resp_headers[name.strip()] = value.strip()
+    except (ConnectionResetError, BrokenPipeError, ValueError):
+        conn.close()
+        if reused:
+            return None
+        raise
+    except BaseException:
+        conn.close()
+        raise
+    keep_alive = (version == "HTTP/1.1"
+                  and (resp_headers.get("Connection") or "").lower() != "close")
+    return _AsyncResponse(key, conn, int(status), resp_headers, keep_alive, timeout)
+
+
+async def _async_send(url: str, headers: dict, timeout: float) -> _AsyncResponse:
+    """Equivalente asyncio de `_send`."""
+    for _ in range(MAX_REDIRECTS + 1):
+        key, path = _split(url)
+        response = await _async_request(key, path, headers, timeout, fresh=False)
+        if response is None:  # conexión reutilizada muerta: una vez más con una nueva
+            response = await _async_request(key, path, headers, timeout, fresh=True)
+        location = response.headers.get("Location")
+        if response.status in REDIRECT_CODES and location:
+            await response.read()
+            url = urllib.parse.urljoin(url, location)
+            headers = {k: v for k, v in headers.items() if not k.startswith("If-")}
+            continue
+        response.url = url  # URL final tras redirecciones
+        return response
+    raise HTTPError(f"Demasiadas redirecciones: {url}")
+
+
+_ASYNC_ERRORS = (OSError, asyncio.TimeoutError, ValueError, _StatusError)
+
+
+async def _open_async(url: str, timeout: float, retries: int, headers: dict):
     last_error = None
     for attempt in range(retries + 1):
         try:
-            req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
-            with urllib.request.urlopen(req, timeout=timeout) as resp:
-                with open(dest, "wb") as f:
-                    while True:
-                        chunk = resp.read(chunk_size)
-                        if not chunk:
-                            break
-                        f.write(chunk)
-            return dest
-        except (urllib.error.URLError, urllib.error.HTTPError,
-                TimeoutError, OSError) as e:
+            response = await _async_send(url, headers, timeout)
+            try:
+                _check_status(response.status, response.headers)
+            except Exception:
+                response.close()
+                raise
+            return response.status, response.headers, await response.read()
+        except _ASYNC_ERRORS as e:
             last_error = e
-            if os.path.exists(dest):
-                try:
-                    os.remove(dest)
-                except OSError:
-                    pass
-            if attempt < retries:
-                time.sleep(min(1.0 * (2 ** attempt), 4.0))
-    raise HTTPError(f"Descarga fallida: {last_error}") from last_error
\ No newline at end of file
+        if attempt < retries:
+            await asyncio.sleep(_backoff(attempt))
+    raise HTTPError(str(last_error)) from last_error
+
+
+async def _fetch_async(url: str, timeout: float, retries: int, entry):
+    try:
+        status, headers, data = await _open_async(url, timeout, retries, _json_headers(entry))
+    except _RateLimited as e:
+        raise _rate_limited(url, e) from e
+    return _store(url, entry, status, headers, data)
+
+
+async def _revalidate_task(url: str, timeout: float, entry):
+    try:
+        await _fetch_async(url, timeout, 0, entry)
+    except HTTPError:
+        pass
+    finally:
+        _end_revalidation(url)
+
+
+async def get_json_async(url: str, timeout: float = 30, retries: int = 2,
+                         max_age: float = 0, stale_ok: bool = False) -> dict:
+    """Versión asyncio de `get_json` (misma caché y semántica)."""
+    url, local = _mirrored(url)
+    if local:
+        return _read_local_json(url, local)
+    action, value = _lookup(url, max_age, stale_ok)
+    if action == "hit":
+        return value
+    if action == "stale":
+        if _claim_revalidation(url):
+            asyncio.ensure_future(_revalidate_task(url, timeout, value))
+        return _parse(url, value.body)
+    try:
+        return await _fetch_async(url, timeout, retries, value)
+    except HTTPError:
+        if value:
+            return _parse(url, value.body)
+        raise
+
+
+async def _download_segment_async(url: str, sfile: _SegmentedFile, index: int,
+                                  validator: Optional[str], timeout: float, retries: int,
+                                  chunk_size: int):
+    failures = 0
+    while sfile.next_offset(index) <= sfile.ranges[index][1]:
+        progress = sfile.progress[index]
+        response = None
+        try:
+            response = await _async_send(url, _segment_headers(sfile, index, validator), timeout)
+            if response.status != 206:
+                raise _SegmentsUnsupported(f"HTTP {response.status} a una petición Range")
+            async for chunk in response.iter_chunks(chunk_size):
+                sfile.write(index, chunk)
+            continue
+        except _ASYNC_ERRORS as e:
+            if response:
+                response.close()
+            failures = 0 if sfile.progress[index] > progress else failures + 1
+            if failures > retries:
+                raise HTTPError(f"Segmento {index} fallido: {e}") from e
+        except BaseException:
+            if response:
+                response.close()
+            raise
+        await asyncio.sleep(_backoff(failures))
+
+
+async def _download_segmented_async(url: str, dest: str, timeout: float, retries: int,
+                                    chunk_size: int, sha256: Optional[str],
+                                    segments: int) -> Optional[str]:
+    probe = await _async_send(url, {"Range": f"bytes=0-{PROBE_BYTES - 1}"}, timeout)
+    count = _probe_segments(probe.status, probe.headers, segments)
+    if count is None:
+        _remove_segmented(dest)  # lo de una ejecución anterior ya no sirve
+        if probe.status not in (200, 206):
+            probe.close()
+            return None
+        # Sin rangos (200) la sonda es el archivo entero; con un 206 pequeño es
+        # el principio y el camino de un solo stream reanuda desde ahí
+        state = _PartialDownload(dest, sha256)
+        state.begin(probe.status, probe.headers)
+        try:
+            async for chunk in probe.iter_chunks(chunk_size):
+                state.write(chunk)
+        finally:
+            state.close()
+        total = _content_range_total(probe.headers) if probe.status == 206 else state.size
+        return state.finish() if state.size == total else None
+    validator = probe.headers.get("ETag") or probe.headers.get("Last-Modified")
+    try:
+        sfile = _SegmentedFile(dest, _content_range_total(probe.headers), count, sha256, validator)
+    except BaseException:
+        probe.close()
+        raise
+    tasks = []
+    try:
+        if sfile.progress[0]:
+            probe.close()  # se reanuda: el principio ya está en disco
+        else:
+            async for chunk in probe.iter_chunks(chunk_size):
+                sfile.write(0, chunk)
+        tasks = [asyncio.ensure_future(_download_segment_async(probe.url, sfile, i, validator,
+                                                               timeout, retries, chunk_size))
+                 for i in range(len(sfile.ranges))]
+        await asyncio.gather(*tasks)
+    except BaseException as e:
+        sfile.aborted = True
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if isinstance(e, _SegmentsUnsupported):
+            sfile.discard()
+        else:
+            sfile.suspend()
+        raise
+    return sfile.finish()
+
+
+async def download_async(url: str, dest: str, timeout: float = 60, retries: int = 2,
+                         chunk_size: int = 65536, sha256: Optional[str] = None,
+                         segments: int = SEGMENTS) -> str:
+    """Versión asyncio de `download` (segmentada, reanudable y verificada).
+
+    La escritura a disco es síncrona (bloques de 64K con `os.pwrite`).
+    """
+    url, local = _mirrored(url, artifact=True, sha256=sha256)
+    if local:
+        return await asyncio.to_thread(_copy_local, local, dest, sha256, chunk_size)
+    if segments > 1 and not os.path.exists(dest + ".part"):
+        try:
+            done = await _download_segmented_async(url, dest, timeout, retries, chunk_size,
+                                                   sha256, segments)
+            if done:
+                return done
+        except _SegmentsUnsupported:
+            pass  # un único stream desde cero
+        except (HTTPError, _RateLimited, *_ASYNC_ERRORS) as e:
+            if os.path.exists(dest + SIDECAR_SUFFIX):
+                raise HTTPError(f"Descarga fallida (se reanudará): {e}") from e
+    state = _PartialDownload(dest, sha256)
+    last_error = None
+    failures = 0
+    checksum_retry = True
+    while failures <= retries:
+        progress = state.size
+        response = None
+        try:
+            response = await _async_send(url, state.request_headers(), timeout)
+            try:
+                writing = state.begin(response.status, response.headers)
+            except Exception:
+                response.close()
+                raise
+            if writing:
+                async for chunk in response.iter_chunks(chunk_size):
+                    state.write(chunk)
+            else:
+                response.close()
+            return state.finish()
+        except ChecksumError as e:
+            last_error = e
+            if not checksum_retry:
+                raise
+            checksum_retry = False
+            continue
+        except (_RateLimited, *_ASYNC_ERRORS) as e:
+            last_error = e
+            state.close()
+            if response:
+                response.close()
+            if isinstance(e, _StatusError) and 400 <= e.status < 500:
+                state.discard()
+        failures = 0 if state.size > progress else failures + 1
+        if failures <= retries:
+            await asyncio.sleep(_backoff(failures))
+    raise HTTPError(f"Descarga fallida: {last_error}") from last_error
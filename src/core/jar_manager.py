@@ -1,31 +1,33 @@
 import os
 
-from src.core import http_client
+from src.core import http_client, releases
+from src.core.artifact_store import get_store
 
 
 class JarManager:
     # PaperMC sunset the v2 API; the downloads service now lives here:
     # https://docs.papermc.io/misc/downloads-service/
     BASE_URL = "https://fill.papermc.io/v3/projects"
+    # Seconds a cached response is used without revalidating (see http_cache)
+    VERSIONS_MAX_AGE = 3600
+    BUILDS_MAX_AGE = 600
 
     def __init__(self, download_dir="server_bin"):
         self.download_dir = download_dir
         if not os.path.exists(self.download_dir):
             os.makedirs(self.download_dir)
 
-    def _get_json(self, path: str):
-        return http_client.get_json(f"{self.BASE_URL}{path}")
+    def _get_json(self, path: str, max_age: float = 0, stale_ok: bool = False):
+        return http_client.get_json(f"{self.BASE_URL}{path}", max_age=max_age, stale_ok=stale_ok)
+
+    async def _get_json_async(self, path: str, max_age: float = 0, stale_ok: bool = False):
+        return await http_client.get_json_async(f"{self.BASE_URL}{path}", max_age=max_age, stale_ok=stale_ok)
 
     def get_current_jar(self) -> str:
-        """Find the first/latest JAR file in the download directory."""
+        """The active server JAR from the release manifest (see releases)."""
         if not os.path.exists(self.download_dir):
             return None
-        jars = [f for f in os.listdir(self.download_dir) if f.endswith('.jar')]
-        if jars:
-            # Return most recently modified JAR
-            jars.sort(key=lambda x: os.path.getmtime(os.path.join(self.download_dir, x)), reverse=True)
-            return os.path.join(self.download_dir, jars[0])
-        return None
+        return releases.active_jar(self.download_dir)
 
     def is_server_jar(self, filename: str) -> bool:
         """
@@ -37,10 +39,7 @@ class JarManager:
         Returns:
             True if it's a server JAR (paper, folia, etc.), False otherwise
         """
-        server_patterns = ['paper-', 'folia-', 'velocity-', 'spigot-', 'craftbukkit-',
-                          'purpur-', 'pufferfish-', 'airplane-', 'tuinity-']
-        lower_name = filename.lower()
-        return any(lower_name.startswith(p) for p in server_patterns)
+        return releases.is_server_jar(filename, self.download_dir)
 
     @staticmethod
     def _version_sort_key(version: str):
@@ -49,18 +48,51 @@ class JarManager:
         except (ValueError, AttributeError):
             return [0]
 
+    def _stable_versions(self, data: dict) -> list:
+        raw = [v for group in data.get("versions", {}).values() for v in group]
+        # Keep only stable releases (drop rc/pre/alpha/beta/dev)
+        stable = {
+            v for v in raw
+            if not any(token in v for token in ("-rc", "-pre", "-alpha", "-beta", "-dev"))
+        }
+        return sorted(stable, key=self._version_sort_key)
+
+    @staticmethod
+    def _latest_build_id(builds: list) -> int:
+        if not builds:
+            return None
+        stable = [b for b in builds if b.get("channel") == "STABLE"]
+        pool = stable or builds
+        pool.sort(key=lambda b: b.get("id", 0))
+        return pool[-1].get("id")
+
+    @staticmethod
+    def _server_download(build_data: dict) -> dict:
+        """The server download entry of a build: {"url", "checksums": {"sha256"}, ...}."""
+        downloads = build_data.get("downloads", {})
+        return downloads.get("server:default") or downloads.get("server") or {}
+
+    def _find_download(self, builds: list, build: int) -> dict:
+        for b in builds:
+            if b.get("id") == build:
+                return self._server_download(b)
+        return {}
+
+    @staticmethod
+    def _sha256(download: dict) -> str:
+        return (download.get("checksums") or {}).get("sha256")
+
+    def _output_path(self, project: str, version: str, build: int) -> str:
+        if build is None:
+            raise ValueError("No build found")
+        return os.path.join(self.download_dir, f"{project}-{version}-{build}.jar")
+
     def get_versions(self, project: str) -> list:
         """Get stable release versions for a project (paper, folia, velocity)."""
         try:
-            data = self._get_json(f"/{project}")
-            raw = [v for group in data.get("versions", {}).values() for v in group]
-            # Keep only stable releases (drop rc/pre/alpha/beta/dev)
-            stable = {
-                v for v in raw
-                if not any(token in v for token in ("-rc", "-pre", "-alpha", "-beta", "-dev"))
-            }
-            versions = sorted(stable, key=self._version_sort_key)
-            return versions
+            # The UI asks on every dropdown change: answer from cache, refresh in background
+            data = self._get_json(f"/{project}", max_age=self.VERSIONS_MAX_AGE, stale_ok=True)
+            return self._stable_versions(data)
         except Exception as e:
             print(f"Error fetching versions: {e}")
             return []
@@ -73,7 +105,7 @@ class JarManager:
 
     def get_builds(self, project: str, version: str) -> list:
         try:
-            data = self._get_json(f"/{project}/versions/{version}/builds")
+            data = self._get_json(f"/{project}/versions/{version}/builds", max_age=self.BUILDS_MAX_AGE)
             if isinstance(data, list):
                 return data
             return []
@@ -82,49 +114,79 @@ class JarManager:
             return []
 
     def get_latest_build(self, project: str, version: str) -> int:
-        builds = self.get_builds(project, version)
-        if not builds:
-            return None
-        stable = [b for b in builds if b.get("channel") == "STABLE"]
-        pool = stable or builds
-        pool.sort(key=lambda b: b.get("id", 0))
-        return pool[-1].get("id")
+        return self._latest_build_id(self.get_builds(project, version))
 
-    def _get_download_url(self, project: str, version: str, build: int) -> str:
-        """Resolve the direct download URL for a build from the Fill API."""
-        url = None
-        for b in self.get_builds(project, version):
-            if b.get("id") == build:
-                dl = b.get("downloads", {}).get("server:default") or b.get("downloads", {}).get("server") or {}
-                url = dl.get("url")
-                break
-        if not url:
+    def _get_download(self, project: str, version: str, build: int) -> dict:
+        """Resolve the download entry (URL + checksums) for a build from the Fill API."""
+        download = self._find_download(self.get_builds(project, version), build)
+        if not download.get("url"):
             # Fallback: ask for the latest build of that version
             try:
-                data = self._get_json(f"/{project}/versions/{version}/builds/latest")
-                dl = data.get("downloads", {}).get("server:default") or data.get("downloads", {}).get("server") or {}
-                url = dl.get("url")
+                download = self._server_download(self._get_json(f"/{project}/versions/{version}/builds/latest"))
             except Exception:
                 pass
-        return url
+        return download
 
     def download_jar(self, project: str, version: str, build: int = None) -> str:
         """Downloads the JAR and returns the file path"""
         if build is None:
             build = self.get_latest_build(project, version)
+        output_path = self._output_path(project, version, build)
 
-        if build is None:
-            raise ValueError("No build found")
+        if os.path.exists(output_path):
+            return output_path
 
-        jar_name = f"{project}-{version}-{build}.jar"
-        output_path = os.path.join(self.download_dir, jar_name)
+        download = self._get_download(project, version, build)
+        if not download.get("url"):
+            raise ValueError(f"No download URL found for {project} {version} build {build}")
+
+        print(f"Downloading {os.path.basename(output_path)}...")
+        # Through the shared store: another instance may already have this build
+        return get_store().fetch(download["url"], output_path, sha256=self._sha256(download))
+
+    # ==================== asyncio variants (TUI event loop) ====================
+
+    async def get_versions_async(self, project: str) -> list:
+        try:
+            data = await self._get_json_async(f"/{project}", max_age=self.VERSIONS_MAX_AGE, stale_ok=True)
+            return self._stable_versions(data)
+        except Exception as e:
+            print(f"Error fetching versions: {e}")
+            return []
+
+    async def get_latest_version_async(self, project: str) -> str:
+        versions = await self.get_versions_async(project)
+        return versions[-1] if versions else None
+
+    async def get_builds_async(self, project: str, version: str) -> list:
+        try:
+            data = await self._get_json_async(f"/{project}/versions/{version}/builds",
+                                              max_age=self.BUILDS_MAX_AGE)
+            return data if isinstance(data, list) else []
+        except Exception as e:
+            print(f"Error fetching builds: {e}")
+            return []
+
+    async def download_jar_async(self, project: str, version: str, build: int = None) -> str:
+        """Same as download_jar; the build list is fetched once and reused for the URL."""
+        builds = await self.get_builds_async(project, version)
+        if build is None:
+            build = self._latest_build_id(builds)
+        output_path = self._output_path(project, version, build)
 
         if os.path.exists(output_path):
             return output_path
 
-        download_url = self._get_download_url(project, version, build)
-        if not download_url:
+        download = self._find_download(builds, build)
+        if not download.get("url"):
+            try:
+                download = self._server_download(
+                    await self._get_json_async(f"/{project}/versions/{version}/builds/latest"))
+            except Exception:
+                pass
+        if not download.get("url"):
             raise ValueError(f"No download URL found for {project} {version} build {build}")
 
-        print(f"Downloading {jar_name}...")
-        return http_client.download(download_url, output_path)
\ No newline at end of file
+        print(f"Downloading {os.path.basename(output_path)}...")
+        return await get_store().fetch_async(download["url"], output_path,
+                                             sha256=self._sha256(download))
\ No newline at end of file
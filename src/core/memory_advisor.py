@@ -0,0 +1,267 @@
+"""Recomendación de heap (Xmx) consciente de swap, zram y presión de memoria (PSI).
+
+Elegir mal el heap es la primera causa de caídas en la Pi. Tomar el 75% de
+`MemAvailable` en el instante de arrancar es ruidoso (page cache recién
+liberado, apt en segundo plano...) e ignora que la JVM ocupa bastante más
+que su heap. Aquí se combina:
+  - varias muestras de /proc/meminfo en una ventana corta (se usa la peor)
+  - el overhead off-heap real (RSS - Xmx) medido en ejecuciones anteriores,
+    guardado en `server_bin/.kcmc/jvm_overhead.json` por el ResourceWatcher
+  - swap y zram (/proc/swaps, /sys/block/zram*): el heap nunca debe acabar
+    en swap, pero con zram el resto del sistema tiene dónde comprimir
+  - PSI de memoria (/proc/pressure/memory, `some`/`full` avg60)
+  - la RAM de otros servicios residentes (agente playit, la propia UI)
+y se devuelve un Xmx con un margen de confianza.
+"""
+
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+OVERHEAD_FILE = os.path.join(".kcmc", "jvm_overhead.json")
+OVERHEAD_HISTORY = 10
+
+# Overhead off-heap por defecto si no hay mediciones: metaspace, code cache,
+# pilas de hilos, buffers directos de Netty...
+DEFAULT_OVERHEAD_BASE_MB = 160
+OVERHEAD_RATIO = 0.10
+# Lo que se deja siempre al sistema (kernel, sshd, journald)
+SYSTEM_RESERVE_MB = 96
+# Reserva para el agente playit si está instalado pero aún no corre
+TUNNEL_AGENT_RESERVE_MB = 48
+TUNNEL_PROCESS_NAMES = ("playit",)
+
+
+def _read_text(path: str) -> Optional[str]:
+    try:
+        with open(path, "r") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def read_meminfo(proc_root: str = "/proc") -> Dict[str, int]:
+    """Campos de /proc/meminfo en MB."""
+    info = {}
+    text = _read_text(os.path.join(proc_root, "meminfo")) or ""
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and parts[1].isdigit():
+            info[parts[0].rstrip(":")] = int(parts[1]) // 1024
+    return info
+
+
+def read_psi(proc_root: str = "/proc") -> Optional[Dict[str, float]]:
+    """PSI de memoria: {'some_avg10', 'some_avg60', 'full_avg10', 'full_avg60'}.
+
+    None si el kernel no expone PSI (CONFIG_PSI=n o psi=0 en cmdline).
+    """
+    text = _read_text(os.path.join(proc_root, "pressure", "memory"))
+    if not text:
+        return None
+    psi = {}
+    for line in text.splitlines():
+        parts = line.split()
+        if not parts or parts[0] not in ("some", "full"):
+            continue
+        for kv in parts[1:]:
+            key, _, value = kv.partition("=")
+            if key in ("avg10", "avg60"):
+                try:
+                    psi[f"{parts[0]}_{key}"] = float(value)
+                except ValueError:
+                    pass
+    return psi or None
+
+
+@dataclass
+class SwapInfo:
+    disk_mb: int = 0
+    zram_mb: int = 0
+    zram_free_mb: int = 0
+
+    @property
+    def total_mb(self) -> int:
+        return self.disk_mb + self.zram_mb
+
+
+def read_swap(proc_root: str = "/proc") -> SwapInfo:
+    """Swap en disco y zram a partir de /proc/swaps (tamaños en KiB)."""
+    info = SwapInfo()
+    text = _read_text(os.path.join(proc_root, "swaps")) or ""
+    for line in text.splitlines()[1:]:
+        parts = line.split()
+        if len(parts) < 4:
+            continue
+        try:
+            size, used = int(parts[2]) // 1024, int(parts[3]) // 1024
+        except ValueError:
+            continue
+        if os.path.basename(parts[0]).startswith("zram"):
+            info.zram_mb += size
+            info.zram_free_mb += max(size - used, 0)
+        else:
+            info.disk_mb += size
+    return info
+
+
+def _process_rss_mb(proc_root: str, pid: str) -> int:
+    text = _read_text(os.path.join(proc_root, pid, "status")) or ""
+    for line in text.splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) // 1024
+    return 0
+
+
+def resident_services_mb(proc_root: str = "/proc") -> Dict[str, int]:
+    """RSS (MB) de servicios que conviven con el servidor: agente de túnel y esta UI."""
+    services = {"ui": _process_rss_mb(proc_root, str(os.getpid()))}
+    try:
+        entries = os.listdir(proc_root)
+    except OSError:
+        return services
+    for pid in entries:
+        if not pid.isdigit():
+            continue
+        comm = (_read_text(os.path.join(proc_root, pid, "comm")) or "").strip()
+        if comm in TUNNEL_PROCESS_NAMES:
+            services["tunnel"] = services.get("tunnel", 0) + _process_rss_mb(proc_root, pid)
+    return services
+
+
+# ---------------------------------------------------------------------------
+# Overhead off-heap medido
+# ---------------------------------------------------------------------------
+
+def load_overhead(server_dir: str) -> List[Dict]:
+    try:
+        with open(os.path.join(server_dir, OVERHEAD_FILE), "r") as f:
+            data = json.load(f)
+        return data if isinstance(data, list) else []
+    except (OSError, ValueError):
+        return []
+
+
+def record_overhead(server_dir: str, xmx_mb: int, peak_rss_mb: int):
+    """Guarda el overhead (RSS pico - Xmx) de una ejecución. Se ignoran heaps sin tocar."""
+    if peak_rss_mb <= xmx_mb:
+        return
+    history = load_overhead(server_dir)
+    history.append({"time": time.time(), "xmx_mb": xmx_mb, "peak_rss_mb": peak_rss_mb,
+                    "overhead_mb": peak_rss_mb - xmx_mb})
+    path = os.path.join(server_dir, OVERHEAD_FILE)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(history[-OVERHEAD_HISTORY:], f, indent=2)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def overhead_base_mb(history: List[Dict]) -> int:
+    """Parte fija del overhead (overhead = base + OVERHEAD_RATIO * Xmx).
+
+    Con mediciones se usa la mayor de las recientes: mejor pasarse que matar la Pi.
+    """
+    bases = [h["overhead_mb"] - OVERHEAD_RATIO * h["xmx_mb"] for h in history
+             if isinstance(h, dict) and "overhead_mb" in h and "xmx_mb" in h]
+    if not bases:
+        return DEFAULT_OVERHEAD_BASE_MB
+    return int(max(bases[-3:]))
+
+
+# ---------------------------------------------------------------------------
+# Recomendación
+# ---------------------------------------------------------------------------
+
+@dataclass
+class HeapRecommendation:
+    xmx_mb: int
+    margin_mb: int          # incertidumbre: Xmx seguro = xmx_mb - margin_mb
+    confidence: str         # "alta" | "media" | "baja"
+    reasons: List[str] = field(default_factory=list)
+
+    @property
+    def xmx(self) -> str:
+        if self.xmx_mb >= 1024 and self.xmx_mb % 1024 == 0:
+            return f"{self.xmx_mb // 1024}G"
+        return f"{self.xmx_mb}M"
+
+    def describe(self) -> str:
+        return f"{self.xmx} (±{self.margin_mb} MB, confianza {self.confidence})"
+
+
+def sample_available(window: float = 1.0, samples: int = 5, proc_root: str = "/proc") -> List[int]:
+    """Muestras de MemAvailable (MB) repartidas en `window` segundos."""
+    values = []
+    for i in range(samples):
+        avail = read_meminfo(proc_root).get("MemAvailable")
+        if avail:
+            values.append(avail)
+        if i < samples - 1:
+            time.sleep(window / max(samples - 1, 1))
+    return values
+
+
+def recommend_heap(server_dir: Optional[str] = None, window: float = 1.0, samples: int = 5,
+                   proc_root: str = "/proc", tunnel_installed: bool = False) -> Optional[HeapRecommendation]:
+    """Xmx recomendado para el servidor. None si /proc/meminfo no es legible."""
+    values = sample_available(window, samples, proc_root)
+    if not values:
+        return None
+    reasons = []
+    available = min(values)
+    spread = max(values) - available
+    reasons.append(f"MemAvailable {available} MB (min de {len(values)} muestras, variación {spread} MB)")
+
+    # Servicios residentes: lo que ya corre está descontado de MemAvailable,
+    # salvo la UI, que crece; el agente de túnel se reserva si aún no corre.
+    services = resident_services_mb(proc_root)
+    reserve = SYSTEM_RESERVE_MB
+    if "tunnel" not in services and tunnel_installed:
+        reserve += TUNNEL_AGENT_RESERVE_MB
+        reasons.append(f"reserva {TUNNEL_AGENT_RESERVE_MB} MB para el agente playit")
+    reserve += services.get("ui", 0) // 4
+
+    swap = read_swap(proc_root)
+    if swap.zram_mb:
+        # zram deja comprimir páginas frías del resto del sistema (~2:1)
+        bonus = min(swap.zram_free_mb // 4, available // 10)
+        available += bonus
+        reasons.append(f"zram {swap.zram_mb} MB: +{bonus} MB")
+    elif not swap.total_mb:
+        reserve += 64
+        reasons.append("sin swap: margen extra de 64 MB")
+    else:
+        reasons.append(f"swap en disco {swap.disk_mb} MB (no cuenta para el heap)")
+
+    margin = max(64, spread)
+    psi = read_psi(proc_root)
+    penalty = 0.0
+    if psi:
+        some60, full60 = psi.get("some_avg60", 0.0), psi.get("full_avg60", 0.0)
+        if some60 >= 5 or full60 >= 1:
+            penalty = min(0.05 + some60 / 100 + full60 / 20, 0.30)
+            reasons.append(f"presión de memoria PSI some={some60:.1f}% full={full60:.1f}%: -{penalty:.0%}")
+            margin += int(available * penalty / 2)
+
+    history = load_overhead(server_dir) if server_dir else []
+    base = overhead_base_mb(history)
+    reasons.append(f"overhead JVM {base} MB + {OVERHEAD_RATIO:.0%} del heap "
+                   f"({'medido en ' + str(len(history)) + ' ejecuciones' if history else 'estimado'})")
+
+    budget = available * (1.0 - penalty) - reserve - base
+    xmx = int(budget / (1.0 + OVERHEAD_RATIO))
+    xmx = max(256, (xmx // 64) * 64)
+
+    if history and not penalty and spread < 64:
+        confidence = "alta"
+    elif penalty >= 0.15 or (not history and spread >= 128):
+        confidence = "baja"
+    else:
+        confidence = "media"
+    return HeapRecommendation(xmx_mb=xmx, margin_mb=margin, confidence=confidence, reasons=reasons)
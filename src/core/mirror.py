@@ -0,0 +1,214 @@
+"""Mirror local o de LAN para hosts sin salida a Internet.
+
+`JarManager.BASE_URL`, las APIs de GeyserMC y los releases de GitHub están
+fijados en el código. Con `KCMC_MIRROR` (o `--mirror`) apuntando a un
+directorio o a un servidor HTTP de la LAN, `http_client` resuelve cada URL
+contra el índice del mirror y nunca sale a Internet: `get_json` y `download`
+tienen la misma interfaz, así que JarManager y PluginManager no cambian.
+
+Estructura del mirror:
+
+  index.json                       documentos, artefactos y resumen de builds
+  docs/<host>/<ruta>/index.json    respuestas JSON de las APIs, tal cual
+  blobs/<sha256>                   jars y binarios por contenido
+
+`export()` (`--export-mirror DIR`) lo genera a partir de lo que este host ya
+tiene: las respuestas guardadas en `http_cache` y los blobs de
+`artifact_store`. Un directorio exportado se sirve con cualquier servidor
+estático (`python3 -m http.server`) o se copia a un USB.
+"""
+
+import json
+import os
+import re
+import shutil
+import socket
+import time
+import urllib.parse
+import urllib.request
+from typing import Dict, Optional
+
+from src.core import artifact_store
+from src.core.http_cache import BLOCKS_FILE, CacheEntry, HttpCache, get_cache
+
+MIRROR_ENV = "KCMC_MIRROR"
+INDEX_FILE = "index.json"
+INDEX_TTL = 300  # un mirror de LAN puede re-exportarse mientras la app corre
+
+FILL_BUILDS = re.compile(r"/v3/projects/([^/]+)/versions/([^/]+)/builds$")
+GEYSER_LATEST = re.compile(r"/v2/projects/([^/]+)/versions/latest/builds/latest$")
+
+
+class MirrorError(Exception):
+    """La URL pedida no está en el mirror (o el mirror no es accesible)."""
+
+
+def _doc_path(url: str) -> str:
+    parts = urllib.parse.urlsplit(url)
+    segments = [s for s in parts.path.split("/") if s and s not in (".", "..")]
+    if parts.query:
+        segments.append("q-" + urllib.parse.quote(parts.query, safe=""))
+    return "/".join(["docs", parts.netloc.replace(":", "_")] + segments + [INDEX_FILE])
+
+
+class Mirror:
+    def __init__(self, location: str):
+        if location.startswith("file://"):
+            location = urllib.parse.urlsplit(location).path
+        self.remote = location.startswith(("http://", "https://"))
+        self.location = location.rstrip("/") if self.remote else os.path.abspath(location)
+        self._index: Optional[dict] = None
+        self._loaded_at = 0.0
+
+    def owns(self, url: str) -> bool:
+        """La URL ya apunta al mirror (no hay que resolverla otra vez)."""
+        return self.remote and url.startswith(self.location + "/")
+
+    def locate(self, rel: str) -> str:
+        """URL (mirror HTTP) o ruta local de una entrada del índice."""
+        if self.remote:
+            return f"{self.location}/{rel}"
+        return os.path.join(self.location, *rel.split("/"))
+
+    def index(self) -> dict:
+        if self._index is not None and time.time() - self._loaded_at < INDEX_TTL:
+            return self._index
+        try:
+            if self.remote:
+                with urllib.request.urlopen(self.locate(INDEX_FILE), timeout=10) as resp:
+                    data = json.loads(resp.read().decode("utf-8"))
+            else:
+                with open(self.locate(INDEX_FILE), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+        except (OSError, ValueError) as e:
+            if self._index is not None:
+                return self._index
+            raise MirrorError(f"No se pudo leer el índice del mirror {self.location}: {e}") from e
+        self._index, self._loaded_at = data, time.time()
+        return data
+
+    def document(self, url: str) -> str:
+        rel = self.index().get("documents", {}).get(url)
+        if not rel:
+            raise MirrorError(f"{url} no está en el mirror {self.location}")
+        return self.locate(rel)
+
+    def artifact(self, url: str, sha256: Optional[str] = None) -> str:
+        """El blob por checksum si se conoce; si no, el que se bajó de esa URL."""
+        index = self.index()
+        digest = sha256.lower() if sha256 else None
+        if not digest or digest not in index.get("blobs", {}):
+            digest = index.get("artifacts", {}).get(url)
+        if not digest:
+            raise MirrorError(f"{url} no está en el mirror {self.location}")
+        return self.locate(f"blobs/{digest}")
+
+
+_mirror: Optional[Mirror] = None
+
+
+def get_mirror() -> Optional[Mirror]:
+    """Mirror configurado en `KCMC_MIRROR`, o None para usar Internet."""
+    global _mirror
+    location = os.environ.get(MIRROR_ENV, "").strip()
+    if not location:
+        return None
+    if _mirror is None or location not in (_mirror.location, _mirror.location + "/"):
+        _mirror = Mirror(location)
+    return _mirror
+
+
+# ---------------------------------------------------------------------------
+# Exportación
+# ---------------------------------------------------------------------------
+
+def _link_or_copy(src: str, dst: str):
+    if os.path.exists(dst):
+        return
+    tmp = dst + ".tmp"
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+def _summarize(url: str, body, projects: Dict[str, dict], blobs: Dict[str, int]):
+    """Añade a `projects` los builds (con checksums) que describe un documento."""
+    path = urllib.parse.urlsplit(url).path
+    match = FILL_BUILDS.search(path)
+    if match and isinstance(body, list):
+        project, version = match.groups()
+        builds = []
+        for build in body:
+            download = (build.get("downloads") or {}).get("server:default") or {}
+            sha = (download.get("checksums") or {}).get("sha256")
+            builds.append({"build": build.get("id"), "channel": build.get("channel"),
+                           "sha256": sha, "url": download.get("url"),
+                           "mirrored": sha in blobs})
+        projects.setdefault(project, {})[version] = builds
+        return
+    match = GEYSER_LATEST.search(path)
+    if match and isinstance(body, dict):
+        sha = ((body.get("downloads") or {}).get("spigot") or {}).get("sha256")
+        projects.setdefault(match.group(1), {})[body.get("version")] = [
+            {"build": body.get("build"), "sha256": sha, "mirrored": sha in blobs}]
+
+
+def export(dest: str, store: Optional["artifact_store.ArtifactStore"] = None,
+           cache: Optional[HttpCache] = None) -> Dict[str, int]:
+    """Vuelca la caché HTTP y los blobs de este host en un mirror en `dest`.
+
+    Si `dest` ya es un mirror se amplía (las entradas nuevas sustituyen a las
+    viejas). Devuelve cuántos documentos y blobs contiene.
+    """
+    store = store or artifact_store.get_store()
+    cache = cache or get_cache()
+    os.makedirs(os.path.join(dest, "blobs"), exist_ok=True)
+    try:
+        with open(os.path.join(dest, INDEX_FILE), "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+    documents: Dict[str, str] = index.get("documents", {})
+    artifacts: Dict[str, str] = index.get("artifacts", {})
+    blobs: Dict[str, int] = index.get("blobs", {})
+
+    for entry in os.scandir(store.blobs_dir):
+        _link_or_copy(entry.path, os.path.join(dest, "blobs", entry.name))
+        blobs[entry.name] = entry.stat().st_size
+    for url, digest in store.urls().items():
+        if digest in blobs:
+            artifacts[url] = digest
+
+    for entry in os.scandir(cache.directory):
+        if not entry.name.endswith(".json") or entry.name == BLOCKS_FILE:
+            continue
+        try:
+            with open(entry.path, "r", encoding="utf-8") as f:
+                cached = CacheEntry(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            continue
+        rel = _doc_path(cached.url)
+        path = os.path.join(dest, *rel.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(cached.body)
+        documents[cached.url] = rel
+
+    projects: Dict[str, dict] = {}
+    for url, rel in documents.items():
+        try:
+            with open(os.path.join(dest, *rel.split("/")), "r", encoding="utf-8") as f:
+                _summarize(url, json.load(f), projects, blobs)
+        except (OSError, ValueError):
+            continue
+
+    index = {"generated_at": time.time(), "source": socket.gethostname(),
+             "projects": projects, "documents": documents,
+             "artifacts": artifacts, "blobs": blobs}
+    tmp = os.path.join(dest, INDEX_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+    os.replace(tmp, os.path.join(dest, INDEX_FILE))
+    return {"documents": len(documents), "blobs": len(blobs)}
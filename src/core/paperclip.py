@@ -0,0 +1,226 @@
+"""Pre-parcheo de Paperclip en segundo plano.
+
+Los jars de Paper/Folia son lanzadores Paperclip: en el primer arranque bajan
+el jar de Mojang, aplican el parche y extraen `versions/` y `libraries/`.
+Eso ocurría en el reinicio tras una actualización, con los jugadores
+esperando. Justo después de descargar el jar se ejecuta en modo solo-parche
+(`-Dpaperclip.patchonly=true`), que hace ese trabajo y sale sin arrancar el
+servidor.
+
+El resultado se verifica contra las listas que trae el propio jar
+(`META-INF/versions.list` y `META-INF/libraries.list`, líneas
+`sha256<TAB>id<TAB>ruta`) y el build queda marcado como "caliente" en
+`server_bin/.kcmc/warm.json`, indexado por el sha256 del jar. Los builds de
+la misma versión de Minecraft comparten rutas (`versions/<mc>/paper-<mc>.jar`):
+al parchear uno se desmarcan los que esperaban otro contenido en esas rutas,
+porque su Paperclip tendría que volver a parchear. Los jars que no son
+Paperclip (Velocity, Spigot...) se ignoran.
+
+El arranque espera a que termine un pre-parcheo en curso (`wait_idle`) para
+que dos Paperclip no escriban a la vez en el mismo directorio.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+import zipfile
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from src.core.artifact_store import file_sha256
+
+WARM_FILE = os.path.join(".kcmc", "warm.json")
+LISTS = (("META-INF/versions.list", "versions"), ("META-INF/libraries.list", "libraries"))
+PATCH_TIMEOUT = 900
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+# Pre-parcheos lanzados en segundo plano que aún no han terminado, por directorio
+_pending: Dict[str, int] = {}
+_pending_cond = threading.Condition()
+
+
+def _lock_for(server_dir: str) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(os.path.abspath(server_dir), threading.Lock())
+
+
+@dataclass
+class PatchResult:
+    jar: str
+    ok: bool
+    seconds: float = 0.0
+    files: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    def describe(self) -> str:
+        name = os.path.basename(self.jar)
+        if self.ok:
+            return f"{name} pre-parcheado en {self.seconds:.0f} s ({self.files} archivos verificados)"
+        return f"{name}: pre-parcheo fallido ({'; '.join(self.errors[:3])})"
+
+
+def patch_entries(jar_path: str) -> Optional[List[Tuple[str, str]]]:
+    """[(sha256, ruta relativa al directorio del servidor)] o None si no es Paperclip."""
+    try:
+        with zipfile.ZipFile(jar_path) as jar:
+            names = set(jar.namelist())
+            if not any(name in names for name, _ in LISTS):
+                return None
+            entries = []
+            for name, base in LISTS:
+                if name not in names:
+                    continue
+                for line in jar.read(name).decode("utf-8").splitlines():
+                    parts = line.split("\t")
+                    if len(parts) == 3:
+                        entries.append((parts[0].lower(), os.path.join(base, parts[2])))
+            return entries
+    except (OSError, zipfile.BadZipFile, UnicodeDecodeError):
+        return None
+
+
+def verify(server_dir: str, entries: List[Tuple[str, str]], deep: bool = True) -> List[str]:
+    """Archivos que faltan (o, con `deep`, cuyo sha256 no coincide)."""
+    errors = []
+    for digest, rel in entries:
+        path = os.path.join(server_dir, rel)
+        if not os.path.isfile(path):
+            errors.append(f"falta {rel}")
+        elif deep and file_sha256(path) != digest:
+            errors.append(f"sha256 distinto en {rel}")
+    return errors
+
+
+# -- Registro de builds calientes ------------------------------------------
+
+def _load_warm(server_dir: str) -> Dict[str, dict]:
+    try:
+        with open(os.path.join(server_dir, WARM_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_warm(server_dir: str, data: Dict[str, dict]):
+    path = os.path.join(server_dir, WARM_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def is_warm(jar_path: str, server_dir: Optional[str] = None) -> bool:
+    """El build está marcado y sus archivos siguen en su sitio (comprobación rápida)."""
+    server_dir = server_dir or os.path.dirname(os.path.abspath(jar_path))
+    try:
+        record = _load_warm(server_dir).get(file_sha256(jar_path))
+    except OSError:
+        return False
+    if not record:
+        return False
+    entries = patch_entries(jar_path)
+    return entries is not None and not verify(server_dir, entries, deep=False)
+
+
+def _drop_overwritten(server_dir: str, data: Dict[str, dict],
+                      entries: List[Tuple[str, str]]) -> Dict[str, dict]:
+    """Quita los builds calientes que esperaban otro contenido en las rutas de `entries`."""
+    written = dict((rel, digest) for digest, rel in entries)
+    kept = {}
+    for jar_digest, record in data.items():
+        other = patch_entries(os.path.join(server_dir, record.get("jar", "")))
+        if other and any(written.get(rel, digest) != digest for digest, rel in other):
+            continue
+        kept[jar_digest] = record
+    return kept
+
+
+# -- Pre-parcheo ------------------------------------------------------------
+
+def prepatch(jar_path: str, server_dir: Optional[str] = None, java: str = "java",
+             timeout: float = PATCH_TIMEOUT) -> Optional[PatchResult]:
+    """Ejecuta Paperclip en modo solo-parche y marca el build como caliente.
+
+    Devuelve None si el jar no es Paperclip o ya estaba caliente.
+    """
+    server_dir = server_dir or os.path.dirname(os.path.abspath(jar_path))
+    entries = patch_entries(jar_path)
+    if entries is None:
+        return None
+    with _lock_for(server_dir):
+        if is_warm(jar_path, server_dir):
+            return None
+        result = PatchResult(jar=jar_path, ok=False)
+        started = time.monotonic()
+        executable = shutil.which(java) or java
+        cmd = [executable, "-Dpaperclip.patchonly=true", "-jar", os.path.abspath(jar_path)]
+        try:
+            proc = subprocess.run(cmd, cwd=server_dir, stdin=subprocess.DEVNULL,
+                                  stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                  timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            result.errors.append(str(e))
+            return result
+        result.seconds = time.monotonic() - started
+        if proc.returncode != 0:
+            tail = proc.stdout.decode("utf-8", errors="replace").strip().splitlines()[-1:]
+            result.errors.append(f"java salió con código {proc.returncode}" + (f": {tail[0]}" if tail else ""))
+            return result
+
+        result.errors = verify(server_dir, entries)
+        result.files = len(entries)
+        result.ok = not result.errors
+        if result.ok:
+            data = _drop_overwritten(server_dir, _load_warm(server_dir), entries)
+            data[file_sha256(jar_path)] = {"jar": os.path.basename(jar_path),
+                                           "warmed_at": time.time(),
+                                           "seconds": round(result.seconds, 1),
+                                           "files": result.files}
+            # Solo interesan los jars que siguen en el directorio
+            present = {os.path.basename(p) for p in os.listdir(server_dir) if p.endswith(".jar")}
+            _save_warm(server_dir, {k: v for k, v in data.items() if v.get("jar") in present})
+        return result
+
+
+def is_busy(server_dir: str) -> bool:
+    """Hay un pre-parcheo en curso (o a punto de empezar) en `server_dir`."""
+    with _pending_cond:
+        pending = _pending.get(os.path.abspath(server_dir), 0)
+    return pending > 0 or _lock_for(server_dir).locked()
+
+
+def wait_idle(server_dir: str):
+    """Bloquea hasta que no haya un pre-parcheo en curso en `server_dir`."""
+    key = os.path.abspath(server_dir)
+    with _pending_cond:
+        _pending_cond.wait_for(lambda: not _pending.get(key))
+    with _lock_for(server_dir):
+        pass
+
+
+def prepatch_in_background(jar_path: str, callback=None, server_dir: Optional[str] = None,
+                           java: str = "java") -> threading.Thread:
+    """`prepatch` en un hilo daemon; `callback(PatchResult)` al terminar (no se llama si no aplica)."""
+    key = os.path.abspath(server_dir or os.path.dirname(os.path.abspath(jar_path)))
+    # Se cuenta antes de arrancar el hilo para que `wait_idle` no llegue antes que él
+    with _pending_cond:
+        _pending[key] = _pending.get(key, 0) + 1
+
+    def run():
+        try:
+            result = prepatch(jar_path, server_dir, java)
+        finally:
+            with _pending_cond:
+                _pending[key] -= 1
+                _pending_cond.notify_all()
+        if result and callback:
+            callback(result)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
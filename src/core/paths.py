@@ -24,4 +24,24 @@ def base_dir() -> str:
         os.makedirs(mcsm, exist_ok=True)
         return mcsm
     except OSError:
-        return candidate
\ No newline at end of file
+        return candidate
+
+
+def cache_dir(*parts: str) -> str:
+    """Caché compartida por todas las instancias del usuario, creada si falta.
+
+    `$KCMC_CACHE_DIR`, si no `$XDG_CACHE_HOME/kcmc` (~/.cache/kcmc). Si no es
+    escribible se cae a `<base>/cache`.
+    """
+    root = os.environ.get("KCMC_CACHE_DIR") or os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "kcmc")
+    path = os.path.join(root, *parts)
+    try:
+        os.makedirs(path, exist_ok=True)
+        if os.access(path, os.W_OK):
+            return path
+    except OSError:
+        pass
+    path = os.path.join(base_dir(), "cache", *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -14,6 +14,11 @@ Se puede forzar con la variable KCMC_PI_MODE=1 o el flag `--pi`.
 
 import os
 import platform
+from typing import Optional
+
+from src.core import cpu_topology, gc_log, memory_advisor
+from src.core.paths import base_dir
+from src.core.thermal import ThermalSensor
 
 PI_MODE_ENV = "KCMC_PI_MODE"
 LOW_MEMORY_THRESHOLD_MB = 1536
@@ -125,17 +130,40 @@ def _ram_cap_mb() -> int:
     return max(int(total * 0.75), 0)
 
 
-def get_recommended_server_ram() -> str:
-    """RAM recomendada: ~75% de la RAM libre, múltiplos de 64 MB, con techo por hardware."""
-    total = get_total_ram_mb()
-    avail = get_available_ram_mb() or total
-    if not avail:
-        return "512M"
+_heap_recommendation = None
+
+
+def get_heap_recommendation(quick: bool = False) -> Optional[memory_advisor.HeapRecommendation]:
+    """Recomendación de `memory_advisor` (muestreo de ~1s), calculada una vez por proceso.
+
+    Con `quick` (construcción de la UI) se usa una sola muestra sin esperar
+    mientras el muestreo completo no se haya hecho; ese valor no se guarda.
+    """
+    global _heap_recommendation
+    if _heap_recommendation is None:
+        server_dir = os.path.join(base_dir(), "server_bin")
+        tunnel = os.path.exists(os.path.join(server_dir, "playit"))
+        if quick:
+            return memory_advisor.recommend_heap(server_dir, window=0, samples=1, tunnel_installed=tunnel)
+        _heap_recommendation = memory_advisor.recommend_heap(server_dir, tunnel_installed=tunnel)
+    return _heap_recommendation
+
 
+def get_recommended_server_ram(quick: bool = False) -> str:
+    """RAM recomendada según `memory_advisor`, múltiplos de 64 MB, con techo por hardware.
+
+    Sin /proc/meminfo (macOS) se usa el 75% de la RAM total.
+    """
     cap = _ram_cap_mb()
-    target = int(avail * 0.75)
-    target = (target // 64) * 64
-    target = max(256, min(target, cap))
+    rec = get_heap_recommendation(quick) if sys_platform_is_linux() else None
+    if rec:
+        target = rec.xmx_mb
+    else:
+        total = get_total_ram_mb()
+        if not total:
+            return "512M"
+        target = int(total * 0.75)
+    target = max(256, (min(target, cap) // 64) * 64)
 
     if target >= 1024:
         return f"{target // 1024}G" if target % 1024 == 0 else f"{target}M"
@@ -168,11 +196,15 @@ def get_ram_options() -> list:
     return steps or ["256M"]
 
 
-def get_default_ram() -> str:
-    """RAM por defecto para el selector: la recomendada, ajustada a una opción válida."""
+def get_default_ram(quick: bool = False) -> str:
+    """RAM por defecto para el selector: la recomendada, ajustada a una opción válida.
+
+    `quick` evita el muestreo de ~1s (ver `get_heap_recommendation`): la UI
+    arranca con ese valor y lo afina en segundo plano.
+    """
     if not is_pi_mode():
         return "4G"
-    recommended = _ram_mb(get_recommended_server_ram())
+    recommended = _ram_mb(get_recommended_server_ram(quick))
     options = get_ram_options()
     best = options[0]
     for opt in options:
@@ -189,19 +221,33 @@ def get_default_ram() -> str:
 # JVM
 # ---------------------------------------------------------------------------
 
-def get_java_args(ram: str) -> list:
+def get_java_args(ram: str, gc_stats=None, server_dir: Optional[str] = None) -> list:
     """Args JVM óptimos según el heap asignado.
 
     <= 1G : SerialGC (mejor para 1-2 núcleos y poca RAM, Pi 3B+)
     >  1G : G1GC tuneado para pausas bajas (Pi 4/5 con más RAM)
+
+    Si se pasa `gc_stats` (`gc_log.GCStats` de la ejecución anterior) y las
+    pausas medidas con SerialGC superan dos ticks, se usa G1 aunque el heap
+    sea <= 1G (siempre que haya al menos 2 núcleos). Con `server_dir` esa
+    elección se recuerda para el mismo heap (`gc_log.choose_collector`).
+
+    Con cuota de cgroup o afinidad reducida se añade -XX:ActiveProcessorCount
+    con las CPUs lógicas utilizables (no los núcleos físicos: el SMT no
+    limita a la JVM, solo se tiene en cuenta al dimensionar los pools).
     """
     args = [f"-Xms{ram}", f"-Xmx{ram}"]
+    topo = cpu_topology.get_topology()
+    if topo.restricted:
+        args.append(f"-XX:ActiveProcessorCount={topo.usable}")
 
     if not is_pi_mode():
         args.append("-Dfile.encoding=UTF-8")
         return args
 
-    if _ram_mb(ram) <= 1024:
+    measured_g1 = (gc_log.choose_collector(gc_stats, _ram_mb(ram), server_dir) == "G1"
+                   and topo.effective >= 2)
+    if _ram_mb(ram) <= 1024 and not measured_g1:
         args += [
             "-XX:+UseSerialGC",
             "-XX:MaxMetaspaceSize=128M",
@@ -240,5 +286,14 @@ def get_diagnostics() -> list:
         lines.append(f"[bold orange]Modo optimizado: {model}[/bold orange]")
         lines.append(f"[dim]RAM total: {get_total_ram_mb()} MB | libre: {get_available_ram_mb()} MB[/dim]")
         lines.append(f"[dim]RAM recomendada para el servidor: {get_recommended_server_ram()}[/dim]")
+        rec = get_heap_recommendation()
+        if rec:
+            lines.append(f"[dim]Heap según presión de memoria: {rec.describe()}[/dim]")
+            for reason in rec.reasons:
+                lines.append(f"[dim]  - {reason}[/dim]")
         lines.append(f"[dim]Opciones de RAM: {', '.join(get_ram_options())}[/dim]")
+        topo = cpu_topology.get_topology()
+        lines.append(f"[dim]CPU: {topo.describe()} | hilos: {cpu_topology.thread_plan(topo).describe()}[/dim]")
+        for line in ThermalSensor().read().describe():
+            lines.append(f"[dim]Sensores: {line}[/dim]")
     return lines
\ No newline at end of file
@@ -0,0 +1,239 @@
+"""Análisis de `plugins/`: duplicados, dependencias y orden de carga.
+
+Es habitual encontrar dos copias del mismo plugin (un build viejo
+renombrado) o plugins a los que les falta una dependencia obligatoria: el
+servidor tarda más en arrancar, gasta memoria en clases duplicadas y el
+plugin roto no llega a activarse. A partir de los descriptores de cada jar
+(`plugin_index`) se construye el grafo de dependencias y se detecta:
+
+  duplicate     dos jars declaran el mismo plugin: se conserva el más nuevo
+  missing       falta un plugin de `depend` (el dependiente no carga)
+  cycle         ciclo de dependencias obligatorias
+  api_version   `api-version` más nueva que la versión de Minecraft activa
+  platform      plugin de otra plataforma (Velocity en Paper, Bukkit en Velocity...)
+  orphan        carpeta de datos sin plugin que la use
+
+`depend`, `softdepend` y `loadbefore` dan el orden topológico de carga
+(`load_order`). La plataforma del servidor sale del jar activo
+(`plugin_index.server_platform`); en un proxy no hay versión de Minecraft y
+no se comprueba `api-version`. Se ejecuta desde el sanitizador y antes de
+cada arranque;
+solo recomienda, nunca borra: las carpetas huérfanas pueden tener datos.
+"""
+
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from src.core import plugin_index
+from src.core.plugin_index import PluginInfo
+
+ERROR, WARNING = "error", "warning"
+
+# Plataforma del servidor -> plataformas de plugin que carga
+SERVER_PLATFORMS = {
+    "paper": ("bukkit", "paper"),
+    "velocity": ("velocity",),
+    "bungee": ("bungee",),
+}
+PROXIES = ("velocity", "bungee")
+# Carpetas de plugins/ que no pertenecen a ningún plugin
+NON_PLUGIN_DIRS = {"bstats", "pluginmetrics", "update", ".paper-remapped", ".kcmc"}
+
+
+@dataclass
+class Finding:
+    kind: str
+    severity: str
+    plugin: str
+    message: str
+    remove: Optional[str] = None  # ruta cuya eliminación se recomienda
+
+    def describe(self) -> str:
+        text = f"{self.plugin}: {self.message}"
+        if self.remove:
+            text += f" → eliminar {os.path.basename(self.remove)}"
+        return text
+
+
+@dataclass
+class GraphReport:
+    plugins: List[PluginInfo] = field(default_factory=list)
+    findings: List[Finding] = field(default_factory=list)
+    load_order: List[str] = field(default_factory=list)
+
+    @property
+    def errors(self) -> List[Finding]:
+        return [f for f in self.findings if f.severity == ERROR]
+
+    def removals(self) -> List[str]:
+        return [f.remove for f in self.findings if f.remove]
+
+    def summary(self) -> str:
+        if not self.findings:
+            return f"{len(self.plugins)} plugins sin problemas."
+        return (f"{len(self.plugins)} plugins: {len(self.errors)} error(es), "
+                f"{len(self.findings) - len(self.errors)} aviso(s).")
+
+    def lines(self) -> List[str]:
+        """Texto plano (sin markup) para la TUI/GUI."""
+        lines = [self.summary()]
+        lines += [("✗ " if f.severity == ERROR else "⚠ ") + f.describe() for f in self.findings]
+        if self.load_order and self.findings:
+            lines.append("Orden de carga: " + " → ".join(self.load_order))
+        return lines
+
+
+def _version_key(version: str) -> List[int]:
+    key = []
+    for part in version.replace("-", ".").split("."):
+        digits = "".join(c for c in part if c.isdigit())
+        if not digits:
+            break
+        key.append(int(digits))
+    return key
+
+
+def _api_too_new(api_version: str, mc_version: str) -> bool:
+    """api-version '1.21' exige Minecraft >= 1.21; '1.13' o sin declarar carga en todas."""
+    api, mc = _version_key(api_version), _version_key(mc_version)
+    return bool(api and mc) and api > mc[:max(len(api), 2)]
+
+
+def _newest(copies: List[PluginInfo]) -> PluginInfo:
+    def key(p: PluginInfo):
+        try:
+            mtime = os.path.getmtime(p.jar)
+        except OSError:
+            mtime = 0.0
+        return (_version_key(p.version), mtime)
+    return max(copies, key=key)
+
+
+def _find_cycles(graph: Dict[str, Set[str]]) -> List[List[str]]:
+    """Ciclos del grafo (uno por componente), por DFS iterativo."""
+    state: Dict[str, int] = {}  # 1 = en la pila, 2 = terminado
+    cycles, seen = [], set()
+    for root in sorted(graph):
+        if root in state:
+            continue
+        path: List[str] = []
+        stack = [(root, iter(sorted(graph[root])))]
+        state[root] = 1
+        path.append(root)
+        while stack:
+            node, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                path.pop()
+                state[node] = 2
+            elif state.get(child) == 1:
+                cycle = path[path.index(child):]
+                if not seen.intersection(cycle):
+                    cycles.append(cycle + [child])
+                    seen.update(cycle)
+            elif child not in state and child in graph:
+                state[child] = 1
+                path.append(child)
+                stack.append((child, iter(sorted(graph[child]))))
+    return cycles
+
+
+def _aliases(plugins: List[PluginInfo]) -> Dict[str, str]:
+    """Nombre o alias -> plugin. Con `provides` un plugin responde a otros nombres (p.ej. Vault)."""
+    resolve = {alias: p.name for p in plugins for alias in p.provides}
+    resolve.update({p.name: p.name for p in plugins})
+    return resolve
+
+
+def load_order(plugins: List[PluginInfo]) -> List[str]:
+    """Orden topológico (Kahn, alfabético entre iguales); los ciclos van al final."""
+    names = {p.name for p in plugins}
+    resolve = _aliases(plugins)
+    after: Dict[str, Set[str]] = {n: set() for n in names}  # n carga después de estos
+    for p in plugins:
+        for dep in p.depend + p.softdepend:
+            dep = resolve.get(dep)
+            if dep and dep != p.name:
+                after[p.name].add(dep)
+        for other in p.loadbefore:
+            other = resolve.get(other)
+            if other and other != p.name:
+                after[other].add(p.name)
+    order: List[str] = []
+    ready = sorted(n for n, deps in after.items() if not deps)
+    while ready:
+        name = ready.pop(0)
+        order.append(name)
+        for other, deps in after.items():
+            if name in deps:
+                deps.discard(name)
+                if not deps:
+                    ready.append(other)
+        ready.sort()
+    return order + sorted(names - set(order))
+
+
+def analyze(server_dir: str, mc_version: Optional[str] = None, platform: str = "paper") -> GraphReport:
+    """Analiza `server_dir/plugins` con el índice de descriptores (un `stat` por jar si nada cambió).
+
+    `platform`: la del servidor ('paper', 'velocity' o 'bungee').
+    """
+    plugins_dir = os.path.join(server_dir, "plugins")
+    report = GraphReport(plugins=plugin_index.get_index(server_dir).plugins(plugins_dir))
+
+    by_name: Dict[str, List[PluginInfo]] = {}
+    for p in report.plugins:
+        by_name.setdefault(p.name, []).append(p)
+    active: List[PluginInfo] = []
+    for name, copies in sorted(by_name.items()):
+        keep = _newest(copies)
+        active.append(keep)
+        for dup in copies:
+            if dup is not keep:
+                report.findings.append(Finding(
+                    "duplicate", ERROR, name,
+                    f"copia duplicada ({dup.version or '?'}; se conserva {os.path.basename(keep.jar)})",
+                    remove=dup.jar))
+
+    accepted = SERVER_PLATFORMS.get(platform, SERVER_PLATFORMS["paper"])
+    if platform in PROXIES:
+        mc_version = None  # versión del proxy, no de Minecraft
+    loadable: List[PluginInfo] = []
+    for p in active:
+        if not set(p.platforms or [p.platform]) & set(accepted):
+            report.findings.append(Finding("platform", ERROR, p.name,
+                                           f"es un plugin de {p.platform}, no carga en {platform}",
+                                           remove=p.jar))
+        elif mc_version and p.api_version and _api_too_new(p.api_version, mc_version):
+            report.findings.append(Finding("api_version", ERROR, p.name,
+                                           f"requiere api-version {p.api_version} (servidor en {mc_version})"))
+        else:
+            loadable.append(p)
+
+    resolve = _aliases(loadable)
+    for p in loadable:
+        missing = [dep for dep in p.depend if dep not in resolve]
+        if missing:
+            report.findings.append(Finding("missing", ERROR, p.name,
+                                           f"falta la dependencia {', '.join(missing)}"))
+
+    graph = {p.name: {resolve[d] for d in p.depend if d in resolve} for p in loadable}
+    for cycle in _find_cycles(graph):
+        report.findings.append(Finding("cycle", ERROR, cycle[0],
+                                       "ciclo de dependencias: " + " → ".join(cycle)))
+
+    known = {n.lower() for n in by_name} | {a.lower() for p in report.plugins for a in p.provides}
+    try:
+        entries = sorted(os.scandir(plugins_dir), key=lambda e: e.name)
+    except OSError:
+        entries = []
+    for entry in entries:
+        lower = entry.name.lower()
+        if entry.is_dir() and lower not in known and lower not in NON_PLUGIN_DIRS:
+            report.findings.append(Finding("orphan", WARNING, entry.name,
+                                           "carpeta de datos sin plugin instalado (revisar antes de borrar)"))
+
+    report.load_order = load_order(loadable)
+    return report
@@ -0,0 +1,341 @@
+"""Inventario de plugins a partir de los metadatos de cada jar.
+
+`ServerSanitizer.is_plugin_jar`, `releases.is_server_jar` y la limpieza de
+`PluginManager` clasificaban los jars por el prefijo del nombre: un plugin
+llamado `paper-tweaks.jar` pasaba por jar de servidor (y `prune` podía
+borrarlo), y cada jar de `libraries/` pasaba por plugin mal ubicado.
+
+Aquí se lee el descriptor que trae el propio jar, directamente del
+directorio central del zip (sin extraer nada):
+
+  paper-plugin.yml      Paper          dependencies.server.<Nombre>.required
+  plugin.yml            Bukkit/Spigot  depend / softdepend
+  velocity-plugin.json  Velocity       dependencies[].optional
+  bungee.yml            BungeeCord     depends / softDepends
+
+Un jar sin descriptor es de servidor si trae un lanzador conocido
+(Paperclip, CraftBukkit, Velocity, BungeeCord) y "other" si no
+(librerías); `server_platform` dice qué plugins carga ese servidor. Un jar
+con varios descriptores (ViaVersion trae plugin.yml, bungee.yml y
+velocity-plugin.json) se lee por el primero y lista todos en `platforms`. Los resultados se guardan en `server_bin/.kcmc/plugin_index.json`
+indexados por ruta con su (tamaño, mtime_ns): en las siguientes pasadas solo
+se hace un `stat` por jar.
+"""
+
+import json
+import os
+import threading
+import zipfile
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+INDEX_FILE = os.path.join(".kcmc", "plugin_index.json")
+# Subir al cambiar cómo se leen los descriptores: invalida las entradas guardadas
+PARSER_VERSION = 3
+
+DESCRIPTORS = (
+    ("paper-plugin.yml", "paper"),
+    ("plugin.yml", "bukkit"),
+    ("velocity-plugin.json", "velocity"),
+    ("bungee.yml", "bungee"),
+)
+# Entradas que delatan un jar de servidor o proxy
+SERVER_MARKERS = (
+    "META-INF/versions.list",
+    "io/papermc/paperclip/",
+    "org/bukkit/craftbukkit/Main.class",
+    "com/velocitypowered/proxy/Velocity.class",
+    "net/md_5/bungee/BungeeCord.class",
+)
+# Proxies: marcador del jar o prefijo del nombre -> plataforma de sus plugins
+PROXY_MARKERS = (
+    ("com/velocitypowered/proxy/Velocity.class", "velocity"),
+    ("net/md_5/bungee/BungeeCord.class", "bungee"),
+)
+PROXY_PREFIXES = (("velocity-", "velocity"), ("bungeecord", "bungee"), ("waterfall-", "bungee"))
+
+PLUGIN, SERVER, OTHER = "plugin", "server", "other"
+
+
+@dataclass
+class PluginInfo:
+    jar: str
+    platform: str                 # paper | bukkit | velocity | bungee
+    name: str
+    version: str = ""
+    main: str = ""
+    api_version: str = ""
+    depend: List[str] = field(default_factory=list)
+    softdepend: List[str] = field(default_factory=list)
+    loadbefore: List[str] = field(default_factory=list)
+    provides: List[str] = field(default_factory=list)  # otros nombres que satisface
+    platforms: List[str] = field(default_factory=list)  # todos los descriptores del jar
+
+
+# -- Lectura de descriptores ------------------------------------------------
+
+def _strip_comment(value: str) -> str:
+    """Quita un ` # comentario` final que no esté dentro de comillas."""
+    quote = None
+    for i, c in enumerate(value):
+        if quote:
+            if c == quote:
+                quote = None
+        elif c in ("'", '"'):
+            quote = c
+        elif c == "#" and (i == 0 or value[i - 1] in " \t"):
+            return value[:i].rstrip()
+    return value
+
+
+def _scalar(value: str) -> str:
+    value = _strip_comment(value.strip())
+    if value[:1] in ("'", '"') and value[-1:] == value[:1] and len(value) > 1:
+        return value[1:-1]
+    return value
+
+
+def _flow_list(value: str) -> List[str]:
+    inner = value.strip()[1:-1]
+    return [_scalar(v) for v in inner.split(",") if v.strip()]
+
+
+def parse_descriptor_yaml(text: str) -> Dict[str, object]:
+    """Subconjunto de YAML de los descriptores: mapas por indentación, listas y escalares.
+
+    Los escalares multilínea (`description: |`) se saltan. No es un parser
+    YAML general (ver `yaml_patch` para el mismo criterio).
+    """
+    root: Dict[str, object] = {}
+    # pila de (indentación, contenedor, clave del padre, padre)
+    stack: List[Tuple[int, object, Optional[str], Optional[dict]]] = [(-1, root, None, None)]
+    block_indent = None
+    for raw in text.splitlines():
+        line = raw.rstrip()
+        stripped = line.lstrip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        indent = len(line) - len(stripped)
+        if block_indent is not None:
+            if indent > block_indent:
+                continue
+            block_indent = None
+        is_item = stripped.startswith("- ") or stripped == "-"
+        # los elementos de lista pueden ir a la misma indentación que su clave
+        while len(stack) > 1 and (indent < stack[-1][0] if is_item else indent <= stack[-1][0]):
+            stack.pop()
+        _, container, parent_key, parent = stack[-1]
+
+        if is_item:
+            item = _scalar(stripped[1:])
+            if parent is not None and isinstance(container, dict) and not container:
+                # primera entrada: el mapa vacío del padre pasa a ser una lista
+                container = []
+                parent[parent_key] = container
+                stack[-1] = (stack[-1][0], container, parent_key, parent)
+            if isinstance(container, list):
+                container.append(item)
+            continue
+
+        key, sep, value = stripped.partition(":")
+        if not sep or not isinstance(container, dict):
+            continue
+        key, value = _scalar(key), _strip_comment(value.strip())
+        if value in ("|", ">", "|-", ">-", "|+", ">+"):
+            block_indent = indent
+        elif value.startswith("["):
+            container[key] = _flow_list(value)
+        elif value:
+            container[key] = _scalar(value)
+        else:
+            child: Dict[str, object] = {}
+            container[key] = child
+            stack.append((indent, child, key, container))
+    return root
+
+
+def _as_list(value) -> List[str]:
+    if isinstance(value, list):
+        return [str(v) for v in value]
+    if isinstance(value, str) and value:
+        return [value]
+    return []
+
+
+def _from_yaml(jar: str, platform: str, data: Dict[str, object]) -> Optional[PluginInfo]:
+    name = data.get("name")
+    if not isinstance(name, str) or not name:
+        return None
+    info = PluginInfo(jar=jar, platform=platform, name=name, version=str(data.get("version", "")),
+                      main=str(data.get("main", "")), api_version=str(data.get("api-version", "")),
+                      provides=_as_list(data.get("provides")))
+    if platform == "paper":
+        deps = data.get("dependencies")
+        server = deps.get("server") if isinstance(deps, dict) else None
+        for dep, conf in (server.items() if isinstance(server, dict) else ()):
+            conf = conf if isinstance(conf, dict) else {}
+            required = str(conf.get("required", "true")).lower() != "false"
+            (info.depend if required else info.softdepend).append(dep)
+            # "load: AFTER": la dependencia carga después de este plugin
+            if str(conf.get("load", "")).upper() == "AFTER":
+                info.loadbefore.append(dep)
+    elif platform == "bungee":
+        info.depend = _as_list(data.get("depends"))
+        info.softdepend = _as_list(data.get("softDepends"))
+    else:
+        info.depend = _as_list(data.get("depend"))
+        info.softdepend = _as_list(data.get("softdepend"))
+        info.loadbefore = _as_list(data.get("loadbefore"))
+    return info
+
+
+def _from_velocity(jar: str, data: dict) -> Optional[PluginInfo]:
+    name = data.get("name") or data.get("id")
+    if not name:
+        return None
+    info = PluginInfo(jar=jar, platform="velocity", name=str(name),
+                      version=str(data.get("version", "")), main=str(data.get("main", "")))
+    for dep in data.get("dependencies") or []:
+        (info.softdepend if dep.get("optional") else info.depend).append(str(dep.get("id")))
+    return info
+
+
+def read_jar(path: str) -> Tuple[str, Optional[PluginInfo]]:
+    """(clase, PluginInfo o None) leyendo solo el directorio central y el descriptor."""
+    try:
+        with zipfile.ZipFile(path) as jar:
+            names = jar.namelist()
+            present = set(names)
+            platforms = [platform for descriptor, platform in DESCRIPTORS if descriptor in present]
+            for descriptor, platform in DESCRIPTORS:
+                if descriptor not in present:
+                    continue
+                text = jar.read(descriptor).decode("utf-8", errors="replace")
+                if platform == "velocity":
+                    info = _from_velocity(path, json.loads(text))
+                else:
+                    info = _from_yaml(path, platform, parse_descriptor_yaml(text))
+                if info:
+                    info.platforms = platforms
+                    return PLUGIN, info
+            if any(n.startswith(SERVER_MARKERS) for n in names):
+                return SERVER, None
+    except (OSError, zipfile.BadZipFile, ValueError, AttributeError):
+        pass
+    return OTHER, None
+
+
+def server_platform(path: str) -> str:
+    """Plataforma de plugins del jar de servidor: 'velocity', 'bungee' o 'paper' (Bukkit/Paper/Folia)."""
+    try:
+        with zipfile.ZipFile(path) as jar:
+            present = set(jar.namelist())
+        for marker, platform in PROXY_MARKERS:
+            if marker in present:
+                return platform
+        if any(n.startswith(("io/papermc/paperclip/", "org/bukkit/")) for n in present):
+            return "paper"
+    except (OSError, zipfile.BadZipFile):
+        pass
+    name = os.path.basename(path).lower()
+    for prefix, platform in PROXY_PREFIXES:
+        if name.startswith(prefix):
+            return platform
+    return "paper"
+
+
+# -- Índice persistente -----------------------------------------------------
+
+class PluginIndex:
+    def __init__(self, server_dir: str):
+        self.server_dir = os.path.abspath(server_dir)
+        self.path = os.path.join(self.server_dir, INDEX_FILE)
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, dict]] = None
+        self._dirty = False
+
+    def _load(self) -> Dict[str, dict]:
+        if self._entries is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def _key(self, path: str) -> str:
+        path = os.path.abspath(path)
+        rel = os.path.relpath(path, self.server_dir)
+        return path if rel.startswith("..") else rel
+
+    def lookup(self, path: str) -> Tuple[str, Optional[PluginInfo]]:
+        """Clase y metadatos del jar; solo se abre si cambió desde la última vez."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return OTHER, None
+        key = self._key(path)
+        with self._lock:
+            entry = self._load().get(key)
+        if (entry and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns
+                and entry.get("parser") == PARSER_VERSION):
+            info = entry.get("info")
+            return entry["kind"], PluginInfo(**{**info, "jar": os.path.abspath(path)}) if info else None
+        kind, info = read_jar(path)
+        with self._lock:
+            self._load()[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                                 "parser": PARSER_VERSION, "kind": kind,
+                                 "info": {k: v for k, v in asdict(info).items() if k != "jar"} if info else None}
+            self._dirty = True
+        return kind, info
+
+    def kind(self, path: str) -> str:
+        return self.lookup(path)[0]
+
+    def info(self, path: str) -> Optional[PluginInfo]:
+        return self.lookup(path)[1]
+
+    def plugins(self, directory: Optional[str] = None) -> List[PluginInfo]:
+        """Plugins de `directory` (por defecto `plugins/`), guardando el índice si cambió."""
+        directory = directory or os.path.join(self.server_dir, "plugins")
+        found = []
+        try:
+            entries = [e for e in os.scandir(directory) if e.name.endswith(".jar") and e.is_file()]
+        except OSError:
+            entries = []
+        for entry in sorted(entries, key=lambda e: e.name):
+            info = self.info(entry.path)
+            if info:
+                found.append(info)
+        self.save()
+        return found
+
+    def find(self, name: str, directory: Optional[str] = None) -> List[PluginInfo]:
+        """Jars que declaran el plugin `name` (sin distinguir mayúsculas)."""
+        return [p for p in self.plugins(directory) if p.name.lower() == name.lower()]
+
+    def save(self):
+        """Escribe el índice si hubo cambios, olvidando los jars que ya no existen."""
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = {k: v for k, v in self._load().items()
+                       if os.path.exists(k if os.path.isabs(k) else os.path.join(self.server_dir, k))}
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(entries, f, indent=1, sort_keys=True)
+                os.replace(tmp, self.path)
+            except OSError:
+                return
+            self._entries, self._dirty = entries, False
+
+
+_indexes: Dict[str, PluginIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(server_dir: str) -> PluginIndex:
+    with _indexes_lock:
+        return _indexes.setdefault(os.path.abspath(server_dir), PluginIndex(server_dir))
@@ -1,257 +1,280 @@
 import os
 import json
-from typing import Optional, Dict, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Iterable, Tuple
 
-from src.core import http_client
+from src.core import releases
+from src.core.artifact_store import get_store
+from src.core.plugin_index import get_index
+from src.core.plugin_providers import PluginSpec, Resolved, ResolveError, resolve_all
 
 class PluginManager:
-    # APIs
-    GEYSER_API = "https://download.geysermc.org/v2/projects/geyser/versions/latest/builds/latest"
-    FLOODGATE_API = "https://download.geysermc.org/v2/projects/floodgate/versions/latest/builds/latest"
-    KUBECONTROL_API = "https://api.github.com/repos/bm0x/KubeControlPlugin/releases/latest"
-    
-    # Download URLs
-    GEYSER_DOWNLOAD = "https://download.geysermc.org/v2/projects/geyser/versions/latest/builds/latest/downloads/spigot"
-    FLOODGATE_DOWNLOAD = "https://download.geysermc.org/v2/projects/floodgate/versions/latest/builds/latest/downloads/spigot"
+    # Built-in plugins; `.kcmc/plugins.json` can add more or override these
+    BUILTIN = (
+        PluginSpec(id="geyser", provider="geysermc", project="geyser"),
+        PluginSpec(id="floodgate", provider="geysermc", project="floodgate"),
+        PluginSpec(id="kubecontrol", provider="github", project="bm0x/KubeControlPlugin"),
+    )
+    SPECS_FILE = os.path.join(".kcmc", "plugins.json")
+
+    # Update checks answer from the HTTP cache for this long (see http_cache)
+    UPDATE_CHECK_MAX_AGE = 3600
+    # One deadline (seconds) shared by all remote-info calls of a check
+    REMOTE_DEADLINE = 12
 
     def __init__(self, plugins_dir=None):
         self.plugins_dir = plugins_dir or os.path.join("server_bin", "plugins")
+        self.server_dir = os.path.dirname(os.path.abspath(self.plugins_dir))
         self.metadata_file = os.path.join(self.plugins_dir, ".plugin_versions.json")
         if not os.path.exists(self.plugins_dir):
             os.makedirs(self.plugins_dir)
+        # In-memory copy of the metadata file; re-read only if it changes on disk
+        self._metadata: Optional[Dict] = None
+        self._metadata_mtime: Optional[float] = None
+        self._metadata_lock = threading.Lock()
     
     # ==================== Metadata Management ====================
     
     def _load_metadata(self) -> Dict:
-        """Load installed plugins metadata."""
-        if os.path.exists(self.metadata_file):
-            try:
-                with open(self.metadata_file, 'r') as f:
-                    return json.load(f)
-            except:
-                pass
-        return {}
+        """Installed plugins metadata (cached; one stat per call)."""
+        try:
+            mtime = os.path.getmtime(self.metadata_file)
+        except OSError:
+            mtime = None
+        with self._metadata_lock:
+            if self._metadata is None or mtime != self._metadata_mtime:
+                data = {}
+                if mtime is not None:
+                    try:
+                        with open(self.metadata_file, 'r') as f:
+                            data = json.load(f)
+                    except (OSError, ValueError):
+                        pass
+                self._metadata, self._metadata_mtime = data, mtime
+            return self._metadata
     
     def _save_metadata(self, data: Dict):
         """Save plugins metadata."""
-        with open(self.metadata_file, 'w') as f:
-            json.dump(data, f, indent=2)
+        with self._metadata_lock:
+            with open(self.metadata_file, 'w') as f:
+                json.dump(data, f, indent=2)
+            self._metadata = data
+            self._metadata_mtime = os.path.getmtime(self.metadata_file)
     
-    def _update_plugin_metadata(self, plugin_name: str, version: str, build: int = None, filename: str = None):
-        """Update metadata for a specific plugin."""
+    def _update_plugin_metadata(self, plugin_name: str, version: str, build: int = None,
+                                filename: str = None, save: bool = True):
+        """Update metadata for a specific plugin (in memory; written unless `save` is False)."""
         metadata = self._load_metadata()
-        metadata[plugin_name] = {
-            "version": version,
-            "build": build,
-            "filename": filename
-        }
-        self._save_metadata(metadata)
-    
-    # ==================== Version Checking ====================
-    
-    def get_remote_geyser_info(self) -> Optional[Dict]:
-        """Get latest Geyser version info from API."""
-        try:
-            data = http_client.get_json(self.GEYSER_API, timeout=10)
-            return {
-                "version": data.get("version"),
-                "build": data.get("build"),
-                "sha256": data.get("downloads", {}).get("spigot", {}).get("sha256")
-            }
-        except Exception:
-            return None
-    
-    def get_remote_floodgate_info(self) -> Optional[Dict]:
-        """Get latest Floodgate version info from API."""
-        try:
-            data = http_client.get_json(self.FLOODGATE_API, timeout=10)
-            return {
-                "version": data.get("version"),
-                "build": data.get("build"),
-                "sha256": data.get("downloads", {}).get("spigot", {}).get("sha256")
+        with self._metadata_lock:
+            metadata[plugin_name] = {
+                "version": version,
+                "build": build,
+                "filename": filename
             }
-        except Exception:
-            return None
+        if save:
+            self._save_metadata(metadata)
     
-    def get_remote_kubecontrol_info(self) -> Optional[Dict]:
-        """Get latest KubeControlPlugin version info from GitHub."""
+    # ==================== Plugin Specs ====================
+
+    def get_specs(self) -> Dict[str, PluginSpec]:
+        """Built-in plugins plus those declared in `server_bin/.kcmc/plugins.json`.
+
+        Example: {"plugins": [{"id": "luckperms", "provider": "modrinth", "project": "luckperms"}]}
+        """
+        specs = {spec.id: spec for spec in self.BUILTIN}
+        path = os.path.join(self.server_dir, self.SPECS_FILE)
         try:
-            data = http_client.get_json(self.KUBECONTROL_API, timeout=10)
-            jar_asset = next((a for a in data.get("assets", []) if a["name"].endswith(".jar")), None)
-            return {
-                "version": data.get("tag_name"),
-                "download_url": jar_asset["browser_download_url"] if jar_asset else None,
-                "filename": jar_asset["name"] if jar_asset else None
-            }
-        except Exception:
-            return None
-    
-    def check_for_updates(self) -> Dict[str, Tuple[bool, str, str]]:
+            with open(path, 'r', encoding='utf-8') as f:
+                declared = json.load(f).get("plugins", [])
+        except (OSError, ValueError, AttributeError):
+            declared = []
+        for entry in declared:
+            try:
+                spec = PluginSpec.from_dict(entry)
+            except (TypeError, AttributeError):
+                print(f"Entrada inválida en {path}: {entry}")
+                continue
+            if spec.id:
+                specs[spec.id] = spec
+        return specs
+
+    def get_mc_version(self) -> Optional[str]:
+        """Minecraft version of the active server build (filters plugin versions)."""
+        jar = releases.active_jar(self.server_dir)
+        return releases.mc_version(jar) if jar else None
+
+    # ==================== Version Checking ====================
+
+    def fetch_remote_info(self, plugins: Iterable[str] = None, cached: bool = False,
+                          deadline: float = None) -> Dict[str, object]:
+        """
+        Resolve the latest compatible version of `plugins` (default: all specs)
+        in one concurrent round sharing a single deadline.
+        Returns: {plugin_name: Resolved or the ResolveError that stopped it}
+        """
+        specs = self.get_specs()
+        names = list(specs) if plugins is None else list(plugins)
+        results = {name: ResolveError(f"{name}: plugin desconocido") for name in names if name not in specs}
+        max_age = self.UPDATE_CHECK_MAX_AGE if cached else 0
+        results.update(resolve_all([specs[name] for name in names if name in specs],
+                                   mc_version=self.get_mc_version(), max_age=max_age,
+                                   stale_ok=cached, deadline=deadline or self.REMOTE_DEADLINE))
+        return results
+
+    @staticmethod
+    def _is_current(local: Dict, resolved: Resolved) -> bool:
+        if resolved.build is not None:
+            return local.get("build") == resolved.build
+        return local.get("version") == resolved.version
+
+    @staticmethod
+    def _describe_local(local: Dict) -> str:
+        if not local:
+            return "No instalado"
+        if local.get("build") is not None:
+            return f"{local.get('version', 'N/A')} (build {local['build']})"
+        return str(local.get("version", "N/A"))
+
+    def check_for_updates(self, cached: bool = True,
+                          remote: Optional[Dict[str, object]] = None) -> Dict[str, Tuple[bool, str, str]]:
         """
-        Check all plugins for updates.
+        Check every plugin (built-in or declared in `.kcmc/plugins.json`) for updates.
+        With `cached`, answers instantly from the HTTP cache (stale copies are
+        revalidated in the background); otherwise every API is revalidated.
+        `remote` reuses the result of `fetch_remote_info` instead of asking again.
         Returns: {plugin_name: (has_update, current_version, latest_version)}
         """
         results = {}
         metadata = self._load_metadata()
-        
-        # Check Geyser
-        geyser_remote = self.get_remote_geyser_info()
-        geyser_local = metadata.get("geyser", {})
-        if geyser_remote:
-            has_update = geyser_remote["build"] != geyser_local.get("build")
-            results["geyser"] = (
-                has_update,
-                f"{geyser_local.get('version', 'N/A')} (build {geyser_local.get('build', '?')})",
-                f"{geyser_remote['version']} (build {geyser_remote['build']})"
-            )
-        
-        # Check Floodgate
-        floodgate_remote = self.get_remote_floodgate_info()
-        floodgate_local = metadata.get("floodgate", {})
-        if floodgate_remote:
-            has_update = floodgate_remote["build"] != floodgate_local.get("build")
-            results["floodgate"] = (
-                has_update,
-                f"{floodgate_local.get('version', 'N/A')} (build {floodgate_local.get('build', '?')})",
-                f"{floodgate_remote['version']} (build {floodgate_remote['build']})"
-            )
-        
-        # Check KubeControlPlugin
-        kube_remote = self.get_remote_kubecontrol_info()
-        kube_local = metadata.get("kubecontrol", {})
-        if kube_remote:
-            has_update = kube_remote["version"] != kube_local.get("version")
-            results["kubecontrol"] = (
-                has_update,
-                kube_local.get("version", "No instalado"),
-                kube_remote["version"] if kube_remote["version"] else "No disponible"
-            )
-        
+        if remote is None:
+            remote = self.fetch_remote_info(cached=cached)
+
+        for name, resolved in remote.items():
+            if not isinstance(resolved, Resolved):
+                continue
+            local = metadata.get(name, {})
+            results[name] = (not self._is_current(local, resolved),
+                             self._describe_local(local), resolved.describe())
+
         return results
     
     # ==================== Download & Update ====================
     
-    def _remove_old_plugin(self, plugin_name: str):
-        """Remove old plugin JAR based on metadata."""
+    def _remove_old_plugin(self, plugin_name: str, keep: str = None):
+        """Remove old plugin JAR based on metadata (never the freshly downloaded `keep`)."""
         metadata = self._load_metadata()
         plugin_data = metadata.get(plugin_name, {})
         old_filename = plugin_data.get("filename")
         
-        if old_filename:
+        if old_filename and old_filename != keep:
             old_path = os.path.join(self.plugins_dir, old_filename)
             if os.path.exists(old_path):
                 os.remove(old_path)
                 print(f"Eliminado plugin antiguo: {old_filename}")
         
-        # Also try to find by pattern (fallback)
-        patterns = {
-            "geyser": "Geyser",
-            "floodgate": "floodgate",
-            "kubecontrol": "KubeControlPlugin"
-        }
-        pattern = patterns.get(plugin_name, "")
-        if pattern and os.path.exists(self.plugins_dir):
-            for f in os.listdir(self.plugins_dir):
-                if f.startswith(pattern) and f.endswith(".jar"):
-                    os.remove(os.path.join(self.plugins_dir, f))
-                    print(f"Eliminado: {f}")
-    
-    def download_geyser(self, force_update: bool = False) -> str:
-        """Download or update Geyser plugin."""
-        remote_info = self.get_remote_geyser_info()
-        if not remote_info:
-            raise Exception("No se pudo obtener información de Geyser")
+        # Also remove any other JAR that declares the same plugin (e.g. installed by hand)
+        index = get_index(self.server_dir)
+        new_info = index.info(os.path.join(self.plugins_dir, keep)) if keep else None
+        if new_info:
+            for info in index.find(new_info.name, self.plugins_dir):
+                if os.path.basename(info.jar) != keep:
+                    os.remove(info.jar)
+                    print(f"Eliminado: {os.path.basename(info.jar)}")
+
+    def install_plugin(self, name: str, force_update: bool = False, resolved: Resolved = None,
+                       save: bool = True) -> str:
+        """Download or update one plugin (`resolved` from a previous check is reused)."""
+        if resolved is None:
+            resolved = self.fetch_remote_info([name])[name]
+        if isinstance(resolved, Exception):
+            raise resolved
         
-        metadata = self._load_metadata()
-        local_info = metadata.get("geyser", {})
+        local_info = self._load_metadata().get(name, {})
         
         # Check if update needed
-        if not force_update and local_info.get("build") == remote_info["build"]:
-            existing = os.path.join(self.plugins_dir, local_info.get("filename", ""))
-            if os.path.exists(existing):
+        if not force_update and self._is_current(local_info, resolved):
+            existing = os.path.join(self.plugins_dir, local_info.get("filename") or "")
+            if os.path.isfile(existing):
                 return existing  # Already up to date
         
-        # Remove old version
-        self._remove_old_plugin("geyser")
-        
-        # Download new version
-        filename = f"Geyser-Spigot-{remote_info['version']}-b{remote_info['build']}.jar"
-        path = self._download(self.GEYSER_DOWNLOAD, filename)
+        # Download new version; the old one goes only once the new one is in place
+        path = self._download(resolved)
+        self._remove_old_plugin(name, keep=resolved.filename)
         
-        # Update metadata
-        self._update_plugin_metadata("geyser", remote_info["version"], remote_info["build"], filename)
+        self._update_plugin_metadata(name, resolved.version, resolved.build, resolved.filename,
+                                     save=save)
         
         return path
     
-    def download_floodgate(self, force_update: bool = False) -> str:
+    def download_geyser(self, force_update: bool = False, remote_info: Resolved = None,
+                        save: bool = True) -> str:
+        """Download or update Geyser plugin."""
+        return self.install_plugin("geyser", force_update, remote_info, save)
+    
+    def download_floodgate(self, force_update: bool = False, remote_info: Resolved = None,
+                           save: bool = True) -> str:
         """Download or update Floodgate plugin."""
-        remote_info = self.get_remote_floodgate_info()
-        if not remote_info:
-            raise Exception("No se pudo obtener información de Floodgate")
-        
-        metadata = self._load_metadata()
-        local_info = metadata.get("floodgate", {})
-        
-        if not force_update and local_info.get("build") == remote_info["build"]:
-            existing = os.path.join(self.plugins_dir, local_info.get("filename", ""))
-            if os.path.exists(existing):
-                return existing
-        
-        self._remove_old_plugin("floodgate")
-        
-        filename = f"floodgate-spigot-{remote_info['version']}-b{remote_info['build']}.jar"
-        path = self._download(self.FLOODGATE_DOWNLOAD, filename)
-        
-        self._update_plugin_metadata("floodgate", remote_info["version"], remote_info["build"], filename)
-        
-        return path
+        return self.install_plugin("floodgate", force_update, remote_info, save)
     
-    def download_kubecontrol_plugin(self, force_update: bool = False) -> str:
+    def download_kubecontrol_plugin(self, force_update: bool = False, remote_info: Resolved = None,
+                                    save: bool = True) -> str:
         """Download or update KubeControlPlugin from GitHub Releases."""
-        remote_info = self.get_remote_kubecontrol_info()
-        if not remote_info or not remote_info.get("download_url"):
-            raise Exception("No se encontró un release de KubeControlPlugin. Crea un tag en GitHub primero.")
-        
-        metadata = self._load_metadata()
-        local_info = metadata.get("kubecontrol", {})
-        
-        if not force_update and local_info.get("version") == remote_info["version"]:
-            existing = os.path.join(self.plugins_dir, local_info.get("filename", ""))
-            if os.path.exists(existing):
-                return existing
-        
-        self._remove_old_plugin("kubecontrol")
-        
-        filename = remote_info["filename"]
-        path = self._download(remote_info["download_url"], filename)
-        
-        self._update_plugin_metadata("kubecontrol", remote_info["version"], filename=filename)
-        
-        return path
+        try:
+            return self.install_plugin("kubecontrol", force_update, remote_info, save)
+        except ResolveError as e:
+            raise Exception("No se encontró un release de KubeControlPlugin. Crea un tag en GitHub primero.") from e
     
-    def update_all_plugins(self) -> Dict[str, str]:
-        """Update all installed plugins that have updates available."""
+    def install_plugins(self, plugins: Iterable[str], force_update: bool = False,
+                        remote: Optional[Dict[str, object]] = None) -> Dict[str, object]:
+        """
+        Download `plugins` in parallel, reusing `remote` (from `fetch_remote_info`)
+        or resolving all of them in one round. Metadata is written once at the end.
+        Returns: {plugin_name: path or the Exception that stopped it}
+        """
+        plugins = list(plugins)
+        if remote is None:
+            remote = self.fetch_remote_info(plugins)
         results = {}
-        updates = self.check_for_updates()
+        with ThreadPoolExecutor(max_workers=len(plugins) or 1) as pool:
+            futures = {name: pool.submit(self.install_plugin, name, force_update=force_update,
+                                         resolved=remote.get(name), save=False)
+                       for name in plugins}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                results[name] = e
+        self._save_metadata(self._load_metadata())
+        return results
+    
+    def update_all_plugins(self, remote: Optional[Dict[str, object]] = None) -> Dict[str, str]:
+        """
+        Update all installed plugins that have updates available.
+        One concurrent round of remote-info calls serves both the check and
+        the downloads; pass `remote` to share it across several servers.
+        """
+        results = {}
+        if remote is None:
+            remote = self.fetch_remote_info()
+        updates = self.check_for_updates(remote=remote)
         
+        pending = [plugin for plugin, (has_update, _, _) in updates.items() if has_update]
+        installed = self.install_plugins(pending, force_update=True, remote=remote) if pending else {}
         for plugin, (has_update, current, latest) in updates.items():
-            if has_update:
-                try:
-                    if plugin == "geyser":
-                        self.download_geyser(force_update=True)
-                    elif plugin == "floodgate":
-                        self.download_floodgate(force_update=True)
-                    elif plugin == "kubecontrol":
-                        self.download_kubecontrol_plugin(force_update=True)
-                    results[plugin] = f"Actualizado: {current} → {latest}"
-                except Exception as e:
-                    results[plugin] = f"Error: {e}"
-            else:
+            if not has_update:
                 results[plugin] = "Ya está actualizado"
+            elif isinstance(installed.get(plugin), Exception):
+                results[plugin] = f"Error: {installed[plugin]}"
+            else:
+                results[plugin] = f"Actualizado: {current} → {latest}"
         
         return results
-    
-    def _download(self, url: str, filename: str) -> str:
-        output_path = os.path.join(self.plugins_dir, filename)
-        print(f"Descargando {filename}...")
-        return http_client.download(url, output_path)
+
+    def _download(self, resolved: Resolved) -> str:
+        output_path = os.path.join(self.plugins_dir, resolved.filename)
+        print(f"Descargando {resolved.filename}...")
+        # Shared store: other server instances reuse the same blob (see artifact_store);
+        # every provider's checksums are verified there before the jar is linked in
+        return get_store().fetch(resolved.url, output_path, sha256=resolved.sha256,
+                                 hashes=resolved.hashes, immutable=resolved.immutable)
@@ -0,0 +1,291 @@
+"""Adaptadores de registros de plugins con una única tubería de resolución.
+
+Solo se conocían Geyser, Floodgate y KubeControlPlugin, cada uno con su par
+`get_remote_*_info` / `download_*` copiado. Aquí cada origen es un adaptador
+que convierte un `PluginSpec` (qué plugin, de dónde, qué canal o versión) en
+un `Resolved` (versión, URL, nombre de archivo y checksums):
+
+  modrinth  api.modrinth.com/v2   sha512 + sha1; filtra loader y versión de MC
+  hangar    hangar.papermc.io     sha256; filtra plataforma PAPER y versión
+  spigot    api.spiget.org        sin checksum; `testedVersions` como filtro
+  github    api.github.com        `digest` sha256 del asset si lo publica
+  geysermc  download.geysermc.org sha256 (Geyser, Floodgate)
+  url       URL directa           sha256 opcional dado en la spec
+
+`resolve_all` resuelve un lote entero a la vez: todas las peticiones van en
+paralelo con un plazo común, por `http_client` (caché en disco, keep-alive y
+mirror), y se elige la versión más reciente compatible con la versión de
+Minecraft del servidor. La descarga de cualquier `Resolved` pasa después por
+el mismo camino verificado (`artifact_store.fetch` con sus checksums).
+"""
+
+import fnmatch
+import json
+import os
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from src.core import http_client
+
+TIMEOUT = 10
+DEADLINE = 15
+MAX_WORKERS = 8
+# Loaders de Modrinth que cargan en Paper/Folia
+MODRINTH_LOADERS = ("paper", "spigot", "bukkit", "purpur", "folia")
+
+
+class ResolveError(Exception):
+    """No hay versión que cumpla la spec (o el registro no respondió)."""
+
+
+@dataclass
+class PluginSpec:
+    id: str
+    provider: str
+    project: str = ""
+    version: Optional[str] = None    # versión fija; None = la más reciente compatible
+    channel: str = "release"         # release | beta | alpha
+    asset: str = "*.jar"             # patrón del asset (GitHub)
+    url: Optional[str] = None        # proveedor "url"
+    sha256: Optional[str] = None     # proveedor "url"
+    filename: Optional[str] = None   # nombre en plugins/ si se quiere fijar
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PluginSpec":
+        known = {k: v for k, v in data.items() if k in cls.__dataclass_fields__}
+        known.setdefault("id", str(data.get("project") or data.get("url") or ""))
+        return cls(**known)
+
+
+@dataclass
+class Resolved:
+    id: str
+    provider: str
+    version: str
+    url: str
+    filename: str
+    build: Optional[int] = None
+    sha256: Optional[str] = None
+    hashes: Dict[str, str] = field(default_factory=dict)  # otros algoritmos (sha512...)
+    immutable: bool = True    # la URL siempre sirve los mismos bytes
+    mc_versions: List[str] = field(default_factory=list)
+
+    def key(self) -> tuple:
+        """Lo que identifica la versión instalada (build si el origen lo numera)."""
+        return (self.version, self.build) if self.build is not None else (self.version,)
+
+    def describe(self) -> str:
+        return f"{self.version} (build {self.build})" if self.build is not None else str(self.version)
+
+
+def mc_matches(mc_version: Optional[str], supported: Iterable[str]) -> bool:
+    """'1.21.4' encaja con '1.21.4', '1.21', '1.21.x'. Sin datos de alguno de los dos, sí."""
+    supported = [v for v in supported if v]
+    if not mc_version or not supported:
+        return True
+    for v in supported:
+        v = v[:-2] if v.endswith(".x") else v
+        if mc_version == v or mc_version.startswith(v + "."):
+            return True
+    return False
+
+
+def _channel_ok(wanted: str, channel: Optional[str]) -> bool:
+    """release solo acepta release; beta acepta release y beta; alpha, todo."""
+    order = ("release", "beta", "alpha")
+    got = (channel or "release").lower()
+    if got not in order:
+        got = "beta"
+    return order.index(got) <= order.index(wanted if wanted in order else "release")
+
+
+def _get(url: str, max_age: float, stale_ok: bool):
+    return http_client.get_json(url, timeout=TIMEOUT, max_age=max_age, stale_ok=stale_ok)
+
+
+class Provider:
+    name = ""
+
+    def resolve(self, spec: PluginSpec, mc_version: Optional[str],
+                max_age: float = 0, stale_ok: bool = False) -> Resolved:
+        raise NotImplementedError
+
+
+class ModrinthProvider(Provider):
+    name = "modrinth"
+    API = "https://api.modrinth.com/v2"
+
+    def resolve(self, spec, mc_version, max_age=0, stale_ok=False):
+        query = {"loaders": json.dumps(list(MODRINTH_LOADERS))}
+        if mc_version:
+            query["game_versions"] = json.dumps([mc_version])
+        versions = _get(f"{self.API}/project/{urllib.parse.quote(spec.project)}/version?"
+                        f"{urllib.parse.urlencode(query)}", max_age, stale_ok)
+        for version in versions or []:
+            if spec.version and version.get("version_number") != spec.version:
+                continue
+            if not spec.version and not _channel_ok(spec.channel, version.get("version_type")):
+                continue
+            files = version.get("files") or []
+            file = next((f for f in files if f.get("primary")), None) or \
+                next((f for f in files if f.get("filename", "").endswith(".jar")), None)
+            if not file:
+                continue
+            hashes = file.get("hashes") or {}
+            return Resolved(id=spec.id, provider=self.name, version=version.get("version_number"),
+                            url=file["url"], filename=spec.filename or file["filename"],
+                            hashes={k: v for k, v in hashes.items() if k in ("sha512", "sha1")},
+                            mc_versions=version.get("game_versions") or [])
+        raise ResolveError(f"{spec.project}: ninguna versión en Modrinth para MC {mc_version or '?'}")
+
+
+class HangarProvider(Provider):
+    name = "hangar"
+    API = "https://hangar.papermc.io/api/v1"
+
+    def resolve(self, spec, mc_version, max_age=0, stale_ok=False):
+        query = {"limit": 25, "offset": 0, "platform": "PAPER"}
+        if mc_version:
+            query["platformVersion"] = mc_version
+        data = _get(f"{self.API}/projects/{urllib.parse.quote(spec.project)}/versions?"
+                    f"{urllib.parse.urlencode(query)}", max_age, stale_ok)
+        for version in (data or {}).get("result", []):
+            if spec.version and version.get("name") != spec.version:
+                continue
+            if not spec.version and not _channel_ok(spec.channel, (version.get("channel") or {}).get("name")):
+                continue
+            supported = (version.get("platformDependencies") or {}).get("PAPER") or []
+            if not mc_matches(mc_version, supported):
+                continue
+            download = (version.get("downloads") or {}).get("PAPER") or {}
+            info = download.get("fileInfo") or {}
+            url = download.get("downloadUrl") or download.get("externalUrl")
+            if not url:
+                continue
+            filename = spec.filename or info.get("name") or f"{spec.project}-{version.get('name')}.jar"
+            return Resolved(id=spec.id, provider=self.name, version=version.get("name"), url=url,
+                            filename=filename, sha256=info.get("sha256Hash"),
+                            immutable=bool(download.get("downloadUrl")), mc_versions=supported)
+        raise ResolveError(f"{spec.project}: ninguna versión en Hangar para MC {mc_version or '?'}")
+
+
+class SpigetProvider(Provider):
+    """SpigotMC a través de Spiget. Los recursos externos (descarga fuera de SpigotMC) no se soportan."""
+    name = "spigot"
+    API = "https://api.spiget.org/v2"
+
+    def resolve(self, spec, mc_version, max_age=0, stale_ok=False):
+        resource = _get(f"{self.API}/resources/{spec.project}", max_age, stale_ok)
+        if resource.get("external"):
+            raise ResolveError(f"{resource.get('name', spec.project)}: se descarga fuera de SpigotMC")
+        tested = resource.get("testedVersions") or []
+        if not mc_matches(mc_version, tested):
+            raise ResolveError(f"{resource.get('name', spec.project)}: probado solo en {', '.join(tested)}")
+        latest = _get(f"{self.API}/resources/{spec.project}/versions/latest", max_age, stale_ok)
+        version = str(latest.get("name") or latest.get("id"))
+        if spec.version and version != spec.version:
+            raise ResolveError(f"{resource.get('name', spec.project)}: Spiget solo sirve la última versión ({version})")
+        name = "".join(c for c in resource.get("name", spec.project) if c.isalnum() or c in "-_")
+        return Resolved(id=spec.id, provider=self.name, version=version,
+                        url=f"{self.API}/resources/{spec.project}/download",
+                        filename=spec.filename or f"{name}-{version}.jar",
+                        immutable=False, mc_versions=tested)
+
+
+class GitHubProvider(Provider):
+    name = "github"
+    API = "https://api.github.com/repos"
+
+    def resolve(self, spec, mc_version, max_age=0, stale_ok=False):
+        releases = _get(f"{self.API}/{spec.project}/releases?per_page=10", max_age, stale_ok)
+        for release in releases or []:
+            if release.get("draft"):
+                continue
+            if spec.version and release.get("tag_name") != spec.version:
+                continue
+            if not spec.version and not _channel_ok(spec.channel,
+                                                    "beta" if release.get("prerelease") else "release"):
+                continue
+            asset = next((a for a in release.get("assets", [])
+                          if fnmatch.fnmatch(a.get("name", ""), spec.asset)), None)
+            if not asset:
+                continue
+            digest = asset.get("digest") or ""
+            return Resolved(id=spec.id, provider=self.name, version=release.get("tag_name"),
+                            url=asset["browser_download_url"],
+                            filename=spec.filename or asset["name"],
+                            sha256=digest[7:] if digest.startswith("sha256:") else None)
+        raise ResolveError(f"{spec.project}: ningún release con un asset {spec.asset}")
+
+
+class GeyserMCProvider(Provider):
+    name = "geysermc"
+    API = "https://download.geysermc.org/v2/projects"
+
+    def resolve(self, spec, mc_version, max_age=0, stale_ok=False):
+        data = _get(f"{self.API}/{spec.project}/versions/latest/builds/latest", max_age, stale_ok)
+        version, build = data.get("version"), data.get("build")
+        spigot = (data.get("downloads") or {}).get("spigot") or {}
+        if not (version and build):
+            raise ResolveError(f"{spec.project}: respuesta de GeyserMC sin versión")
+        stem = os.path.splitext(spigot.get("name") or f"{spec.project}-spigot.jar")[0]
+        # Fijada al build cuyo sha256 se verifica ("latest" puede cambiar a mitad de descarga)
+        url = f"{self.API}/{spec.project}/versions/{version}/builds/{build}/downloads/spigot"
+        return Resolved(id=spec.id, provider=self.name, version=version, build=build, url=url,
+                        filename=spec.filename or f"{stem}-{version}-b{build}.jar",
+                        sha256=spigot.get("sha256"))
+
+
+class UrlProvider(Provider):
+    name = "url"
+
+    def resolve(self, spec, mc_version, max_age=0, stale_ok=False):
+        if not spec.url:
+            raise ResolveError(f"{spec.id}: falta 'url'")
+        filename = spec.filename or os.path.basename(urllib.parse.urlsplit(spec.url).path)
+        return Resolved(id=spec.id, provider=self.name,
+                        version=spec.version or spec.sha256 or filename, url=spec.url,
+                        filename=filename, sha256=spec.sha256, immutable=bool(spec.sha256))
+
+
+PROVIDERS: Dict[str, Provider] = {p.name: p for p in (
+    ModrinthProvider(), HangarProvider(), SpigetProvider(), GitHubProvider(),
+    GeyserMCProvider(), UrlProvider(),
+)}
+
+
+def resolve(spec: PluginSpec, mc_version: Optional[str] = None,
+            max_age: float = 0, stale_ok: bool = False) -> Resolved:
+    provider = PROVIDERS.get(spec.provider)
+    if provider is None:
+        raise ResolveError(f"{spec.id}: proveedor desconocido '{spec.provider}'")
+    try:
+        return provider.resolve(spec, mc_version, max_age, stale_ok)
+    except (http_client.HTTPError, KeyError, TypeError, AttributeError) as e:
+        raise ResolveError(f"{spec.id}: {e}") from e
+
+
+def resolve_all(specs: Iterable[PluginSpec], mc_version: Optional[str] = None,
+                max_age: float = 0, stale_ok: bool = False,
+                deadline: float = DEADLINE) -> Dict[str, object]:
+    """Resuelve un lote en paralelo. {id: Resolved o la excepción que lo impidió}."""
+    specs = list(specs)
+    if not specs:
+        return {}
+    pool = ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(specs)))
+    futures = {spec.id: pool.submit(resolve, spec, mc_version, max_age, stale_ok) for spec in specs}
+    done, _ = wait(futures.values(), timeout=deadline)
+    # Lo que llegue tarde queda en la caché HTTP para la próxima vez
+    pool.shutdown(wait=False)
+    results = {}
+    for spec_id, future in futures.items():
+        if future not in done:
+            results[spec_id] = ResolveError(f"{spec_id}: sin respuesta en {deadline:g} s")
+            continue
+        try:
+            results[spec_id] = future.result()
+        except ResolveError as e:
+            results[spec_id] = e
+    return results
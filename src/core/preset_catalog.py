@@ -0,0 +1,223 @@
+"""Catálogo declarativo de presets de rendimiento (Paper/Purpur/Pufferfish).
+
+Los presets son archivos JSON en `src/core/presets/`, no código: cada uno
+declara {archivo: {ruta.de.clave: valor}} para server.properties, bukkit.yml,
+spigot.yml, config/paper-*.yml, pufferfish.yml/purpur.yml (DAB), más ajustes
+según el almacenamiento (`storage.slow` / `storage.fast`).
+
+El tier se elige por el hardware detectado (núcleos, RAM total y clase de
+almacenamiento de `storage_bench`): el primero, por `order`, cuyo
+`max_ram_mb` o `max_cores` se cumpla. Flujo de un clic:
+  plan = preview(server_dir, preset)   -> cambios y diff por archivo
+  apply_plan(server_dir, plan)         -> snapshot (config_history) + escritura atómica
+  config_history.rollback(server_dir)  -> deshace
+"""
+
+import difflib
+import glob
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from src.core import config_history, pi_profile, storage_bench
+from src.core.properties_document import PropertiesDocument
+from src.core.yaml_patch import YamlPatch, format_scalar
+
+PRESETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "presets")
+
+
+@dataclass
+class HardwareProfile:
+    cores: int
+    ram_mb: int
+    storage_class: str
+
+    @property
+    def slow_storage(self) -> bool:
+        return self.storage_class in storage_bench.SLOW_CLASSES
+
+    def describe(self) -> str:
+        return f"{self.cores} núcleos, {self.ram_mb} MB RAM, almacenamiento {self.storage_class}"
+
+
+def detect_hardware(server_dir: str) -> HardwareProfile:
+    """Perfil actual. La clase de almacenamiento es la cacheada (no se mide aquí)."""
+    return HardwareProfile(cores=os.cpu_count() or 1, ram_mb=pi_profile.get_total_ram_mb(),
+                           storage_class=storage_bench.storage_class(server_dir))
+
+
+@dataclass
+class Preset:
+    id: str
+    order: int
+    title: str
+    description: str = ""
+    match: Dict[str, int] = field(default_factory=dict)
+    create: List[str] = field(default_factory=list)
+    files: Dict[str, Dict[str, object]] = field(default_factory=dict)
+    storage: Dict[str, Dict[str, Dict[str, object]]] = field(default_factory=dict)
+
+    def matches(self, hw: HardwareProfile) -> bool:
+        """Sin límites es el tier de reserva; si hay límites basta con cumplir uno."""
+        if not self.match:
+            return True
+        max_ram, max_cores = self.match.get("max_ram_mb"), self.match.get("max_cores")
+        return bool((max_ram and hw.ram_mb <= max_ram) or (max_cores and hw.cores <= max_cores))
+
+    def values_for(self, hw: HardwareProfile) -> Dict[str, Dict[str, object]]:
+        """Valores por archivo con los ajustes de almacenamiento ya aplicados."""
+        merged = {rel: dict(values) for rel, values in self.files.items()}
+        for rel, values in self.storage.get("slow" if hw.slow_storage else "fast", {}).items():
+            merged.setdefault(rel, {}).update(values)
+        return merged
+
+
+_catalog: Optional[List[Preset]] = None
+
+
+def load_catalog() -> List[Preset]:
+    """Presets del directorio de datos, ordenados por `order` (se cargan una vez)."""
+    global _catalog
+    if _catalog is None:
+        presets = []
+        for path in glob.glob(os.path.join(PRESETS_DIR, "*.json")):
+            with open(path, "r", encoding="utf-8") as f:
+                presets.append(Preset(**json.load(f)))
+        _catalog = sorted(presets, key=lambda p: p.order)
+    return _catalog
+
+
+def get_preset(preset_id: str) -> Preset:
+    for preset in load_catalog():
+        if preset.id == preset_id:
+            return preset
+    raise KeyError(f"Preset desconocido: {preset_id}")
+
+
+def select_preset(hw: HardwareProfile) -> Preset:
+    catalog = load_catalog()
+    for preset in catalog:
+        if preset.matches(hw):
+            return preset
+    return catalog[-1]
+
+
+# ---------------------------------------------------------------------------
+# Vista previa
+# ---------------------------------------------------------------------------
+
+@dataclass
+class FilePlan:
+    rel_path: str
+    existed: bool
+    old_text: str
+    new_text: str
+    changes: List[str] = field(default_factory=list)
+
+    def diff(self) -> List[str]:
+        return [line.rstrip("\n") for line in difflib.unified_diff(
+            self.old_text.splitlines(keepends=True), self.new_text.splitlines(keepends=True),
+            fromfile=f"a/{self.rel_path}", tofile=f"b/{self.rel_path}", n=1)]
+
+
+@dataclass
+class PresetPlan:
+    preset: Preset
+    hardware: HardwareProfile
+    files: List[FilePlan] = field(default_factory=list)
+
+    def summary(self) -> List[str]:
+        """Líneas de texto plano: cabecera y un cambio por línea."""
+        lines = [f"Preset '{self.preset.id}' ({self.preset.title}) para {self.hardware.describe()}"]
+        for fp in self.files:
+            lines += [f"{fp.rel_path}: {change}" for change in fp.changes]
+        if not self.files:
+            lines.append("Sin cambios: la configuración ya coincide con el preset.")
+        return lines
+
+
+def _local(server_dir: str, rel_path: str) -> str:
+    return os.path.join(server_dir, *rel_path.split("/"))
+
+
+def _plan_properties(path: str, values: Dict[str, object], create: bool) -> Optional[FilePlan]:
+    doc = PropertiesDocument.load(path)
+    existed = os.path.exists(path)
+    if not existed and not create:
+        return None
+    old_text = doc.text() if existed else ""
+    changes = []
+    for key, value in values.items():
+        if key not in doc and not create:
+            continue
+        old = doc.get(key)
+        new = format_scalar(value)
+        if doc.set(key, new):
+            changes.append(f"{key}: {'(nuevo)' if old is None else old} -> {new}")
+    return FilePlan("server.properties", existed, old_text, doc.text(), changes) if changes else None
+
+
+def _plan_yaml(path: str, rel_path: str, values: Dict[str, object], create: bool) -> Optional[FilePlan]:
+    if not os.path.exists(path):
+        return None
+    doc = YamlPatch.from_file(path)
+    skipped = []
+    for key_path, value in values.items():
+        try:
+            doc.set(key_path, value, create=create)
+        except ValueError as e:
+            # Formato distinto en esta versión: la clave se salta
+            skipped.append(f"(omitido) {e}")
+    changes = [c.describe() for c in doc.changes]
+    if not changes:
+        return None
+    return FilePlan(rel_path, True, doc.original, doc.text(), changes + skipped)
+
+
+def preview(server_dir: str, preset: Optional[Preset] = None,
+            hw: Optional[HardwareProfile] = None) -> PresetPlan:
+    """Calcula los cambios del preset sin escribir nada."""
+    hw = hw or detect_hardware(server_dir)
+    preset = preset or select_preset(hw)
+    plan = PresetPlan(preset, hw)
+    for rel_path, values in preset.values_for(hw).items():
+        path = _local(server_dir, rel_path)
+        create = rel_path in preset.create
+        if rel_path == "server.properties":
+            fp = _plan_properties(path, values, create)
+        else:
+            fp = _plan_yaml(path, rel_path, values, create)
+        if fp:
+            plan.files.append(fp)
+    return plan
+
+
+# ---------------------------------------------------------------------------
+# Aplicar y deshacer
+# ---------------------------------------------------------------------------
+
+def _write_atomic(path: str, text: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+    with open(tmp, "w", encoding="utf-8", errors="surrogateescape", newline="") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def apply_plan(server_dir: str, plan: PresetPlan) -> Optional[str]:
+    """Guarda un snapshot en el historial y escribe el plan. Devuelve el id del snapshot."""
+    if not plan.files:
+        return None
+    snap = config_history.snapshot(server_dir, f"antes del preset {plan.preset.id}")
+    for fp in plan.files:
+        _write_atomic(_local(server_dir, fp.rel_path), fp.new_text)
+    return snap.id if snap else None
+
+
+def apply_preset(server_dir: str, preset_id: Optional[str] = None) -> List[str]:
+    """Atajo sin vista previa: aplica el preset (o el del hardware) y devuelve el resumen."""
+    preset = get_preset(preset_id) if preset_id else None
+    plan = preview(server_dir, preset)
+    apply_plan(server_dir, plan)
+    return plan.summary()
@@ -0,0 +1,147 @@
+"""Modelo de server.properties que conserva comentarios y orden.
+
+Antes cada `set_property` releía y reescribía el archivo entero, perdía los
+comentarios y añadía una cabecera nueva: un preset de 10 claves eran 20
+operaciones de archivo sobre la SD. `PropertiesDocument` parsea una vez,
+cachea el parseo por `(mtime_ns, size)` y escribe todas las claves de una
+transacción con un único `os.replace` atómico. Las líneas que no se tocan se
+escriben tal cual.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_HEADER = "#Minecraft server properties\n"
+
+# ruta -> ((mtime_ns, size), líneas crudas, índice clave -> nº de línea)
+_cache: Dict[str, Tuple[Tuple[int, int], List[str], Dict[str, int]]] = {}
+_lock = threading.Lock()
+
+
+def _split(line: str) -> Optional[Tuple[str, str]]:
+    """(clave, valor) de una línea, o None si es comentario o vacía."""
+    stripped = line.strip()
+    if not stripped or stripped[0] in "#!":
+        return None
+    sep = stripped.find("=")
+    if sep < 0:
+        sep = stripped.find(":")
+    if sep < 0:
+        return stripped, ""
+    return stripped[:sep].strip(), stripped[sep + 1:].strip()
+
+
+def _index(lines: List[str]) -> Dict[str, int]:
+    index = {}
+    for i, line in enumerate(lines):
+        kv = _split(line)
+        if kv:
+            index[kv[0]] = i
+    return index
+
+
+class PropertiesDocument:
+    """server.properties en memoria. Obtener con `load()`, guardar con `save()`."""
+
+    def __init__(self, path: str, lines: List[str], stat_key: Optional[Tuple[int, int]] = None,
+                 index: Optional[Dict[str, int]] = None):
+        self.path = path
+        self._lines = lines
+        self._index = dict(index) if index is not None else _index(lines)
+        self._stat_key = stat_key
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path: str) -> "PropertiesDocument":
+        """Documento del archivo; reutiliza el parseo si no cambió (mtime_ns, size)."""
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return cls(path, [DEFAULT_HEADER])
+        key = (st.st_mtime_ns, st.st_size)
+        with _lock:
+            cached = _cache.get(path)
+        if cached and cached[0] == key:
+            return cls(path, list(cached[1]), key, cached[2])
+        with open(path, "r", encoding="utf-8", errors="surrogateescape") as f:
+            lines = f.readlines()
+        if lines and not lines[-1].endswith("\n"):
+            lines[-1] += "\n"
+        doc = cls(path, lines, key)
+        with _lock:
+            _cache[path] = (key, list(lines), dict(doc._index))
+        return doc
+
+    @classmethod
+    def for_server(cls, server_dir: str) -> "PropertiesDocument":
+        return cls.load(os.path.join(server_dir, "server.properties"))
+
+    # -- Lectura -----------------------------------------------------------
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        i = self._index.get(key)
+        return _split(self._lines[i])[1] if i is not None else default
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def keys(self) -> List[str]:
+        return list(self._index)
+
+    def as_dict(self) -> Dict[str, str]:
+        """Claves y valores en el orden del archivo."""
+        return {k: _split(self._lines[i])[1] for k, i in sorted(self._index.items(), key=lambda kv: kv[1])}
+
+    # -- Escritura ---------------------------------------------------------
+
+    def set(self, key: str, value) -> bool:
+        """Cambia (o añade al final) una clave. True si hubo cambio."""
+        value = str(value)
+        i = self._index.get(key)
+        if i is not None:
+            if _split(self._lines[i])[1] == value:
+                return False
+            self._lines[i] = f"{key}={value}\n"
+        else:
+            self._index[key] = len(self._lines)
+            self._lines.append(f"{key}={value}\n")
+        self.dirty = True
+        return True
+
+    def update(self, values: Dict[str, object]) -> List[str]:
+        """Aplica varias claves. Devuelve las que cambiaron."""
+        return [k for k, v in values.items() if self.set(k, v)]
+
+    def text(self) -> str:
+        return "".join(self._lines)
+
+    def save(self):
+        """Escribe el documento con un único `os.replace` (no-op si no hay cambios)."""
+        if not self.dirty:
+            return
+        directory = os.path.dirname(self.path) or "."
+        tmp = os.path.join(directory, f".{os.path.basename(self.path)}.tmp")
+        with open(tmp, "w", encoding="utf-8", errors="surrogateescape") as f:
+            f.write(self.text())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        st = os.stat(self.path)
+        self._stat_key = (st.st_mtime_ns, st.st_size)
+        with _lock:
+            _cache[self.path] = (self._stat_key, list(self._lines), dict(self._index))
+        self.dirty = False
+
+
+@contextmanager
+def transaction(path: str) -> Iterator[PropertiesDocument]:
+    """Carga, deja aplicar N cambios y guarda una sola vez al salir sin excepción.
+
+        with transaction(props_path) as doc:
+            doc.update({"view-distance": "4", "simulation-distance": "3"})
+    """
+    doc = PropertiesDocument.load(path)
+    yield doc
+    doc.save()
@@ -0,0 +1,281 @@
+"""Builds del servidor: versión activa explícita, actualización escalonada y rollback.
+
+`JarManager.get_current_jar` elegía el `.jar` más reciente por mtime y el TUI
+el primero de un `listdir` sin orden; los builds viejos se acumulaban en
+`server_bin` sin que hubiera una versión activa definida. El manifiesto
+`server_bin/.kcmc/releases.json` lo hace explícito:
+
+  {"active": "paper-1.21.4-130.jar",
+   "staged": "paper-1.21.4-131.jar",        # se activa en el próximo arranque
+   "history": ["paper-1.21.4-128.jar", ...],  # activos anteriores, reciente primero
+   "known": [...]}                            # jars instalados por la app (los que se podan)
+
+Una actualización descarga el build nuevo y lo deja `staged` mientras
+Paperclip lo pre-parchea en segundo plano (`paperclip`); el servidor sigue
+con el activo. En el siguiente arranque `promote()` cambia el puntero
+(reescritura atómica del manifiesto): si el parche ya terminó el reinicio
+no espera descargas ni parches; si sigue en curso se espera a que acabe y
+se arranca el build nuevo. Arrancar el viejo mientras tanto no ahorra nada:
+los builds de la misma versión de Minecraft comparten `versions/<mc>/` y su
+Paperclip volvería a parchearlo.
+
+Se conservan KEEP builds (activo + anteriores) para `rollback()` inmediato;
+los demás jars de `known` se borran. Un jar de servidor copiado a mano no
+entra en `known` y nunca se borra: se adopta como `staged` si es más
+reciente que el activo, o en el historial si no.
+
+Los jars siguen en `server_bin` porque el servidor arranca con el directorio
+del jar como directorio de trabajo.
+"""
+
+import json
+import os
+import re
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional
+
+from src.core import paperclip, plugin_index
+
+MANIFEST = os.path.join(".kcmc", "releases.json")
+KEEP = 3
+
+SERVER_JAR_PREFIXES = ("paper-", "folia-", "velocity-", "spigot-", "craftbukkit-",
+                       "purpur-", "pufferfish-", "airplane-", "tuinity-")
+
+_lock = threading.Lock()
+
+
+def is_server_jar(filename: str, server_dir: Optional[str] = None) -> bool:
+    """Jar de servidor (paper, folia...) y no de plugin.
+
+    Con `server_dir` se mira el contenido del jar (`plugin_index`); el prefijo
+    del nombre solo decide si el jar no dice nada (o aún no existe).
+    """
+    if server_dir:
+        kind = plugin_index.get_index(server_dir).kind(os.path.join(server_dir, filename))
+        if kind != plugin_index.OTHER:
+            return kind == plugin_index.SERVER
+    return filename.lower().startswith(SERVER_JAR_PREFIXES)
+
+
+def mc_version(jar_name: str) -> Optional[str]:
+    """'paper-1.21.4-130.jar' -> '1.21.4'. None en proxies ('velocity-3.4.0-...' no es Minecraft)."""
+    name = os.path.basename(jar_name).lower()
+    if name.startswith(tuple(prefix for prefix, _ in plugin_index.PROXY_PREFIXES)):
+        return None
+    match = re.match(r"^[a-z]+-(\d+(?:\.\d+)+)-", name)
+    return match.group(1) if match else None
+
+
+@dataclass
+class Releases:
+    active: Optional[str] = None
+    staged: Optional[str] = None
+    history: List[str] = field(default_factory=list)
+    known: List[str] = field(default_factory=list)
+
+    def builds(self) -> List[str]:
+        """Builds conservados: staged, activo y anteriores."""
+        names = [self.staged, self.active] + self.history
+        return [n for i, n in enumerate(names) if n and n not in names[:i]]
+
+
+def _jars(server_dir: str) -> List[str]:
+    try:
+        return [f for f in os.listdir(server_dir) if f.endswith(".jar")]
+    except OSError:
+        return []
+
+
+def _server_jars(server_dir: str) -> List[str]:
+    jars = [f for f in _jars(server_dir) if is_server_jar(f, server_dir)]
+    plugin_index.get_index(server_dir).save()
+    return jars
+
+
+def _save(server_dir: str, rel: Releases):
+    path = os.path.join(server_dir, MANIFEST)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(asdict(rel), f, indent=2)
+    os.replace(tmp, path)
+
+
+def _mtime(server_dir: str, name: str) -> float:
+    try:
+        return os.path.getmtime(os.path.join(server_dir, name))
+    except OSError:
+        return 0.0
+
+
+def _adopt(server_dir: str, rel: Releases, names: List[str]):
+    """Registra jars de servidor ajenos al manifiesto sin perder ninguno.
+
+    El más reciente pasa a `staged` si es más nuevo que el activo (y que el
+    escalonado, que entonces va al historial); el resto entra en el
+    historial por fecha.
+    """
+    for name in sorted(names, key=lambda n: _mtime(server_dir, n), reverse=True):
+        newest = max((_mtime(server_dir, n) for n in (rel.active, rel.staged) if n), default=0.0)
+        if _mtime(server_dir, name) > newest:
+            if rel.staged:
+                rel.history.insert(0, rel.staged)
+            rel.staged = name
+        else:
+            rel.history.append(name)
+    rel.history.sort(key=lambda n: _mtime(server_dir, n), reverse=True)
+
+
+def load(server_dir: str) -> Releases:
+    """Manifiesto actual, sin builds cuyo jar ya no existe.
+
+    Sin manifiesto (instalaciones anteriores) se adopta el jar de servidor
+    más reciente como activo y los demás como historial; un jar con otro
+    nombre (`server.jar`) solo se adopta si no hay ninguno reconocible. Con
+    manifiesto, los jars de servidor que nunca registró se adoptan (`_adopt`)
+    sin pasar a `known`.
+    """
+    present = set(_jars(server_dir))
+    try:
+        with open(os.path.join(server_dir, MANIFEST), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        rel = Releases(active=data.get("active"), staged=data.get("staged"),
+                       history=list(data.get("history") or []), known=list(data.get("known") or []))
+        legacy = "known" not in data
+    except (OSError, ValueError, AttributeError):
+        candidates = _server_jars(server_dir) or present
+        by_mtime = sorted(candidates, key=lambda n: _mtime(server_dir, n), reverse=True)
+        rel = Releases(active=by_mtime[0] if by_mtime else None, history=by_mtime[1:KEEP],
+                       known=by_mtime)
+        if rel.active:
+            _save(server_dir, rel)
+        return rel
+    if rel.active not in present:
+        rel.active = None
+    if rel.staged not in present:
+        rel.staged = None
+    rel.history = [n for n in rel.history if n in present]
+    # Manifiestos anteriores a `known`: lo instalado son los builds conservados
+    known = set(rel.builds() if legacy else rel.known) & present
+    unknown = [n for n in _server_jars(server_dir) if n not in known and n not in rel.builds()]
+    rel.known = sorted(known)
+    if unknown:
+        _adopt(server_dir, rel, unknown)
+    if unknown or legacy:
+        _save(server_dir, rel)
+    return rel
+
+
+def active_jar(server_dir: str) -> Optional[str]:
+    """Ruta del jar a arrancar: el activo o, en la primera instalación, el escalonado."""
+    rel = load(server_dir)
+    name = rel.active or rel.staged
+    return os.path.join(server_dir, name) if name else None
+
+
+def stage(jar_path: str, callback=None) -> Releases:
+    """Deja `jar_path` (ya en server_dir) listo para el próximo arranque y lo pre-parchea.
+
+    `callback(PatchResult)` se llama desde el hilo del pre-parcheo.
+    """
+    server_dir = os.path.dirname(os.path.abspath(jar_path))
+    name = os.path.basename(jar_path)
+    with _lock:
+        rel = load(server_dir)
+        if name != rel.active:
+            # Un escalonado distinto (p.ej. adoptado) no se pierde: queda en el historial
+            if rel.staged and rel.staged != name:
+                rel.history.insert(0, rel.staged)
+            rel.staged = name
+            rel.history = [n for n in rel.history if n != name]
+            if name not in rel.known:
+                rel.known.append(name)
+            _save(server_dir, rel)
+    paperclip.prepatch_in_background(jar_path, callback=callback)
+    return rel
+
+
+def promote(server_dir: str, keep: int = KEEP, wait: bool = True) -> Optional[str]:
+    """Activa el build escalonado (llamar antes de arrancar). Devuelve su nombre o None.
+
+    Solo se cambia a un build ya parcheado (`paperclip.is_warm`): si su
+    pre-parcheo sigue en curso se espera a que termine, y si no llegó a
+    hacerse (app cerrada a medias, jar adoptado) se hace ahora. Si el parche
+    falla se sigue con el activo. Con `wait=False` (hilo de UI) no se
+    bloquea nunca: devuelve None si habría que esperar.
+    """
+    with _lock:
+        rel = load(server_dir)
+        if not rel.staged:
+            return None
+        staged = os.path.join(server_dir, rel.staged)
+        if paperclip.patch_entries(staged) is not None and not paperclip.is_warm(staged, server_dir):
+            if not wait:
+                return None
+            paperclip.wait_idle(server_dir)
+            if not paperclip.is_warm(staged, server_dir):
+                result = paperclip.prepatch(staged, server_dir)
+                if result is not None and not result.ok and rel.active:
+                    return None
+        if rel.active and rel.active != rel.staged:
+            rel.history.insert(0, rel.active)
+        rel.active, rel.staged = rel.staged, None
+        rel.history = [n for n in rel.history if n != rel.active]
+        _save(server_dir, rel)
+    prune(server_dir, keep)
+    return rel.active
+
+
+def rollback_target(server_dir: str) -> Optional[str]:
+    history = load(server_dir).history
+    return history[0] if history else None
+
+
+def rollback(server_dir: str, force: bool = False) -> Optional[str]:
+    """Vuelve al build activo anterior (efectivo en el próximo arranque).
+
+    El build retirado sale del historial para que otro rollback no vuelva a él,
+    y se descarta cualquier build escalonado. Volver a otra versión de
+    Minecraft exige `force`: los mundos ya convertidos no se pueden abrir con
+    una versión anterior.
+    """
+    with _lock:
+        rel = load(server_dir)
+        if not rel.history:
+            return None
+        target = rel.history[0]
+        if not force and rel.active and mc_version(target) != mc_version(rel.active):
+            raise ValueError(f"{target} es de otra versión de Minecraft ({mc_version(target)}); "
+                             f"los mundos actuales podrían no abrir")
+        rel.active, rel.staged, rel.history = target, None, rel.history[1:]
+        _save(server_dir, rel)
+    return target
+
+
+def prune(server_dir: str, keep: int = KEEP) -> List[str]:
+    """Borra los jars de servidor registrados fuera de los KEEP builds conservados.
+
+    Solo se borran jars instalados por la app (`known`); los adoptados siguen
+    en el historial aunque pasen de KEEP. Devuelve los borrados.
+    """
+    with _lock:
+        rel = load(server_dir)
+        rel.history = [n for i, n in enumerate(rel.history) if i < keep - 1 or n not in rel.known]
+        kept = set(rel.builds())
+        if not kept:
+            _save(server_dir, rel)
+            return []
+        removed = []
+        for name in _server_jars(server_dir):
+            if name in kept or name not in rel.known:
+                continue
+            try:
+                os.remove(os.path.join(server_dir, name))
+                removed.append(name)
+            except OSError:
+                pass
+        rel.known = [n for n in rel.known if n not in removed]
+        _save(server_dir, rel)
+    return removed
@@ -1,19 +1,34 @@
 import asyncio
 import os
-from typing import Callable, Optional
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
 
-from src.core import pi_profile
+from src.core import memory_advisor, pi_profile
+from src.core.gc_log import GCLogTailer, GCStats
+from src.core.thermal import ThermalReading, ThermalSensor
+from src.core.thread_profiler import ThreadProfiler, ThreadSample
 
 
 class ResourceWatcher:
     """Monitor de recursos basado únicamente en la stdlib (/proc).
 
     Lee /proc/meminfo y /proc/<pid>/status directamente, sin psutil,
-    para minimizar la huella de memoria en la Raspberry Pi.
+    para minimizar la huella de memoria en la Raspberry Pi. También muestrea
+    la CPU por hilo de la JVM (ver `thread_profiler`) y los sensores térmicos
+    (ver `thermal`), y correlaciona las caídas de TPS con el throttling.
+    Al terminar la ejecución guarda el overhead off-heap (RSS pico - Xmx)
+    para `memory_advisor` si se conocen `heap_mb` y `server_dir`.
     """
 
+    # TPS por debajo de este valor cuentan como caída; se rearma al recuperar
+    TPS_DIP = 18.0
+    TPS_RECOVERED = 19.5
+
     def __init__(self, callback: Callable[[str], None], threshold_percent: Optional[float] = None,
-                 interval: float = 10.0):
+                 interval: float = 10.0, gc_log_path: Optional[str] = None,
+                 sysfs_root: str = "/sys", history: int = 360,
+                 heap_mb: Optional[int] = None, server_dir: Optional[str] = None):
         self.running = False
         self.callback = callback
         # Umbral adaptado: 85% en modo Pi (poca RAM), 90% en escritorio
@@ -23,9 +38,28 @@ class ResourceWatcher:
         self._task = None
         self._mem_alerted = False
         self._rss_alerted = False
+        self.thread_profiler: Optional[ThreadProfiler] = None
+        self.thread_sample: Optional[ThreadSample] = None
+        self.gc_tailer: Optional[GCLogTailer] = GCLogTailer(gc_log_path) if gc_log_path else None
+        self._gc_failures_seen = 0
+        self.thermal = ThermalSensor(sysfs_root)
+        self.thermal_reading: Optional[ThermalReading] = None
+        # Serie temporal: {time, mem_percent, rss_mb, temp_c, cpu_mhz, cpu_max_mhz, throttled, tps}
+        self.metrics: Deque[Dict] = deque(maxlen=history)
+        self._tps_dip_alerted = False
+        self.heap_mb = heap_mb
+        self.server_dir = server_dir
+        self.peak_rss_mb = 0
+
+    @property
+    def gc_stats(self) -> Optional[GCStats]:
+        return self.gc_tailer.stats if self.gc_tailer else None
 
     def start(self, pid: int):
         self.server_pid = pid
+        self.thread_profiler = ThreadProfiler(pid)
+        self.thread_sample = None
+        self.peak_rss_mb = 0
         self.running = True
         self._task = asyncio.create_task(self._watch_loop())
 
@@ -33,6 +67,26 @@ class ResourceWatcher:
         self.running = False
         if self._task:
             self._task.cancel()
+        self._record_overhead()
+
+    def _record_overhead(self):
+        if self.heap_mb and self.server_dir and self.peak_rss_mb:
+            memory_advisor.record_overhead(self.server_dir, self.heap_mb, self.peak_rss_mb)
+            self.peak_rss_mb = 0
+
+    def record_tps(self, tps: float):
+        """Registra TPS (desde server-state.json) y correlaciona las caídas con throttling."""
+        if self.metrics:
+            self.metrics[-1]["tps"] = tps
+        if tps >= self.TPS_RECOVERED:
+            self._tps_dip_alerted = False
+            return
+        if tps >= self.TPS_DIP or self._tps_dip_alerted:
+            return
+        reading = self.thermal_reading
+        if reading and reading.is_throttled and time.time() - reading.time <= 2 * self.interval:
+            self._tps_dip_alerted = True
+            self.callback(f"[bold red]\\[ALERT] TPS drop ({tps:.1f}) caused by {reading.cause()}[/]")
 
     @staticmethod
     def _mem_percent() -> Optional[float]:
@@ -68,8 +122,10 @@ class ResourceWatcher:
     async def _watch_loop(self):
         while self.running:
             try:
+                point = {"time": time.time()}
                 # System Memory (con histéresis: alerta solo al cruzar el umbral)
                 mem = self._mem_percent()
+                point["mem_percent"] = mem
                 if mem is not None:
                     if mem > self.threshold_percent and not self._mem_alerted:
                         self._mem_alerted = True
@@ -84,13 +140,40 @@ class ResourceWatcher:
                     if rss is None:
                         # Process is gone: stop watching
                         self.running = False
+                        self._record_overhead()
                         break
+                    point["rss_mb"] = rss
+                    self.peak_rss_mb = max(self.peak_rss_mb, rss)
                     if rss > 1024 and not self._rss_alerted:
                         self._rss_alerted = True
                         self.callback(f"[yellow]\\[WARN] Server RAM: {rss} MB[/]")
                     elif rss <= 900:
                         self._rss_alerted = False
 
+                    # CPU por hilo (delta desde la vuelta anterior)
+                    if self.thread_profiler:
+                        sample = self.thread_profiler.sample()
+                        if sample:
+                            self.thread_sample = sample
+
+                # GC log: pausas nuevas desde la última vuelta
+                if self.gc_tailer:
+                    self.gc_tailer.poll()
+                    stats = self.gc_tailer.stats
+                    failures = stats.promotion_failures + stats.full_gcs
+                    if failures > self._gc_failures_seen:
+                        self._gc_failures_seen = failures
+                        self.callback(f"[yellow]\\[WARN] GC: {stats.full_gcs} full GC(s), "
+                                      f"{stats.promotion_failures} promotion failure(s) - heap too small?[/]")
+
+                # Temperatura, frecuencia y flags de throttling (puede lanzar
+                # vcgencmd: fuera del bucle de eventos)
+                reading = await asyncio.to_thread(self.thermal.read)
+                self.thermal_reading = reading
+                point.update(temp_c=reading.temp_c, cpu_mhz=reading.cpu_mhz,
+                             cpu_max_mhz=reading.cpu_max_mhz, throttled=reading.is_throttled)
+                self.metrics.append(point)
+
                 await asyncio.sleep(self.interval)
             except asyncio.CancelledError:
                 break
@@ -3,14 +3,17 @@ import os
 from typing import Callable, Optional
 
 from src.core import pi_profile
+from src.core.gc_log import gc_log_args
 
 
 class ServerController:
-    def __init__(self, jar_path: str, java_args: list = None):
+    def __init__(self, jar_path: str, java_args: list = None, gc_log: Optional[str] = None):
         self.jar_path = jar_path
         # Get the directory containing the JAR file - this is where we'll run the server
         self.working_dir = os.path.dirname(os.path.abspath(jar_path))
         self.java_args = java_args or ["-Xms1G", "-Xmx2G"]
+        # Optional unified GC log (rotated) for pause analytics
+        self.gc_log = gc_log
         self.process: Optional[asyncio.subprocess.Process] = None
         self.output_callback: Optional[Callable[[str], None]] = None
 
@@ -78,6 +81,10 @@ class ServerController:
             xmx = next((a.split("=")[1] for a in args if a.startswith("-Xmx")), "512M")
             args = pi_profile.get_java_args(xmx)
 
+        if self.gc_log and not any(a.startswith("-Xlog:gc") for a in args):
+            os.makedirs(os.path.dirname(os.path.abspath(self.gc_log)), exist_ok=True)
+            args.append(gc_log_args(self.gc_log))
+
         cmd = ["java"] + args + ["-jar", self.jar_path, "nogui"]
 
         try:
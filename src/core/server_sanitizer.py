@@ -8,12 +8,16 @@ This module ensures that server files are in their correct locations:
 """
 
 import os
+import json
 import shutil
 import logging
+import time
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 
+from src.core import plugin_graph, plugin_index, releases
+
 logger = logging.getLogger(__name__)
 
 
@@ -86,7 +90,7 @@ class ServerSanitizer:
     VALID_ROOT_DIRS = {
         'plugins', 'world', 'world_nether', 'world_the_end',
         'logs', 'cache', 'libraries', 'versions', 'config',
-        'crash-reports', 'bundler'
+        'crash-reports', 'bundler', '.kcmc'
     }
     
     # Patterns that identify server JARs (NOT plugins)
@@ -103,6 +107,17 @@ class ServerSanitizer:
         'sk89q', 'hologram', 'tab', 'npc', 'quest'
     ]
     
+    # Subdirectories that never hold plugin JARs but may hold 100k+ files
+    # (region/entity/POI files, player data); the scan never enters them
+    PRUNED_DIRS = {
+        'region', 'entities', 'poi', 'data', 'playerdata',
+        'advancements', 'stats'
+    }
+    
+    # Directory listings of the last scan, keyed by mtime
+    SCAN_MANIFEST = os.path.join('.kcmc', 'sanitizer-scan.json')
+    MANIFEST_RACY_NS = 2_000_000_000
+    
     def __init__(self, server_dir: str):
         """
         Initialize the sanitizer.
@@ -112,17 +127,26 @@ class ServerSanitizer:
         """
         self.server_dir = os.path.abspath(server_dir)
         self.plugins_dir = os.path.join(self.server_dir, 'plugins')
+        self.index = plugin_index.get_index(self.server_dir)
+        self._manifest: Dict[str, Dict] = {}
+        self._seen_dirs: Dict[str, Dict] = {}
     
-    def is_server_jar(self, filename: str) -> bool:
+    def is_server_jar(self, filename: str, path: Optional[str] = None) -> bool:
         """
         Determine if a JAR file is a server JAR (not a plugin).
         
         Args:
             filename: Name of the JAR file
+            path: Full path; if given, the JAR's own metadata decides (see plugin_index)
             
         Returns:
             True if it's a server JAR, False otherwise
         """
+        if path:
+            kind = self.index.kind(path)
+            if kind != plugin_index.OTHER:
+                return kind == plugin_index.SERVER
+        
         lower_name = filename.lower()
         
         # Check if it matches server patterns
@@ -132,19 +156,24 @@ class ServerSanitizer:
         
         return False
     
-    def is_plugin_jar(self, filename: str) -> bool:
+    def is_plugin_jar(self, filename: str, path: Optional[str] = None) -> bool:
         """
         Determine if a JAR file is a plugin JAR.
         
-        Simple rule: Any JAR that is NOT a server JAR is a plugin.
-        Server JARs are: paper, folia, velocity, spigot, etc.
+        With `path`, a JAR is a plugin only if it ships a plugin descriptor
+        (plugin.yml, paper-plugin.yml, ...), so libraries are left alone.
+        Without it: any JAR that is NOT a server JAR is a plugin.
         
         Args:
             filename: Name of the JAR file
+            path: Full path to the JAR file
             
         Returns:
-            True if it's a plugin JAR (should go in plugins/), False if it's a server JAR
+            True if it's a plugin JAR (should go in plugins/), False otherwise
         """
+        if path:
+            return self.index.kind(path) == plugin_index.PLUGIN
+        
         # If it's a server JAR, it's NOT a plugin
         if self.is_server_jar(filename):
             return False
@@ -189,14 +218,20 @@ class ServerSanitizer:
         if not os.path.exists(self.plugins_dir):
             os.makedirs(self.plugins_dir)
         
-        # Scan root directory
-        for item in os.listdir(self.server_dir):
-            item_path = os.path.join(self.server_dir, item)
+        # Directory listings from the previous scan (see _list_dir)
+        self._manifest = self._load_manifest()
+        self._seen_dirs: Dict[str, Dict] = {}
+        
+        # Scan root directory (scandir: file type comes with the entry, no extra stat)
+        with os.scandir(self.server_dir) as entries:
+            root_entries = list(entries)
+        for entry in root_entries:
+            item, item_path = entry.name, entry.path
             
-            if os.path.isfile(item_path):
+            if entry.is_file():
                 # Check JAR files in root
                 if item.endswith('.jar'):
-                    if self.is_plugin_jar(item):
+                    if self.is_plugin_jar(item, item_path):
                         report.issues.append(SanitizationIssue(
                             issue_type='misplaced_jar',
                             file_path=item_path,
@@ -204,7 +239,7 @@ class ServerSanitizer:
                             destination=os.path.join(self.plugins_dir, item)
                         ))
             
-            elif os.path.isdir(item_path):
+            elif entry.is_dir():
                 # Any folder that's not a valid server folder should be in plugins/
                 if self.is_plugin_config_dir(item):
                     report.issues.append(SanitizationIssue(
@@ -214,37 +249,99 @@ class ServerSanitizer:
                         destination=os.path.join(self.plugins_dir, item)
                     ))
                 # Also scan inside valid server directories for stray plugin JARs
-                elif item in self.VALID_ROOT_DIRS and item != 'plugins':
+                elif item in self.VALID_ROOT_DIRS and item not in ('plugins', '.kcmc'):
                     self._scan_subdirectory(item_path, report)
-        
+
+        self._save_manifest(self._seen_dirs)
+        self.index.save()
         return report
     
     def _scan_subdirectory(self, dir_path: str, report: SanitizationReport):
         """
-        Recursively scan a subdirectory for misplaced plugin JARs.
+        Scan a subdirectory tree for misplaced plugin JARs.
+        
+        PRUNED_DIRS (region files, POI, player data...) are never entered, and
+        directories unchanged since the last scan are not listed again.
         
         Args:
             dir_path: Path to the directory to scan
             report: SanitizationReport to append issues to
         """
+        pending = [dir_path]
+        while pending:
+            path = pending.pop()
+            jars, subdirs = self._list_dir(path)
+            for item in jars:
+                item_path = os.path.join(path, item)
+                # Any JAR in a server subdirectory (not plugins) should be checked
+                if self.is_plugin_jar(item, item_path):
+                    report.issues.append(SanitizationIssue(
+                        issue_type='misplaced_jar_deep',
+                        file_path=item_path,
+                        suggested_action=f"Move plugin JAR to plugins/",
+                        destination=os.path.join(self.plugins_dir, item)
+                    ))
+            pending.extend(os.path.join(path, d) for d in subdirs)
+    
+    def _list_dir(self, path: str) -> Tuple[List[str], List[str]]:
+        """
+        JAR files and subdirectories (minus PRUNED_DIRS) directly inside `path`.
+        
+        A directory's mtime only changes when entries are added, removed or
+        renamed in it, so if it matches the manifest the cached listing is
+        reused: one stat instead of reading the whole directory.
+        """
+        key = path[len(self.server_dir) + 1:]  # always built from entries under server_dir
         try:
-            for item in os.listdir(dir_path):
-                item_path = os.path.join(dir_path, item)
-                
-                if os.path.isfile(item_path) and item.endswith('.jar'):
-                    # Any JAR in a server subdirectory (not plugins) should be checked
-                    if self.is_plugin_jar(item):
-                        report.issues.append(SanitizationIssue(
-                            issue_type='misplaced_jar_deep',
-                            file_path=item_path,
-                            suggested_action=f"Move plugin JAR to plugins/",
-                            destination=os.path.join(self.plugins_dir, item)
-                        ))
-                elif os.path.isdir(item_path):
-                    # Recurse into subdirectories
-                    self._scan_subdirectory(item_path, report)
-        except PermissionError:
-            pass
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return [], []
+        cached = self._manifest.get(key)
+        if cached and cached.get('mtime_ns') == mtime_ns:
+            self._seen_dirs[key] = cached
+            return cached['jars'], cached['dirs']
+        
+        jars, dirs = [], []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in self.PRUNED_DIRS:
+                                dirs.append(entry.name)
+                        elif entry.name.endswith('.jar') and entry.is_file():
+                            jars.append(entry.name)
+                    except OSError:
+                        continue
+        except OSError:
+            return [], []
+        
+        # A directory modified within the mtime granularity may change again
+        # without its mtime moving: list it again next time
+        if time.time_ns() - mtime_ns > self.MANIFEST_RACY_NS:
+            self._seen_dirs[key] = {'mtime_ns': mtime_ns, 'jars': jars, 'dirs': dirs}
+        return jars, dirs
+    
+    def _load_manifest(self) -> Dict[str, Dict]:
+        try:
+            with open(os.path.join(self.server_dir, self.SCAN_MANIFEST), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_manifest(self, data: Dict[str, Dict]):
+        """Persist the listings of this scan (directories that no longer exist drop out)."""
+        if data == self._manifest:
+            return
+        path = os.path.join(self.server_dir, self.SCAN_MANIFEST)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Could not save scan manifest: {e}")
     
     def sanitize(self, dry_run: bool = True) -> SanitizationResult:
         """
@@ -307,6 +404,21 @@ class ServerSanitizer:
         
         return result
     
+    def analyze_plugins(self) -> plugin_graph.GraphReport:
+        """
+        Check plugins/ for duplicates, missing dependencies, cycles and
+        api-version mismatches against the active server build (Paper or
+        a Velocity/BungeeCord proxy).
+        
+        Returns:
+            GraphReport with findings, recommended removals and load order
+        """
+        jar = releases.active_jar(self.server_dir)
+        if not jar:
+            return plugin_graph.analyze(self.server_dir)
+        return plugin_graph.analyze(self.server_dir, releases.mc_version(jar),
+                                    plugin_index.server_platform(jar))
+    
     def validate_structure(self) -> bool:
         """
         Quick validation check for directory structure.
@@ -337,17 +449,18 @@ class ServerSanitizer:
         if not summary['exists']:
             return summary
         
-        for item in os.listdir(self.server_dir):
-            item_path = os.path.join(self.server_dir, item)
-            
-            if item.endswith('.jar') and self.is_server_jar(item):
-                summary['server_jar'] = item
-            elif item == 'eula.txt':
-                summary['has_eula'] = True
-            elif item == 'server.properties':
-                summary['has_properties'] = True
-            elif item.startswith('world') and os.path.isdir(item_path):
-                summary['worlds'].append(item)
+        with os.scandir(self.server_dir) as entries:
+            for entry in entries:
+                item = entry.name
+                
+                if item.endswith('.jar') and self.is_server_jar(item, entry.path):
+                    summary['server_jar'] = item
+                elif item == 'eula.txt':
+                    summary['has_eula'] = True
+                elif item == 'server.properties':
+                    summary['has_properties'] = True
+                elif item.startswith('world') and entry.is_dir():
+                    summary['worlds'].append(item)
         
         if os.path.exists(self.plugins_dir):
             plugins = [f for f in os.listdir(self.plugins_dir) if f.endswith('.jar')]
@@ -0,0 +1,221 @@
+"""Tiempo de arranque del servidor desglosado por plugin y por fase.
+
+Un arranque lento suele deberse a uno o dos plugins, pero solo se veía el
+"Done (34.2s)!" final. `StartupProfiler` recibe la salida del servidor
+línea a línea (`feed`, desde el callback de `ServerController`), le pone
+marca de tiempo al llegar y atribuye el tiempo transcurrido entre un
+marcador y el siguiente a la fase que abrió el primero:
+
+  [X] Loading server plugin X v1     carga de X (onLoad)
+  [X] Enabling X v1                  activación de X (onEnable)
+  Preparing level "world"            carga del mundo
+  Preparing start region for ...     preparación del spawn de esa dimensión
+  Time elapsed: N ms                 fin del spawn
+  Done (12.345s)!                    fin del arranque
+
+El tiempo antes del primer marcador (JVM, Paperclip, librerías) y entre
+fases va a "servidor". Cada arranque se añade a `.kcmc/startup-profile.jsonl`
+(se conservan MAX_RUNS) para comparar cada fase con los arranques
+anteriores. `from_log` analiza `logs/latest.log` con la resolución de
+segundo de sus marcas de tiempo, para arranques hechos fuera de la app.
+"""
+
+import json
+import os
+import re
+import statistics
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+LOG_FILE = os.path.join(".kcmc", "startup-profile.jsonl")
+MAX_RUNS = 30
+
+SERVER, LOAD, ENABLE, WORLD, SPAWN = "server", "load", "enable", "world", "spawn"
+KIND_LABELS = {SERVER: "servidor", LOAD: "carga", ENABLE: "activación",
+               WORLD: "mundo", SPAWN: "spawn"}
+
+_RE_ANSI = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+_RE_TIME = re.compile(r"^\[(\d{2}):(\d{2}):(\d{2})")
+_RE_LOADING = re.compile(r"\]: \[[^\]]+\] Loading (?:server plugin )?(\S+) v\S+")
+_RE_ENABLING = re.compile(r"\]: \[[^\]]+\] Enabling (\S+) v\S+")
+_RE_LEVEL = re.compile(r'Preparing level "([^"]+)"')
+_RE_REGION = re.compile(r"Preparing start region for (?:dimension|level) (\S+)")
+_RE_ELAPSED = re.compile(r"Time elapsed: (\d+) ms")
+_RE_DONE = re.compile(r"Done \((\d+(?:\.\d+)?)s\)!")
+
+
+@dataclass
+class StartupProfile:
+    started_at: float
+    total: float = 0.0                 # medido por la app, de arranque a "Done"
+    reported: Optional[float] = None   # lo que dice el propio servidor en "Done (Xs)!"
+    jar: str = ""
+    # [[fase, nombre, segundos]] en el orden del arranque
+    phases: List[List] = field(default_factory=list)
+
+    def ranked(self) -> List[Tuple[str, str, float]]:
+        return sorted(((k, n, s) for k, n, s in self.phases), key=lambda p: p[2], reverse=True)
+
+    def plugin_times(self) -> Dict[str, float]:
+        """Carga + activación por plugin."""
+        totals: Dict[str, float] = {}
+        for kind, name, seconds in self.phases:
+            if kind in (LOAD, ENABLE):
+                totals[name] = totals.get(name, 0.0) + seconds
+        return totals
+
+    def describe(self) -> str:
+        slowest = sorted(self.plugin_times().items(), key=lambda p: p[1], reverse=True)[:3]
+        text = f"Arranque en {self.total:.1f} s"
+        if slowest:
+            text += " | plugins más lentos: " + ", ".join(f"{n} {s:.1f} s" for n, s in slowest)
+        return text
+
+
+class StartupProfiler:
+    """Alimentar con cada línea de la consola; `feed` devuelve el perfil al ver "Done"."""
+
+    def __init__(self, jar: str = "", started_at: Optional[float] = None):
+        self.profile = StartupProfile(started_at=started_at or time.time(), jar=os.path.basename(jar))
+        self._t0 = time.monotonic()
+        self._phase: Tuple[str, str] = (SERVER, "")
+        self._phase_start = 0.0
+        self._durations: Dict[Tuple[str, str], float] = {}
+        self._order: List[Tuple[str, str]] = []
+        self.finished = False
+
+    def _switch(self, phase: Tuple[str, str], now: float):
+        elapsed = max(0.0, now - self._phase_start)
+        if elapsed or self._phase != (SERVER, ""):
+            if self._phase not in self._durations:
+                self._order.append(self._phase)
+            self._durations[self._phase] = self._durations.get(self._phase, 0.0) + elapsed
+        self._phase, self._phase_start = phase, now
+
+    def feed(self, line: str, now: Optional[float] = None) -> Optional[StartupProfile]:
+        """`now`: segundos desde el arranque (por defecto, reloj monotónico)."""
+        if self.finished:
+            return None
+        now = time.monotonic() - self._t0 if now is None else now
+        clean = _RE_ANSI.sub("", line)
+        m = _RE_ENABLING.search(clean)
+        if m:
+            self._switch((ENABLE, m.group(1)), now)
+            return None
+        m = _RE_LOADING.search(clean)
+        if m:
+            self._switch((LOAD, m.group(1)), now)
+            return None
+        m = _RE_LEVEL.search(clean)
+        if m:
+            self._switch((WORLD, m.group(1)), now)
+            return None
+        m = _RE_REGION.search(clean)
+        if m:
+            self._switch((SPAWN, m.group(1).replace("minecraft:", "")), now)
+            return None
+        if _RE_ELAPSED.search(clean):
+            self._switch((SERVER, ""), now)
+            return None
+        m = _RE_DONE.search(clean)
+        if m:
+            self._switch((SERVER, ""), now)
+            self.finished = True
+            self.profile.total = round(now, 3)
+            self.profile.reported = float(m.group(1))
+            self.profile.phases = [[k, n or KIND_LABELS[SERVER], round(self._durations[(k, n)], 3)]
+                                   for k, n in self._order]
+            return self.profile
+        return None
+
+
+def from_log(path: str) -> Optional[StartupProfile]:
+    """Perfil del arranque registrado en un `latest.log` (marcas de tiempo de 1 s)."""
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            lines = f.readlines()
+        started_at = os.path.getmtime(path)
+    except OSError:
+        return None
+    profiler, first, last = None, None, 0.0
+    for line in lines:
+        m = _RE_TIME.match(line)
+        if not m:
+            continue
+        seconds = int(m.group(1)) * 3600 + int(m.group(2)) * 60 + int(m.group(3))
+        if first is None:
+            first = seconds
+            profiler = StartupProfiler(started_at=started_at)
+        # Arranques que cruzan la medianoche
+        elapsed = seconds - first
+        if elapsed < last - 3600:
+            elapsed += 86400
+        last = elapsed
+        profile = profiler.feed(line, now=float(elapsed))
+        if profile:
+            return profile
+    return None
+
+
+# -- Historial --------------------------------------------------------------
+
+def record(server_dir: str, profile: StartupProfile):
+    """Añade el perfil al historial, conservando los últimos MAX_RUNS."""
+    path = os.path.join(server_dir, LOG_FILE)
+    runs = load_history(server_dir)[-(MAX_RUNS - 1):] + [profile]
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            for run in runs:
+                f.write(json.dumps(asdict(run)) + "\n")
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def load_history(server_dir: str) -> List[StartupProfile]:
+    """Arranques registrados, del más antiguo al más reciente."""
+    runs = []
+    try:
+        with open(os.path.join(server_dir, LOG_FILE), "r") as f:
+            for line in f:
+                try:
+                    runs.append(StartupProfile(**json.loads(line)))
+                except (ValueError, TypeError):
+                    continue
+    except OSError:
+        pass
+    return runs
+
+
+def format_report(runs: List[StartupProfile], top: int = 10) -> List[str]:
+    """Ranking del último arranque comparado con la mediana de los anteriores (sin markup)."""
+    if not runs:
+        return ["Sin arranques registrados todavía (se miden al iniciar el servidor desde la app)."]
+    last, previous = runs[-1], runs[:-1]
+    lines = [f"Último arranque: {last.total:.1f} s"
+             + (f" (el servidor indica {last.reported:.1f} s)" if last.reported else "")
+             + (f" | {last.jar}" if last.jar else "")]
+
+    history: Dict[Tuple[str, str], List[float]] = {}
+    for run in previous:
+        for kind, name, seconds in run.phases:
+            history.setdefault((kind, name), []).append(seconds)
+    width = max((len(n) for _, n, _ in last.ranked()[:top]), default=0)
+    for i, (kind, name, seconds) in enumerate(last.ranked()[:top], 1):
+        row = f"{i:>2}. {name:<{width}}  {KIND_LABELS.get(kind, kind):<10} {seconds:6.2f} s"
+        before = history.get((kind, name))
+        if before:
+            median = statistics.median(before)
+            delta = seconds - median
+            if abs(delta) >= 0.1:
+                row += f"  ({'+' if delta > 0 else ''}{delta:.2f} s vs mediana {median:.2f} s)"
+        lines.append(row)
+
+    if previous:
+        recent = [f"{run.total:.1f}" for run in runs[-8:]]
+        median = statistics.median(run.total for run in previous)
+        lines.append(f"Tendencia (s): {' → '.join(recent)} | mediana anterior {median:.1f} s")
+    return lines
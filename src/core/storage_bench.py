@@ -0,0 +1,296 @@
+"""Benchmark de almacenamiento y clasificación del dispositivo de server_bin.
+
+Los presets asumían una SD lenta en todas partes (`sync-chunk-writes=false`
+siempre), así que una Pi con SSD por USB se tuneaba como si tuviera una SD.
+Este módulo mide el sistema de archivos REAL de `server_bin`:
+  - escritura secuencial (MB/s)
+  - IOPS de lectura y escritura aleatoria de 4K
+  - latencia de fsync (mediana, ms)
+usando O_DIRECT cuando el sistema de archivos lo admite (tmpfs no), clasifica
+el dispositivo (sd, usb-flash, ssd, nvme, hdd, tmpfs) y cachea el resultado
+en `server_bin/.kcmc/storage.json` por id de dispositivo (major:minor).
+"""
+
+import json
+import mmap
+import os
+import random
+import statistics
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional, Tuple
+
+from src.core.pi_profile import is_pi_mode
+
+CACHE_FILE = os.path.join(".kcmc", "storage.json")
+BENCH_FILE = ".kcmc-bench.tmp"
+BLOCK = 4096
+
+STORAGE_CLASSES = ("tmpfs", "nvme", "ssd", "hdd", "usb-flash", "sd", "unknown")
+# Clases donde el guardado síncrono de chunks cuesta ticks
+SLOW_CLASSES = ("sd", "usb-flash", "hdd", "unknown")
+
+
+@dataclass
+class StorageProfile:
+    device_id: str
+    device_name: str
+    fs_type: str
+    storage_class: str
+    seq_write_mb_s: float
+    rand_read_iops: float
+    rand_write_iops: float
+    fsync_ms: float
+    direct_io: bool
+    measured_at: float
+
+    @property
+    def is_slow(self) -> bool:
+        return self.storage_class in SLOW_CLASSES
+
+    def backup_rate_limit_mb_s(self) -> float:
+        """Ancho de banda máximo para copias de seguridad sin robar IO al servidor.
+
+        ~25% de la escritura secuencial medida (mínimo 2 MB/s).
+        """
+        return max(2.0, round(self.seq_write_mb_s * 0.25, 1))
+
+    def describe(self) -> str:
+        return (f"{self.storage_class} ({self.device_name or '?'}, {self.fs_type}): "
+                f"{self.seq_write_mb_s:.0f} MB/s seq, {self.rand_read_iops:.0f}/{self.rand_write_iops:.0f} "
+                f"IOPS 4K lect/escr, fsync {self.fsync_ms:.1f} ms"
+                + ("" if self.direct_io else " [sin O_DIRECT]"))
+
+
+# ---------------------------------------------------------------------------
+# Identificación del dispositivo
+# ---------------------------------------------------------------------------
+
+def device_id(path: str) -> str:
+    st = os.stat(path)
+    return f"{os.major(st.st_dev)}:{os.minor(st.st_dev)}"
+
+
+def _fs_type(path: str) -> str:
+    """Tipo de FS del punto de montaje más largo que contiene `path` (/proc/mounts)."""
+    path = os.path.realpath(path)
+    best, fs = "", "unknown"
+    try:
+        with open("/proc/mounts", "r") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 3:
+                    continue
+                mnt = parts[1].replace("\\040", " ")
+                if (path == mnt or path.startswith(mnt.rstrip("/") + "/")) and len(mnt) >= len(best):
+                    best, fs = mnt, parts[2]
+    except OSError:
+        pass
+    return fs
+
+
+def _block_device(dev: str, sysfs_root: str = "/sys") -> Tuple[str, Dict[str, str]]:
+    """Nombre del disco (sin partición) y atributos de /sys/dev/block/<maj:min>."""
+    link = os.path.join(sysfs_root, "dev", "block", dev)
+    try:
+        real = os.path.realpath(link)
+    except OSError:
+        return "", {}
+    if not os.path.exists(real):
+        return "", {}
+    disk_dir = real
+    if os.path.exists(os.path.join(real, "partition")):
+        disk_dir = os.path.dirname(real)
+    attrs = {"path": real}
+    for name, rel in (("rotational", "queue/rotational"), ("removable", "removable")):
+        try:
+            with open(os.path.join(disk_dir, rel), "r") as f:
+                attrs[name] = f.read().strip()
+        except OSError:
+            pass
+    return os.path.basename(disk_dir), attrs
+
+
+def _class_hint(device_name: str, fs_type: str, attrs: Dict[str, str]) -> Optional[str]:
+    """Clase deducida sin medir; None si hay que decidir por rendimiento."""
+    if fs_type in ("tmpfs", "ramfs"):
+        return "tmpfs"
+    if device_name.startswith("nvme"):
+        return "nvme"
+    if device_name.startswith("mmcblk"):
+        return "sd"
+    if attrs.get("rotational") == "1" and "/usb" not in attrs.get("path", ""):
+        return "hdd"
+    if device_name.startswith(("sd", "vd", "xvd")) and "/usb" not in attrs.get("path", ""):
+        return "ssd"
+    return None
+
+
+def _classify(hint: Optional[str], rand_write_iops: float, fsync_ms: float, seq_mb_s: float) -> str:
+    if hint == "hdd" and rand_write_iops >= 1000:
+        # Discos virtuales (virtio) se anuncian como rotacionales
+        return "ssd"
+    if hint:
+        return hint
+    # USB (o desconocido): un SSD por USB aguanta miles de IOPS 4K y fsync rápidos;
+    # un pendrive se queda en decenas-cientos con fsync de decenas de ms.
+    if rand_write_iops >= 1000 and fsync_ms < 10:
+        return "ssd"
+    if rand_write_iops < 300 or fsync_ms >= 20:
+        return "usb-flash"
+    return "ssd" if seq_mb_s >= 100 else "usb-flash"
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+def _open_bench(path: str, flags: int) -> Tuple[int, bool]:
+    """Abre con O_DIRECT si el FS lo admite; si no, sin él (p.ej. tmpfs)."""
+    direct = getattr(os, "O_DIRECT", 0)
+    if direct:
+        try:
+            return os.open(path, flags | direct, 0o600), True
+        except OSError:
+            pass
+    return os.open(path, flags, 0o600), False
+
+
+def _drop_cache(fd: int):
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        except OSError:
+            pass
+
+
+def run_benchmark(target_dir: str, size_mb: int = 32, duration: float = 1.0) -> StorageProfile:
+    """Mide el FS de `target_dir`. Escribe y borra un archivo temporal de `size_mb`."""
+    path = os.path.join(target_dir, BENCH_FILE)
+    chunk = 1024 * 1024
+    # mmap anónimo: buffer alineado a página, requisito de O_DIRECT
+    big = mmap.mmap(-1, chunk)
+    big.write(os.urandom(chunk))
+    small = mmap.mmap(-1, BLOCK)
+    small.write(os.urandom(BLOCK))
+    blocks = (size_mb * chunk) // BLOCK
+    rng = random.Random(42)
+
+    try:
+        # 1. Escritura secuencial + fsync
+        fd, direct = _open_bench(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+        try:
+            start = time.perf_counter()
+            for i in range(size_mb):
+                os.pwritev(fd, [big], i * chunk)
+            os.fsync(fd)
+            seq_mb_s = size_mb / max(time.perf_counter() - start, 1e-6)
+        finally:
+            os.close(fd)
+
+        # 2. Lectura aleatoria 4K
+        fd, _ = _open_bench(path, os.O_RDONLY)
+        try:
+            _drop_cache(fd)
+            ops, start = 0, time.perf_counter()
+            while time.perf_counter() - start < duration:
+                os.preadv(fd, [small], rng.randrange(blocks) * BLOCK)
+                ops += 1
+            rand_read_iops = ops / (time.perf_counter() - start)
+        finally:
+            os.close(fd)
+
+        # 3. Escritura aleatoria 4K (se incluye el fsync final)
+        fd, _ = _open_bench(path, os.O_WRONLY)
+        try:
+            ops, start = 0, time.perf_counter()
+            while time.perf_counter() - start < duration:
+                os.pwritev(fd, [small], rng.randrange(blocks) * BLOCK)
+                ops += 1
+            os.fsync(fd)
+            rand_write_iops = ops / (time.perf_counter() - start)
+
+            # 4. Latencia de fsync: escritura 4K + fsync, mediana
+            latencies = []
+            for _ in range(20):
+                os.pwritev(fd, [small], rng.randrange(blocks) * BLOCK)
+                t0 = time.perf_counter()
+                os.fsync(fd)
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+            fsync_ms = statistics.median(latencies)
+        finally:
+            os.close(fd)
+    finally:
+        big.close()
+        small.close()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    dev = device_id(target_dir)
+    name, attrs = _block_device(dev)
+    fs = _fs_type(target_dir)
+    return StorageProfile(
+        device_id=dev,
+        device_name=name,
+        fs_type=fs,
+        storage_class=_classify(_class_hint(name, fs, attrs), rand_write_iops, fsync_ms, seq_mb_s),
+        seq_write_mb_s=round(seq_mb_s, 1),
+        rand_read_iops=round(rand_read_iops),
+        rand_write_iops=round(rand_write_iops),
+        fsync_ms=round(fsync_ms, 2),
+        direct_io=direct,
+        measured_at=time.time(),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Caché por dispositivo
+# ---------------------------------------------------------------------------
+
+def _load_cache(server_dir: str) -> Dict:
+    try:
+        with open(os.path.join(server_dir, CACHE_FILE), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def cached_profile(server_dir: str) -> Optional[StorageProfile]:
+    """Perfil ya medido para el dispositivo actual de `server_dir`, sin medir."""
+    if not os.path.isdir(server_dir):
+        return None
+    entry = _load_cache(server_dir).get(device_id(server_dir))
+    if not entry:
+        return None
+    try:
+        return StorageProfile(**entry)
+    except TypeError:
+        return None
+
+
+def get_storage_profile(server_dir: str, refresh: bool = False, size_mb: Optional[int] = None) -> StorageProfile:
+    """Perfil del almacenamiento de `server_dir`: cacheado o medido ahora."""
+    if not refresh:
+        profile = cached_profile(server_dir)
+        if profile:
+            return profile
+    if size_mb is None:
+        size_mb = 16 if is_pi_mode() else 64  # menos desgaste en SD
+    profile = run_benchmark(server_dir, size_mb=size_mb)
+    cache = _load_cache(server_dir)
+    cache[profile.device_id] = asdict(profile)
+    cache_path = os.path.join(server_dir, CACHE_FILE)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp = cache_path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp, cache_path)
+    return profile
+
+
+def storage_class(server_dir: str) -> str:
+    """Clase cacheada del almacenamiento, o 'unknown' si nunca se midió."""
+    profile = cached_profile(server_dir)
+    return profile.storage_class if profile else "unknown"
@@ -0,0 +1,198 @@
+"""Sensores térmicos y de throttling (Raspberry Pi / ARM) leídos de sysfs.
+
+El mayor problema de rendimiento en una Pi no es la RAM sino el throttling:
+al pasar de ~80 °C o con una fuente floja el firmware baja la frecuencia de
+la CPU y los TPS caen sin que nada en el servidor lo explique.
+
+Lee (todo bajo `sysfs_root`, configurable para probar contra un árbol falso):
+  - class/thermal/thermal_zone*/temp          (milicelsius)
+  - devices/system/cpu/cpu*/cpufreq/scaling_cur_freq y cpuinfo_max_freq (kHz)
+  - devices/platform/soc/soc:firmware/get_throttled (flags del firmware Pi)
+  - class/hwmon/hwmon*/in0_lcrit_alarm con name=rpi_volt (bajo voltaje)
+
+Con la raíz por defecto y sin `get_throttled` en sysfs se recurre a
+`vcgencmd get_throttled` si está instalado; lanzar el proceso cuesta más
+que leer sysfs, así que su resultado se reutiliza durante VCGENCMD_TTL s.
+`read()` bloquea: desde asyncio hay que llamarlo con `asyncio.to_thread`.
+"""
+
+import glob
+import os
+import shutil
+import subprocess
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+# Por encima de esta temperatura el firmware de la Pi empieza a limitar la CPU
+THROTTLE_TEMP_C = 80.0
+
+# Bits de `get_throttled` (https://www.raspberrypi.com/documentation/computers/os.html#get_throttled)
+UNDER_VOLTAGE = 1 << 0
+FREQ_CAPPED = 1 << 1
+THROTTLED = 1 << 2
+SOFT_TEMP_LIMIT = 1 << 3
+UNDER_VOLTAGE_OCCURRED = 1 << 16
+FREQ_CAPPED_OCCURRED = 1 << 17
+THROTTLED_OCCURRED = 1 << 18
+SOFT_TEMP_LIMIT_OCCURRED = 1 << 19
+
+# Segundos que se reutiliza la salida de `vcgencmd get_throttled`
+VCGENCMD_TTL = 30.0
+
+
+def _read_text(path: str) -> Optional[str]:
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _read_int(path: str) -> Optional[int]:
+    text = _read_text(path)
+    try:
+        return int(text) if text is not None else None
+    except ValueError:
+        return None
+
+
+@dataclass
+class ThermalReading:
+    """Una lectura de sensores. Los campos son None si no hay sensor."""
+    time: float
+    temp_c: Optional[float] = None
+    zones: Dict[str, float] = field(default_factory=dict)
+    cpu_mhz: Optional[float] = None
+    cpu_max_mhz: Optional[float] = None
+    throttled_flags: Optional[int] = None
+
+    @property
+    def freq_ratio(self) -> Optional[float]:
+        if not self.cpu_mhz or not self.cpu_max_mhz:
+            return None
+        return self.cpu_mhz / self.cpu_max_mhz
+
+    @property
+    def under_voltage(self) -> bool:
+        return bool(self.throttled_flags and self.throttled_flags & UNDER_VOLTAGE)
+
+    @property
+    def is_throttled(self) -> bool:
+        """True si la CPU está limitada ahora mismo (flags del firmware o temperatura)."""
+        if self.throttled_flags is not None:
+            return bool(self.throttled_flags & (FREQ_CAPPED | THROTTLED | SOFT_TEMP_LIMIT | UNDER_VOLTAGE))
+        # Sin flags: temperatura crítica y frecuencia por debajo del máximo
+        ratio = self.freq_ratio
+        return (self.temp_c is not None and self.temp_c >= THROTTLE_TEMP_C
+                and (ratio is None or ratio < 0.95))
+
+    def cause(self) -> str:
+        """Descripción corta de la causa del throttling (para alertas)."""
+        if self.under_voltage:
+            return "under-voltage throttling"
+        if self.temp_c is not None:
+            return f"thermal throttling at {self.temp_c:.0f}°C"
+        return "CPU throttling"
+
+    def describe(self) -> List[str]:
+        """Texto plano para diagnóstico."""
+        parts = []
+        if self.temp_c is not None:
+            parts.append(f"{self.temp_c:.1f}°C")
+        if self.cpu_mhz and self.cpu_max_mhz:
+            parts.append(f"CPU {self.cpu_mhz:.0f}/{self.cpu_max_mhz:.0f} MHz")
+        if self.throttled_flags is not None:
+            parts.append(f"throttled=0x{self.throttled_flags:x}")
+        lines = [" | ".join(parts)] if parts else []
+        flags = self.throttled_flags or 0
+        if flags & UNDER_VOLTAGE:
+            lines.append("Bajo voltaje AHORA: revisa la fuente de alimentación (5V/2.5A+).")
+        elif flags & UNDER_VOLTAGE_OCCURRED:
+            lines.append("Hubo bajo voltaje desde el arranque.")
+        if flags & (THROTTLED | SOFT_TEMP_LIMIT):
+            lines.append("CPU limitada por temperatura AHORA: mejora la refrigeración.")
+        elif flags & (THROTTLED_OCCURRED | SOFT_TEMP_LIMIT_OCCURRED):
+            lines.append("Hubo throttling térmico desde el arranque.")
+        return lines
+
+
+class ThermalSensor:
+    """Lector de sensores térmicos/frecuencia con raíz de sysfs configurable."""
+
+    def __init__(self, sysfs_root: str = "/sys"):
+        self.sysfs_root = sysfs_root
+        self._zone_types: Dict[str, str] = {}
+        self._use_vcgencmd = (sysfs_root == "/sys" and shutil.which("vcgencmd") is not None)
+        self._vcgencmd_cache: Optional[int] = None
+        self._vcgencmd_at = 0.0
+
+    def _path(self, *parts: str) -> str:
+        return os.path.join(self.sysfs_root, *parts)
+
+    def available(self) -> bool:
+        return bool(glob.glob(self._path("class", "thermal", "thermal_zone*", "temp"))
+                    or glob.glob(self._path("devices", "system", "cpu", "cpu[0-9]*", "cpufreq")))
+
+    def _read_zones(self) -> Dict[str, float]:
+        zones = {}
+        for temp_path in sorted(glob.glob(self._path("class", "thermal", "thermal_zone*", "temp"))):
+            zone_dir = os.path.dirname(temp_path)
+            if zone_dir not in self._zone_types:
+                self._zone_types[zone_dir] = _read_text(os.path.join(zone_dir, "type")) or os.path.basename(zone_dir)
+            milli = _read_int(temp_path)
+            if milli is not None:
+                zones[self._zone_types[zone_dir]] = milli / 1000.0
+        return zones
+
+    def _read_freqs(self):
+        cur, maxes = [], []
+        for cpufreq in glob.glob(self._path("devices", "system", "cpu", "cpu[0-9]*", "cpufreq")):
+            c = _read_int(os.path.join(cpufreq, "scaling_cur_freq"))
+            m = _read_int(os.path.join(cpufreq, "cpuinfo_max_freq"))
+            if c:
+                cur.append(c)
+            if m:
+                maxes.append(m)
+        cur_mhz = (sum(cur) / len(cur)) / 1000.0 if cur else None
+        max_mhz = max(maxes) / 1000.0 if maxes else None
+        return cur_mhz, max_mhz
+
+    def _read_throttled(self) -> Optional[int]:
+        text = _read_text(self._path("devices", "platform", "soc", "soc:firmware", "get_throttled"))
+        if text:
+            try:
+                return int(text, 16)
+            except ValueError:
+                pass
+        # Driver hwmon rpi_volt: solo informa de bajo voltaje
+        for name_path in glob.glob(self._path("class", "hwmon", "hwmon*", "name")):
+            if _read_text(name_path) == "rpi_volt":
+                alarm = _read_int(os.path.join(os.path.dirname(name_path), "in0_lcrit_alarm"))
+                if alarm is not None:
+                    return UNDER_VOLTAGE if alarm else 0
+        if self._use_vcgencmd:
+            now = time.monotonic()
+            if self._vcgencmd_cache is not None and now - self._vcgencmd_at < VCGENCMD_TTL:
+                return self._vcgencmd_cache
+            try:
+                out = subprocess.run(["vcgencmd", "get_throttled"], capture_output=True,
+                                     text=True, timeout=2).stdout
+                self._vcgencmd_cache = int(out.strip().split("=", 1)[1], 16)
+                self._vcgencmd_at = now
+                return self._vcgencmd_cache
+            except (OSError, subprocess.SubprocessError, ValueError, IndexError):
+                self._use_vcgencmd = False
+        return None
+
+    def read(self) -> ThermalReading:
+        zones = self._read_zones()
+        cur_mhz, max_mhz = self._read_freqs()
+        return ThermalReading(
+            time=time.time(),
+            temp_c=max(zones.values()) if zones else None,
+            zones=zones,
+            cpu_mhz=cur_mhz,
+            cpu_max_mhz=max_mhz,
+            throttled_flags=self._read_throttled(),
+        )
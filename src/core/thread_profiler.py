@@ -0,0 +1,182 @@
+"""Atribución de CPU por hilo de la JVM leyendo /proc/<pid>/task (solo stdlib).
+
+Cuando caen los TPS no basta con el uso total del proceso: hay que saber si
+quema CPU el "Server thread", el GC, el JIT, los workers de chunks o el pool
+async de algún plugin. Este módulo muestrea utime+stime de cada hilo, calcula
+el delta entre muestras y agrupa por patrón de nombre.
+
+Pensado para JVMs con cientos de hilos en una Pi: la lista de hilos (rutas de
+`stat` precalculadas y nombres de `comm`) se cachea y solo se vuelve a listar
+`/proc/<pid>/task` cuando cambia `num_threads` o desaparece un hilo.
+"""
+
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+try:
+    CLK_TCK = os.sysconf("SC_CLK_TCK")
+except (ValueError, OSError, AttributeError):
+    CLK_TCK = 100
+
+# (grupo, patrón sobre `comm`). `comm` viene truncado a 15 caracteres por el
+# kernel ("C2 CompilerThre", "Netty Epoll Ser"). Con SerialGC las pausas se
+# ejecutan en el "VM Thread", por eso cuenta como GC.
+THREAD_GROUPS = (
+    ("Server thread", re.compile(r"^Server thread")),
+    ("GC", re.compile(r"^(GC Thread|G1 |VM Thread|ZWorker|ZDirector|Shenandoah)")),
+    ("C2 compiler", re.compile(r"^C[12] CompilerThre")),
+    ("Worker-Main", re.compile(r"^Worker-Main")),
+    ("Netty", re.compile(r"^(Netty |nioEventLoop|epollEventLoop)")),
+)
+OTHER_GROUP = "Otros"
+
+
+def classify_thread(name: str) -> str:
+    """Grupo al que pertenece un hilo según su nombre (`comm`)."""
+    for group, pattern in THREAD_GROUPS:
+        if pattern.match(name):
+            return group
+    return OTHER_GROUP
+
+
+def _read_small(path: str) -> bytes:
+    """Lee un archivo pequeño de /proc sin pasar por TextIOWrapper."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return os.read(fd, 1024)
+    finally:
+        os.close(fd)
+
+
+def _parse_stat(raw: bytes) -> Tuple[int, int]:
+    """(ticks de CPU utime+stime, num_threads) de una línea de /proc/.../stat.
+
+    `comm` va entre paréntesis y puede contener espacios o ')', así que se
+    corta en el último ')'.
+    """
+    rest = raw[raw.rfind(b")") + 2:].split()
+    return int(rest[11]) + int(rest[12]), int(rest[17])
+
+
+@dataclass
+class ThreadUsage:
+    tid: int
+    name: str
+    group: str
+    cpu_percent: float  # % de un núcleo durante el intervalo
+
+
+@dataclass
+class ThreadSample:
+    """Resultado de un muestreo: uso por hilo y agregado por grupo."""
+    interval: float
+    threads: List[ThreadUsage] = field(default_factory=list)
+    groups: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def total_percent(self) -> float:
+        return sum(self.groups.values())
+
+    def top_threads(self, n: int = 8) -> List[ThreadUsage]:
+        return sorted(self.threads, key=lambda t: t.cpu_percent, reverse=True)[:n]
+
+    def top_groups(self, n: int = 6) -> List[Tuple[str, float]]:
+        return sorted(self.groups.items(), key=lambda g: g[1], reverse=True)[:n]
+
+
+class ThreadProfiler:
+    """Muestreador de CPU por hilo para un PID.
+
+    Cada llamada a `sample()` devuelve el uso desde la llamada anterior
+    (la primera solo establece la línea base y devuelve None).
+    """
+
+    def __init__(self, pid: int, proc_root: str = "/proc"):
+        self.pid = pid
+        self.proc_root = proc_root
+        self._task_dir = os.path.join(proc_root, str(pid), "task")
+        self._proc_stat = os.path.join(proc_root, str(pid), "stat")
+        # tid -> (ruta de stat, nombre, grupo)
+        self._tasks: Dict[int, Tuple[str, str, str]] = {}
+        self._last_ticks: Dict[int, int] = {}
+        self._last_time: Optional[float] = None
+
+    def _refresh_tasks(self):
+        """Vuelve a listar /proc/<pid>/task. Solo se llama si cambió el nº de hilos."""
+        tasks = {}
+        for entry in os.scandir(self._task_dir):
+            if not entry.name.isdigit():
+                continue
+            tid = int(entry.name)
+            cached = self._tasks.get(tid)
+            if cached:
+                tasks[tid] = cached
+                continue
+            try:
+                name = _read_small(os.path.join(entry.path, "comm")).decode(
+                    "utf-8", errors="replace").strip()
+            except OSError:
+                continue
+            tasks[tid] = (os.path.join(entry.path, "stat"), name, classify_thread(name))
+        self._tasks = tasks
+
+    def sample(self) -> Optional[ThreadSample]:
+        """Toma una muestra. None si es la primera o el proceso ya no existe."""
+        try:
+            _, num_threads = _parse_stat(_read_small(self._proc_stat))
+        except (OSError, ValueError, IndexError):
+            return None
+
+        if num_threads != len(self._tasks):
+            try:
+                self._refresh_tasks()
+            except OSError:
+                return None
+
+        now = time.monotonic()
+        ticks: Dict[int, int] = {}
+        vanished = False
+        for tid, (stat_path, _, _) in self._tasks.items():
+            try:
+                ticks[tid] = _parse_stat(_read_small(stat_path))[0]
+            except (OSError, ValueError, IndexError):
+                vanished = True
+        if vanished:
+            # Un hilo terminó: fuerza re-listado en la próxima muestra
+            self._tasks = {tid: t for tid, t in self._tasks.items() if tid in ticks}
+
+        previous, last_time = self._last_ticks, self._last_time
+        self._last_ticks, self._last_time = ticks, now
+        if last_time is None or now <= last_time:
+            return None
+
+        interval = now - last_time
+        scale = 100.0 / (interval * CLK_TCK)
+        result = ThreadSample(interval=interval)
+        for tid, value in ticks.items():
+            before = previous.get(tid)
+            if before is None:
+                continue
+            _, name, group = self._tasks[tid]
+            pct = max(value - before, 0) * scale
+            result.threads.append(ThreadUsage(tid, name, group, pct))
+            result.groups[group] = result.groups.get(group, 0.0) + pct
+        return result
+
+
+def format_report(sample: Optional[ThreadSample], n: int = 8) -> List[str]:
+    """Tabla de texto plano (sin markup) con el top-N de grupos e hilos."""
+    if sample is None:
+        return ["Sin datos de hilos todavía (se necesitan dos muestras)."]
+    lines = [f"CPU JVM: {sample.total_percent:.0f}% de un núcleo "
+             f"({len(sample.threads)} hilos, ventana {sample.interval:.1f}s)"]
+    lines.append("Por grupo:")
+    for group, pct in sample.top_groups():
+        lines.append(f"  {group:<14} {pct:6.1f}%")
+    lines.append(f"Top {n} hilos:")
+    for t in sample.top_threads(n):
+        lines.append(f"  {t.name:<16} {t.cpu_percent:6.1f}%  ({t.group}, tid {t.tid})")
+    return lines
@@ -9,7 +9,7 @@ import pty
 import select
 from typing import Callable, Optional
 
-from src.core import http_client
+from src.core.artifact_store import get_store
 
 
 class TunnelManager:
@@ -238,8 +238,8 @@ class TunnelManager:
             else:
                 url = self.PLAYIT_AMD64_URL
             try:
-                http_client.download(url, self.agent_path, timeout=120)
-                os.chmod(self.agent_path, 0o755)
+                # Pinned release URL: every instance shares one copy of the agent
+                get_store().fetch(url, self.agent_path, immutable=True, executable=True, timeout=120)
                 if self.callback:
                     self.callback("[green]Agente Playit.gg descargado.[/green]")
                 return self.agent_path
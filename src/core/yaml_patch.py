@@ -0,0 +1,252 @@
+"""Parcheador de YAML por ruta de claves, sin dependencias y consciente de la indentación.
+
+Los presets hacían `replace`/regex sobre `bukkit.yml`, `spigot.yml` y el
+`paper.yml` antiguo. Paper moderno usa `config/paper-global.yml` y
+`config/paper-world-defaults.yml`, donde esas búsquedas no encuentran nada.
+
+`YamlPatch` localiza una clave por su ruta (`chunks.max-auto-save-chunks-per-tick`,
+`entities.spawning.despawn-ranges.monster.hard`) siguiendo la indentación de
+los bloques, cambia solo el valor escalar de esa línea (conserva indentación,
+comillas de la clave y comentario final) y deja el resto del archivo byte a
+byte, incluido su fin de línea (LF o CRLF). Las claves que faltan se crean
+al final de su bloque padre. No es un parser YAML completo: listas, anclas
+y escalares multilínea no se editan.
+"""
+
+import difflib
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+# clave (con o sin comillas), ':' y el resto de la línea
+_KEY_RE = re.compile(r"""^(?P<indent>[ ]*)(?P<key>'[^']*'|"[^"]*"|[^\s#'":][^:#]*?)[ ]*:(?=\s|$)(?P<rest>.*)$""")
+_PLAIN_SAFE = re.compile(r"^[A-Za-z0-9_./+-][A-Za-z0-9_ ./+-]*$")
+
+
+@dataclass
+class YamlChange:
+    path: str
+    old: Optional[str]  # None si la clave se creó
+    new: str
+
+    def describe(self) -> str:
+        return f"{self.path}: {'(nuevo)' if self.old is None else self.old} -> {self.new}"
+
+
+def format_scalar(value) -> str:
+    """Representación YAML de un escalar Python."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    text = str(value)
+    if _PLAIN_SAFE.match(text) and text.lower() not in ("yes", "no", "on", "off", "null", "~"):
+        return text
+    return "'" + text.replace("'", "''") + "'"
+
+
+def _split_value(rest: str) -> Tuple[str, str]:
+    """('valor', ' # comentario') del resto de la línea tras ':'."""
+    body = rest.strip()
+    if body.startswith(("'", '"')):
+        quote = body[0]
+        end = body.find(quote, 1)
+        while quote == "'" and end != -1 and body[end + 1:end + 2] == "'":
+            end = body.find(quote, end + 2)
+        if end != -1:
+            value, tail = body[:end + 1], body[end + 1:]
+            return value, tail.rstrip()
+    m = re.search(r"\s#", body)
+    if m:
+        value = body[:m.start()].rstrip()
+        return value, body[len(value):]  # comentario con su espaciado original
+    return body, ""
+
+
+def _eol(line: str) -> str:
+    """Fin de línea de `line`: CRLF, LF o vacío (última línea sin salto)."""
+    return line[len(line.rstrip("\r\n")):]
+
+
+def _unquote(key: str) -> str:
+    if len(key) >= 2 and key[0] == key[-1] and key[0] in "'\"":
+        return key[1:-1]
+    return key
+
+
+class YamlPatch:
+    """Documento YAML como lista de líneas con edición por ruta."""
+
+    def __init__(self, text: str, name: str = "config.yml"):
+        self.name = name
+        self.original = text
+        self.lines = text.splitlines(keepends=True)
+        # Las líneas nuevas usan el mismo fin de línea que el archivo
+        self.newline = "\r\n" if self.lines and self.lines[0].endswith("\r\n") else "\n"
+        self.changes: List[YamlChange] = []
+
+    @classmethod
+    def from_file(cls, path: str) -> "YamlPatch":
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            return cls(f.read(), os.path.basename(path))
+
+    # -- Búsqueda ----------------------------------------------------------
+
+    def _entry(self, i: int):
+        """Match de clave en la línea `i`, o None (comentario, vacía, lista...)."""
+        line = self.lines[i].rstrip("\r\n")
+        if not line.strip() or line.lstrip().startswith(("#", "-")):
+            return None
+        return _KEY_RE.match(line)
+
+    def _block_end(self, start: int, parent_indent: int) -> int:
+        """Primera línea tras `start` con indentación <= parent_indent (fin del bloque)."""
+        i = start
+        while i < len(self.lines):
+            line = self.lines[i]
+            stripped = line.strip()
+            if stripped and not stripped.startswith("#"):
+                if len(line) - len(line.lstrip(" ")) <= parent_indent:
+                    return i
+            i += 1
+        return i
+
+    def _find_child(self, start: int, end: int, key: str) -> Tuple[Optional[int], Optional[int]]:
+        """(nº de línea, indentación de hijos) de `key` entre start y end."""
+        child_indent = None
+        for i in range(start, end):
+            m = self._entry(i)
+            if not m:
+                continue
+            indent = len(m.group("indent"))
+            if child_indent is None:
+                child_indent = indent
+            if indent == child_indent and _unquote(m.group("key").strip()) == key:
+                return i, child_indent
+        return None, child_indent
+
+    def _locate(self, parts: List[str]):
+        """Recorre la ruta. Devuelve (línea, nº de partes encontradas, inicio, fin, indent padre)."""
+        start, end, parent_indent, line_no = 0, len(self.lines), -1, None
+        for depth, key in enumerate(parts):
+            found, _ = self._find_child(start, end, key)
+            if found is None:
+                return line_no, depth, start, end, parent_indent
+            line_no = found
+            parent_indent = len(self._entry(found).group("indent"))
+            start, end = found + 1, self._block_end(found + 1, parent_indent)
+        return line_no, len(parts), start, end, parent_indent
+
+    def get(self, path: str) -> Optional[str]:
+        """Valor escalar (texto crudo) en `path`, o None si no existe o es un bloque."""
+        parts = path.split(".")
+        line_no, depth, _, _, _ = self._locate(parts)
+        if depth < len(parts):
+            return None
+        value, _ = _split_value(self._entry(line_no).group("rest"))
+        return value or None
+
+    # -- Edición -----------------------------------------------------------
+
+    def set(self, path: str, value, create: bool = True) -> bool:
+        """Fija un escalar en `path`. True si el archivo cambió.
+
+        Con `create=False` las claves que no existen se ignoran (útil para
+        archivos antiguos donde no hay que inventar secciones).
+        """
+        parts = path.split(".")
+        new = format_scalar(value)
+        line_no, depth, start, end, parent_indent = self._locate(parts)
+
+        if depth == len(parts):
+            m = self._entry(line_no)
+            old, comment = _split_value(m.group("rest"))
+            if not old and self._block_end(line_no + 1, len(m.group("indent"))) > line_no + 1:
+                raise ValueError(f"{self.name}: '{path}' es un bloque, no un escalar")
+            if old == new:
+                return False
+            self.lines[line_no] = f"{m.group('indent')}{m.group('key')}: {new}{comment}{_eol(self.lines[line_no])}"
+            self.changes.append(YamlChange(path, old, new))
+            return True
+
+        if not create:
+            return False
+
+        # Crear las claves que faltan al final del bloque padre
+        if line_no is not None:
+            m = self._entry(line_no)
+            old, comment = _split_value(m.group("rest"))
+            if old == "{}":
+                self.lines[line_no] = f"{m.group('indent')}{m.group('key')}:{comment}{_eol(self.lines[line_no])}"
+            elif old:
+                raise ValueError(f"{self.name}: '{'.'.join(parts[:depth])}' es un escalar, no un bloque")
+        _, child_indent = self._find_child(start, end, parts[depth])
+        indent = child_indent if child_indent is not None else parent_indent + 2 if parent_indent >= 0 else 0
+        step = max(indent - parent_indent, 2) if parent_indent >= 0 else 2
+        # Insertar tras la última línea del bloque, sin arrastrar líneas vacías
+        # ni comentarios menos indentados que pertenecen a la sección siguiente
+        insert_at = end
+        while insert_at > start:
+            prev = self.lines[insert_at - 1]
+            if prev.strip() and not (prev.lstrip().startswith("#")
+                                     and len(prev) - len(prev.lstrip(" ")) < indent):
+                break
+            insert_at -= 1
+        if insert_at and not _eol(self.lines[insert_at - 1]):
+            self.lines[insert_at - 1] += self.newline
+        new_lines = []
+        for offset, key in enumerate(parts[depth:]):
+            pad = " " * (indent + offset * step)
+            if depth + offset == len(parts) - 1:
+                new_lines.append(f"{pad}{key}: {new}{self.newline}")
+            else:
+                new_lines.append(f"{pad}{key}:{self.newline}")
+        self.lines[insert_at:insert_at] = new_lines
+        self.changes.append(YamlChange(path, None, new))
+        return True
+
+    def update(self, values: Dict[str, object], create: bool = True) -> List[YamlChange]:
+        """Aplica varias rutas. Devuelve solo los cambios de esta llamada."""
+        before = len(self.changes)
+        for path, value in values.items():
+            self.set(path, value, create=create)
+        return self.changes[before:]
+
+    # -- Salida ------------------------------------------------------------
+
+    def text(self) -> str:
+        return "".join(self.lines)
+
+    @property
+    def changed(self) -> bool:
+        return self.text() != self.original
+
+    def diff(self) -> List[str]:
+        """Diff unificado (sin saltos de línea finales) entre el original y el actual."""
+        return [line.rstrip("\r\n") for line in difflib.unified_diff(
+            self.original.splitlines(keepends=True), self.lines,
+            fromfile=f"a/{self.name}", tofile=f"b/{self.name}", n=1)]
+
+    def save(self, path: str):
+        """Escritura atómica (no-op si no hay cambios)."""
+        if not self.changed:
+            return
+        tmp = os.path.join(os.path.dirname(path) or ".", f".{os.path.basename(path)}.tmp")
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            f.write(self.text())
+        os.replace(tmp, path)
+        self.original = self.text()
+
+
+def patch_file(path: str, values: Dict[str, object], create: bool = True,
+               dry_run: bool = False) -> Tuple[List[YamlChange], List[str]]:
+    """Parchea `path` con {ruta: valor}. Devuelve (cambios, diff). No toca nada si no existe."""
+    if not os.path.exists(path):
+        return [], []
+    doc = YamlPatch.from_file(path)
+    changes = doc.update(values, create=create)
+    diff = doc.diff()
+    if not dry_run:
+        doc.save(path)
+    return changes, diff
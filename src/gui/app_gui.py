@@ -16,8 +16,19 @@ from src.core.player_manager import PlayerManager
 from src.core.plugin_manager import PluginManager
 from src.core.config_manager import ConfigManager
 from src.core.pi_profile import (is_pi_mode, get_ram_options, get_default_ram,
-                                 get_java_args, get_optimization_preset, get_diagnostics)
+                                 get_java_args, get_diagnostics)
 from src.core import clipboard
+from src.core.thread_profiler import ThreadProfiler, format_report
+from src.core import gc_log
+from src.core import storage_bench
+from src.core import preset_catalog
+from src.core import config_history
+from src.core import cpu_topology
+from src.core import paperclip
+from src.core import releases
+from src.core import startup_profile
+from src.core.distance_tuner import DistanceTuner
+from src.core.server_sanitizer import ServerSanitizer
 
 # Ensure sys.path includes our libs if running standalone
 base_check = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -44,6 +55,7 @@ class KubeControlGUI(ctk.CTk):
         self.server_dir = os.path.join(self.base_dir, "server_bin")
         if not os.path.exists(self.server_dir):
             os.makedirs(self.server_dir)
+        self.gc_log_path = os.path.join(self.server_dir, "logs", "gc.log")
 
         # --- Window Setup ---
         # Window Setup
@@ -88,11 +100,14 @@ class KubeControlGUI(ctk.CTk):
         self.player_manager = PlayerManager(server_path=self.server_dir)
         
         self.server_controller = None
+        self.distance_tuner = None
+        self.startup_profiler = None
         self.current_jar = self.jar_manager.get_current_jar()
         self.server_start_time = None
         self.is_starting = False
         self.mc_version = None
         self.tunnel_retry_count = 0
+        self.thread_profiler = None
 
         # --- UI Layout ---
         self.grid_columnconfigure(1, weight=1)
@@ -101,10 +116,9 @@ class KubeControlGUI(ctk.CTk):
         self._setup_sidebar()
         self._setup_main_area()
         
-        # Diagnóstico de hardware al abrir (modo Pi / ARM)
-        for line in get_diagnostics():
-            self.log_system(line.replace("[bold orange]", "").replace("[/bold orange]", "")
-                            .replace("[dim]", "").replace("[/dim]", ""))
+        # Diagnóstico de hardware al abrir (modo Pi / ARM), fuera del hilo de la UI
+        if self.pi_mode:
+            threading.Thread(target=self._refine_memory_defaults, daemon=True).start()
         
         # Initial status check loop
         self._check_status_periodic()
@@ -142,7 +156,9 @@ class KubeControlGUI(ctk.CTk):
 
         # RAM Select
         ctk.CTkLabel(self.sidebar, text="Memoria RAM:", anchor="w").grid(row=4, column=0, padx=20, pady=(15, 0))
-        self.ram_var = StringVar(value=get_default_ram())
+        # Una muestra de memoria: el muestreo completo (~1s) se afina en un hilo
+        self._quick_ram = get_default_ram(quick=True)
+        self.ram_var = StringVar(value=self._quick_ram)
         self.ram_menu = ctk.CTkOptionMenu(self.sidebar, values=get_ram_options(), variable=self.ram_var)
         self.ram_menu.grid(row=5, column=0, padx=20, pady=5)
 
@@ -311,7 +327,14 @@ class KubeControlGUI(ctk.CTk):
         ctk.CTkButton(tools_frame, text="📦 Instalar/Actualizar", command=self.action_install, **btn_cfg).pack(pady=3)
         ctk.CTkButton(tools_frame, text="⚙️ Configuración", command=self.action_config, **btn_cfg).pack(pady=3)
         ctk.CTkButton(tools_frame, text="⚡ Optimizar", fg_color="orange", command=self.action_optimize, **btn_cfg).pack(pady=3)
+        ctk.CTkButton(tools_frame, text="↩️ Deshacer Config", command=self.action_config_rollback, **btn_cfg).pack(pady=3)
+        ctk.CTkButton(tools_frame, text="🕘 Historial Config", command=self.action_config_history, **btn_cfg).pack(pady=3)
+        ctk.CTkButton(tools_frame, text="⏪ Build Anterior", command=self.action_jar_rollback, **btn_cfg).pack(pady=3)
         ctk.CTkButton(tools_frame, text="🔗 Geyser/Floodgate", command=self.action_geyser, **btn_cfg).pack(pady=3)
+        ctk.CTkButton(tools_frame, text="🧵 Hilos JVM", command=self.action_thread_report, **btn_cfg).pack(pady=3)
+        ctk.CTkButton(tools_frame, text="♻️ Análisis GC", command=self.action_gc_report, **btn_cfg).pack(pady=3)
+        ctk.CTkButton(tools_frame, text="⏱ Arranque", command=self.action_startup_report, **btn_cfg).pack(pady=3)
+        ctk.CTkButton(tools_frame, text="💽 Test de Disco", command=self.action_storage_benchmark, **btn_cfg).pack(pady=3)
         
         ctk.CTkLabel(tools_frame, text="───── Túnel ─────", text_color="gray").pack(pady=5)
         ctk.CTkButton(tools_frame, text="♻️ Reinstalar Túnel", fg_color="gray", command=self.action_reset_tunnel, **btn_cfg).pack(pady=3)
@@ -419,6 +442,10 @@ class KubeControlGUI(ctk.CTk):
                     tps = stats.get("tps", 20.0)
                     ram_used = stats.get("ram_used", 0)
                     ram_max = stats.get("ram_max", 0)
+
+                    if self.distance_tuner:
+                        self.distance_tuner.record_tps(tps)
+                        self._evaluate_distance_tuner()
                     
                     # TPS Color coding
                     if tps >= 19:
@@ -483,6 +510,18 @@ class KubeControlGUI(ctk.CTk):
             balance = data.get("balance", "$0")
             self.player_tree.insert("", "end", values=(name, rank, ping, discord, balance))
 
+    def _evaluate_distance_tuner(self):
+        """Close the tuner window when due; apply live if a command is configured."""
+        decision = self.distance_tuner.evaluate()
+        if not decision:
+            return
+        self.log_system(f"Tuner de distancias: {decision.describe()}")
+        commands = self.distance_tuner.live_commands()
+        for cmd in commands:
+            asyncio.run_coroutine_threadsafe(self.server_controller.write(cmd), self.loop)
+        if not commands:
+            self.log_system("Se aplicará en el próximo reinicio del servidor.")
+
     def _set_stopped_state(self):
         self.status_label.configure(text="● DETENIDO", text_color="red")
         self.btn_start.configure(state="normal")
@@ -494,6 +533,21 @@ class KubeControlGUI(ctk.CTk):
         self.lbl_tps.configure(text="⚡ TPS: --", text_color="gray")
         self.lbl_uptime.configure(text="⏱️ Uptime: --")
 
+    def _refine_memory_defaults(self):
+        """Full memory sampling (~1s) off the UI thread: diagnostics and the default RAM."""
+        lines = get_diagnostics()
+        ram = get_default_ram()
+
+        def apply():
+            for line in lines:
+                self.log_system(line.replace("[bold orange]", "").replace("[/bold orange]", "")
+                                .replace("[dim]", "").replace("[/dim]", ""))
+            # Only if the user has not picked another value and no server is starting
+            if self.ram_var.get() == self._quick_ram and not self.is_starting and not self.server_controller:
+                self.ram_var.set(ram)
+
+        self.after(0, apply)
+
     # ========== ACTIONS ==========
     def action_start(self):
         """Start the Minecraft server."""
@@ -513,16 +567,61 @@ class KubeControlGUI(ctk.CTk):
         ram = self.ram_var.get()
         self.log_console(f"Iniciando servidor con {ram} de RAM...")
         
-        # Create server controller (en modo Pi: SerialGC + límites de metaspace)
-        self.server_controller = ServerController(self.current_jar, java_args=get_java_args(ram))
-        
+        # Create server controller (en modo Pi: SerialGC + límites de metaspace;
+        # con --gc-log las pausas de la ejecución anterior deciden el colector)
+        gc_log_path = self.gc_log_path if gc_log.enabled() else None
+        previous_gc = gc_log.GCStats.from_file(gc_log_path) if gc_log_path else None
+        self.server_controller = ServerController(self.current_jar,
+                                                  java_args=get_java_args(ram, gc_stats=previous_gc,
+                                                                          server_dir=self.server_dir),
+                                                  gc_log=gc_log_path)
+        
+        # Distancias decididas por el tuner durante la ejecución anterior
+        self.distance_tuner = DistanceTuner(self.server_dir)
+        applied = self.distance_tuner.apply_pending()
+        if applied:
+            self.log_console(f"Tuner de distancias: {applied.describe()}")
+
+        # Per-plugin startup timing, fed from the console output once the
+        # server process is actually launched (see start_async)
+        self.startup_profiler = None
+
         # Set callback to redirect output to console
         def on_server_output(msg):
+            self.distance_tuner.feed_log(msg)
+            if self.startup_profiler:
+                profile = self.startup_profiler.feed(msg)
+                if profile:
+                    self.startup_profiler = None
+                    startup_profile.record(self.server_dir, profile)
+                    self.after(0, lambda: self.log_system(f"⏱ {profile.describe()}"))
             self.after(0, lambda: self.log_console(msg))
         self.server_controller.set_callback(on_server_output)
         
         # Start in background thread
         def start_async():
+            # Swap in a staged build (release manifest, see releases). promote
+            # waits for a running Paperclip patch instead of booting the old build
+            if paperclip.is_busy(self.server_dir):
+                self.after(0, lambda: self.log_console("Esperando al pre-parcheo de Paperclip..."))
+            promoted = releases.promote(self.server_dir)
+            if promoted:
+                self.current_jar = self.jar_manager.get_current_jar() or self.current_jar
+                self.server_controller.jar_path = self.current_jar
+                self.after(0, lambda: self.log_console(f"Build activo: {promoted}"))
+            # Never race a background Paperclip patch in the same directory
+            paperclip.wait_idle(self.server_dir)
+            # Paper/Folia thread pools sized from the detected CPU topology
+            folia = os.path.basename(self.current_jar).lower().startswith("folia-")
+            for change in cpu_topology.apply_thread_config(self.server_dir, folia=folia):
+                self.after(0, lambda c=change: self.log_console(f"Hilos: {c}"))
+            # Duplicate / broken plugins cost startup time: warn before every start
+            plugin_report = ServerSanitizer(self.server_dir).analyze_plugins()
+            if plugin_report.findings:
+                for line in plugin_report.lines():
+                    self.after(0, lambda l=line: self.log_console(f"🧩 {l}"))
+            # Started here so the waits above don't count as server time
+            self.startup_profiler = startup_profile.StartupProfiler(self.current_jar)
             future = asyncio.run_coroutine_threadsafe(self.server_controller.start(), self.loop)
             try:
                 future.result(timeout=15)  # Wait up to 15s for startup (increased)
@@ -610,7 +709,13 @@ class KubeControlGUI(ctk.CTk):
                 try:
                     jar_path = self.jar_manager.download_jar(stype, version)
                     self.after(0, lambda: self.log_system(f"✅ JAR descargado: {os.path.basename(jar_path)}"))
-                    self.current_jar = jar_path
+                    # Staged: swapped in at the next start, once Paperclip has pre-patched it
+                    self.after(0, lambda: self.log_system("Pre-parcheando Paperclip en segundo plano..."))
+                    rel = releases.stage(
+                        jar_path, callback=lambda r: self.after(0, lambda: self.log_system(r.describe())))
+                    self.current_jar = self.jar_manager.get_current_jar()
+                    if rel.active and rel.active != os.path.basename(jar_path):
+                        self.after(0, lambda: self.log_system("El build nuevo se activará en el próximo arranque."))
                 except Exception as e:
                     self.after(0, lambda: self.log_system(f"❌ ERROR: {e}"))
             
@@ -809,15 +914,154 @@ class KubeControlGUI(ctk.CTk):
         ctk.CTkButton(main_frame, text="Guardar", fg_color="green", command=save_config).pack(pady=15)
 
     def action_optimize(self):
-        """Apply optimization settings to server."""
-        preset = get_optimization_preset()
-        self.log_system(f"Aplicando perfil de optimización: {preset}...")
-        changes = (ConfigManager.apply_pi_optimization(self.server_dir)
-                   if preset == "pi"
-                   else ConfigManager.apply_aggressive_optimization(self.server_dir))
-        for change in changes:
-            self.log_system(f"  • {change}")
-        self.log_system("Optimización completada. Reinicia el servidor para aplicar.")
+        """Preview the hardware-matched preset from the catalogue and apply it on confirm."""
+        try:
+            plan = preset_catalog.preview(self.server_dir)
+        except Exception as e:
+            self.log_system(f"Error preparando preset: {e}")
+            return
+
+        dialog = ctk.CTkToplevel(self)
+        dialog.title(f"Preset: {plan.preset.title}")
+        dialog.geometry("700x520")
+        dialog.transient(self)
+        dialog.after(100, dialog.lift)
+        dialog.after(100, dialog.focus_force)
+
+        main_frame = ctk.CTkFrame(dialog, fg_color="transparent")
+        main_frame.pack(fill="both", expand=True, padx=15, pady=15)
+        ctk.CTkLabel(main_frame, text=f"⚡ {plan.preset.title}",
+                     font=ctk.CTkFont(size=16, weight="bold")).pack(pady=(0, 5))
+        ctk.CTkLabel(main_frame, text=plan.preset.description, text_color="gray",
+                     wraplength=640).pack(pady=(0, 10))
+
+        preview = ctk.CTkTextbox(main_frame, font=("Consolas", 11), wrap="none")
+        preview.pack(fill="both", expand=True)
+        lines = plan.summary()
+        for fp in plan.files:
+            lines += [""] + fp.diff()
+        preview.insert("end", "\n".join(lines))
+        preview.configure(state="disabled")
+
+        def apply_preset():
+            dialog.destroy()
+            try:
+                preset_catalog.apply_plan(self.server_dir, plan)
+            except (OSError, ValueError) as e:
+                self.log_system(f"Error aplicando el preset: {e}")
+                return
+            for line in plan.summary()[1:]:
+                self.log_system(f"  • {line}")
+            self.log_system("Snapshot previo guardado (↩️ Deshacer Config). Reinicia el servidor para aplicar.")
+
+        buttons = ctk.CTkFrame(main_frame, fg_color="transparent")
+        buttons.pack(pady=10)
+        ctk.CTkButton(buttons, text="Aplicar", fg_color="green", command=apply_preset,
+                      state="normal" if plan.files else "disabled").pack(side="left", padx=5)
+        ctk.CTkButton(buttons, text="Cancelar", fg_color="gray", command=dialog.destroy).pack(side="left", padx=5)
+
+    def action_config_rollback(self):
+        """Restore the latest config_history snapshot."""
+        try:
+            restored = config_history.rollback(self.server_dir)
+        except Exception as e:
+            self.log_system(f"Error restaurando configuración: {e}")
+            return
+        if not restored:
+            self.log_system("No hay cambios de configuración que deshacer.")
+            return
+        self.log_system(f"Restaurado: {', '.join(restored)}. Reinicia el servidor para aplicar.")
+
+    def action_jar_rollback(self):
+        """Switch back to the previous server build (takes effect on the next start)."""
+        try:
+            target = releases.rollback(self.server_dir)
+        except ValueError as e:
+            self.log_system(str(e))
+            return
+        if not target:
+            self.log_system("No hay builds anteriores guardados.")
+            return
+        self.current_jar = self.jar_manager.get_current_jar()
+        self.log_system(f"Build activo: {target}. Reinicia el servidor para aplicar.")
+
+    def action_config_history(self):
+        """List recent config snapshots and diff the latest one against the current files."""
+        snapshots = config_history.list_snapshots(self.server_dir)
+        if not snapshots:
+            self.log_system("El historial de configuración está vacío.")
+            return
+        self.log_system(f"🕘 Historial de configuración ({len(snapshots)} snapshots):")
+        for snap in reversed(snapshots[-10:]):
+            self.log_system(f"  {snap.describe()}")
+        target = config_history.rollback_target(self.server_dir)
+        if target:
+            # Lo que desharía "Deshacer Config"
+            for line in config_history.diff(self.server_dir, target.id):
+                self.log_system(line)
+
+    def action_thread_report(self):
+        """Show the top-N JVM threads by CPU (two /proc samples 1s apart)."""
+        if not (self.server_controller and self.server_controller.process
+                and self.server_controller.process.returncode is None):
+            self.log_system("El servidor no está en ejecución.")
+            return
+        pid = self.server_controller.process.pid
+        if not self.thread_profiler or self.thread_profiler.pid != pid:
+            self.thread_profiler = ThreadProfiler(pid)
+
+        def sample_task():
+            profiler = self.thread_profiler
+            sample = profiler.sample()
+            if sample is None:
+                time.sleep(1.0)
+                sample = profiler.sample()
+            for line in ["🧵 CPU por hilo de la JVM:"] + format_report(sample):
+                self.after(0, lambda l=line: self.log_system(l))
+
+        threading.Thread(target=sample_task, daemon=True).start()
+
+    def action_gc_report(self):
+        """Summarize GC pauses from the unified GC log and suggest heap/collector."""
+        ram = self.ram_var.get().upper()
+        ram_mb = int(ram[:-1]) * 1024 if ram.endswith("G") else int(ram.rstrip("M"))
+
+        def report_task():
+            stats = gc_log.GCStats.from_file(self.gc_log_path)
+            for line in ["♻️ Análisis de GC:"] + gc_log.format_report(stats, ram_mb):
+                self.after(0, lambda l=line: self.log_system(l))
+
+        threading.Thread(target=report_task, daemon=True).start()
+
+    def action_startup_report(self):
+        """Rank startup time by plugin and phase against previous starts."""
+        def report_task():
+            runs = startup_profile.load_history(self.server_dir)
+            if not runs:
+                # Never started from the app: parse the server's last log
+                profile = startup_profile.from_log(os.path.join(self.server_dir, "logs", "latest.log"))
+                runs = [profile] if profile else []
+            for line in ["⏱ Tiempo de arranque:"] + startup_profile.format_report(runs):
+                self.after(0, lambda l=line: self.log_system(l))
+
+        threading.Thread(target=report_task, daemon=True).start()
+
+    def action_storage_benchmark(self):
+        """Benchmark the server_bin filesystem and cache its storage class."""
+        if not os.path.isdir(self.server_dir):
+            self.log_system("No existe la carpeta del servidor todavía.")
+            return
+        self.log_system("💽 Midiendo almacenamiento (unos segundos)...")
+
+        def bench_task():
+            try:
+                profile = storage_bench.get_storage_profile(self.server_dir, refresh=True)
+            except OSError as e:
+                self.after(0, lambda msg=str(e): self.log_system(f"Error en test de disco: {msg}"))
+                return
+            self.after(0, lambda: self.log_system(profile.describe()))
+
+        threading.Thread(target=bench_task, daemon=True).start()
 
     def action_geyser(self):
         """Show Geyser/Floodgate installation dialog."""
@@ -850,15 +1094,19 @@ class KubeControlGUI(ctk.CTk):
             
             def install_task():
                 try:
-                    if install_geyser.get():
-                        self.after(0, lambda: self.log_system("Descargando Geyser-Spigot.jar..."))
-                        path = self.plugin_manager.download_geyser()
-                        self.after(0, lambda: self.log_system(f"Geyser instalado: {os.path.basename(path)}"))
-                    
-                    if install_floodgate.get():
-                        self.after(0, lambda: self.log_system("Descargando Floodgate-Spigot.jar..."))
-                        path = self.plugin_manager.download_floodgate()
-                        self.after(0, lambda: self.log_system(f"Floodgate instalado: {os.path.basename(path)}"))
+                    selected = [name for name, var in (("geyser", install_geyser), ("floodgate", install_floodgate))
+                                if var.get()]
+                    if not selected:
+                        return
+                    self.after(0, lambda: self.log_system(f"Descargando {', '.join(selected)}..."))
+                    # Remote info fetched concurrently, jars downloaded in parallel
+                    results = self.plugin_manager.install_plugins(selected)
+                    for name, result in results.items():
+                        if isinstance(result, Exception):
+                            self.after(0, lambda n=name, r=result: self.log_system(f"Error instalando {n}: {r}"))
+                        else:
+                            self.after(0, lambda n=name, r=result: self.log_system(
+                                f"{n.capitalize()} instalado: {os.path.basename(r)}"))
                     
                     self.after(0, lambda: self.log_system("Instalación completada. Reinicia el servidor para activar los plugins."))
                 except Exception as e:
@@ -966,14 +1214,14 @@ class KubeControlGUI(ctk.CTk):
         def install_task():
             try:
                 # Check current version
-                remote_info = self.plugin_manager.get_remote_kubecontrol_info()
-                if not remote_info or not remote_info.get("download_url"):
+                remote_info = self.plugin_manager.fetch_remote_info(["kubecontrol"])["kubecontrol"]
+                if isinstance(remote_info, Exception):
                     self.after(0, lambda: self.log_system("❌ No hay releases disponibles de KubeControlPlugin."))
                     self.after(0, lambda: self.log_system("   Crea un tag en GitHub: git tag v1.0.0 && git push origin v1.0.0"))
                     return
                 
-                self.after(0, lambda: self.log_system(f"Descargando KubeControlPlugin {remote_info['version']}..."))
-                path = self.plugin_manager.download_kubecontrol_plugin(force_update=True)
+                self.after(0, lambda: self.log_system(f"Descargando KubeControlPlugin {remote_info.version}..."))
+                path = self.plugin_manager.download_kubecontrol_plugin(force_update=True, remote_info=remote_info)
                 self.after(0, lambda: self.log_system(f"✅ KubeControlPlugin instalado: {os.path.basename(path)}"))
                 self.after(0, lambda: self.log_system("   Reinicia el servidor para activar el plugin."))
             except Exception as e:
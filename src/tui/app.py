@@ -16,13 +16,24 @@ from src.core.server_controller import ServerController
 from src.core.player_manager import PlayerManager
 from src.core.config_manager import ConfigManager
 from src.core.resource_watcher import ResourceWatcher
+from src.core.distance_tuner import DistanceTuner
 from src.core.server_sanitizer import ServerSanitizer
 from src.core.pi_profile import (is_pi_mode, get_ram_options, get_default_ram,
-                                 get_java_args, get_optimization_preset, get_diagnostics)
+                                 get_java_args, get_diagnostics)
 from src.core import clipboard
+from src.core.thread_profiler import format_report
+from src.core import gc_log
+from src.core import storage_bench
+from src.core import preset_catalog
+from src.core import config_history
+from src.core import cpu_topology
+from src.core import paperclip
+from src.core import releases
+from src.core import startup_profile
 from src.tui.screens.install import InstallScreen
 from src.tui.screens.properties_editor import PropertiesEditorScreen
 from src.tui.screens.tunnel_config import TunnelConfigScreen
+from src.tui.screens.preset_preview import PresetPreviewScreen
 
 from src.core.plugin_manager import PluginManager
 from src.core.tunnel_manager import TunnelManager
@@ -42,8 +53,10 @@ class MCSMApp(App):
         # Modo Raspberry Pi: limita RAM, logs y trabajo del UI
         self.pi_mode = is_pi_mode()
         self.ram_options = get_ram_options()
-        self.default_ram = get_default_ram()
+        # Una muestra de memoria: el muestreo completo (~1s) se hace al montar, en un hilo
+        self.default_ram = get_default_ram(quick=True)
         self.sync_interval = 15.0 if self.pi_mode else 10.0
+        self.gc_log_path = os.path.join(self.server_dir, "logs", "gc.log")
         
         self.jar_manager = JarManager(download_dir=self.server_dir)
         self.plugin_manager = PluginManager(plugins_dir=os.path.join(self.server_dir, "plugins"))
@@ -55,6 +68,8 @@ class MCSMApp(App):
         
         self.server_controller = None
         self.resource_watcher = None
+        self.distance_tuner = None
+        self.startup_profiler = None
         self.player_manager = PlayerManager(server_path=self.server_dir)
         self.current_jar = None
         self.current_tunnel_modal = None # Reference to active modal
@@ -136,7 +151,14 @@ class MCSMApp(App):
                         Button("Instalar / Actualizar", id="btn-install", variant="primary", classes="sidebar-btn"),
                         Button("⚙️ Configuración", id="btn-config", variant="default", classes="sidebar-btn"),
                         Button("⚡ Optimizar", id="btn-optimize", variant="warning", classes="sidebar-btn"),
+                        Button("↩️ Deshacer Config", id="btn-config-rollback", variant="default", classes="sidebar-btn"),
+                        Button("🕘 Historial Config", id="btn-config-history", variant="default", classes="sidebar-btn"),
+                        Button("⏪ Build Anterior", id="btn-jar-rollback", variant="default", classes="sidebar-btn"),
                         Button("🔧 Reparar Estructura", id="btn-sanitize", variant="warning", classes="sidebar-btn"),
+                        Button("🧵 Hilos JVM", id="btn-threads", variant="default", classes="sidebar-btn"),
+                        Button("♻️ Análisis GC", id="btn-gc", variant="default", classes="sidebar-btn"),
+                        Button("⏱ Arranque", id="btn-startup", variant="default", classes="sidebar-btn"),
+                        Button("💽 Test de Disco", id="btn-storage", variant="default", classes="sidebar-btn"),
                         Button("Geyser/Floodgate", id="btn-geyser", variant="default", classes="sidebar-btn"),
                         Button("Iniciar Túnel", id="btn-tunnel", variant="default", classes="sidebar-btn"),
                         Button("♻️ Reinstalar Túnel", id="btn-reset-tunnel", variant="error", classes="sidebar-btn"),
@@ -485,23 +507,68 @@ class MCSMApp(App):
         self.log_write("[dim]Escribe 'whitelist off' cuando estés listo.[/dim]")
 
     def optimize_server_config(self):
-        preset = get_optimization_preset()
-        if preset == "pi":
-            self.log_write("[cyan]Aplicando perfil Raspberry Pi (RAM/CPU bajos)...[/cyan]")
-        else:
-            self.log_write("[cyan]Aplicando optimizaciones agresivas (Low-End PC)...[/cyan]")
+        """Elige el preset del catálogo según el hardware y muestra la vista previa."""
         try:
-            changes = (ConfigManager.apply_pi_optimization(self.server_dir)
-                       if preset == "pi"
-                       else ConfigManager.apply_aggressive_optimization(self.server_dir))
-            if changes:
-                for change in changes:
-                    self.log_write(f"[green]✓ {escape(change)}[/green]")
-                self.log_write("[bold yellow]Reinicia el servidor para aplicar cambios.[/bold yellow]")
-            else:
-                self.log_write("[dim]No se aplicaron cambios o archivos no encontrados.[/dim]")
+            plan = preset_catalog.preview(self.server_dir)
+        except Exception as e:
+            self.log_write(f"[red]Error preparando preset: {escape(str(e))}[/red]")
+            return
+        self.log_write(f"[cyan]Preset sugerido: {escape(plan.preset.title)} "
+                       f"({escape(plan.hardware.describe())})[/cyan]")
+
+        def preview_callback(applied):
+            if not applied:
+                self.log_write("[dim]No se aplicaron cambios.[/dim]")
+                return
+            for line in plan.summary()[1:]:
+                self.log_write(f"[green]✓ {escape(line)}[/green]")
+            self.log_write("[dim]Snapshot previo guardado (↩️ Deshacer Config para restaurar).[/dim]")
+            self.log_write("[bold yellow]Reinicia el servidor para aplicar cambios.[/bold yellow]")
+
+        self.push_screen(PresetPreviewScreen(self.server_dir, plan), preview_callback)
+
+    def rollback_config(self):
+        """Restaura el último snapshot del historial de configuración."""
+        try:
+            restored = config_history.rollback(self.server_dir)
         except Exception as e:
-            self.log_write(f"[red]Error optimizando: {escape(str(e))}[/red]")
+            self.log_write(f"[red]Error restaurando configuración: {escape(str(e))}[/red]")
+            return
+        if not restored:
+            self.log_write("[dim]No hay cambios de configuración que deshacer.[/dim]")
+            return
+        self.log_write(f"[green]✓ Restaurado: {escape(', '.join(restored))}[/green]")
+        self.log_write("[bold yellow]Reinicia el servidor para aplicar cambios.[/bold yellow]")
+
+    def rollback_jar(self):
+        """Vuelve al build de servidor anterior (efectivo en el próximo arranque)."""
+        try:
+            target = releases.rollback(self.server_dir)
+        except ValueError as e:
+            self.log_write(f"[yellow]{escape(str(e))}[/yellow]")
+            return
+        if not target:
+            self.log_write("[dim]No hay builds anteriores guardados.[/dim]")
+            return
+        self.current_jar = self.jar_manager.get_current_jar()
+        self.log_write(f"[green]✓ Build activo: {escape(target)}[/green]")
+        self.log_write("[bold yellow]Reinicia el servidor para aplicar cambios.[/bold yellow]")
+
+    def show_config_history(self):
+        """Últimos snapshots de configuración y diff del más reciente contra lo actual."""
+        snapshots = config_history.list_snapshots(self.server_dir)
+        if not snapshots:
+            self.log_write("[dim]El historial de configuración está vacío.[/dim]")
+            return
+        self.log_write(f"[cyan]🕘 Historial de configuración ({len(snapshots)} snapshots):[/cyan]")
+        for snap in reversed(snapshots[-10:]):
+            self.log_write(f"[dim]{escape(snap.describe())}[/dim]")
+        target = config_history.rollback_target(self.server_dir)
+        if target:
+            # Lo que desharía "Deshacer Config"
+            for line in config_history.diff(self.server_dir, target.id):
+                color = "green" if line.startswith("+") else "red" if line.startswith("-") else "dim"
+                self.log_write(f"[{color}]{escape(line)}[/{color}]")
 
     def sanitize_server_structure(self):
         """Run directory sanitization to fix misplaced files."""
@@ -515,27 +582,95 @@ class MCSMApp(App):
                 summary = sanitizer.get_structure_summary()
                 self.log_write(f"[dim]JAR: {escape(str(summary.get('server_jar', 'No encontrado')))}[/dim]")
                 self.log_write(f"[dim]Plugins: {escape(str(summary.get('plugins_count', 0)))}[/dim]")
-                return
-            
-            self.log_write(f"[yellow]⚠ Encontrados {len(report.issues)} problema(s):[/yellow]")
-            for issue in report.issues:
-                self.log_write(f"[dim]  - {escape(issue.issue_type)}: {escape(os.path.basename(issue.file_path))}[/dim]")
-            
-            # Perform sanitization
-            result = sanitizer.sanitize(dry_run=False)
-            
-            if result.success:
-                self.log_write(f"[green]✓ Reparación completada: {len(result.moved_files)} archivo(s) movidos.[/green]")
-                for moved in result.moved_files:
-                    self.log_write(f"[dim]  Movido: {escape(os.path.basename(moved['from']))} → plugins/[/dim]")
             else:
-                self.log_write(f"[red]Errores durante reparación:[/red]")
-                for error in result.errors:
-                    self.log_write(f"[red]  {escape(str(error))}[/red]")
+                self.log_write(f"[yellow]⚠ Encontrados {len(report.issues)} problema(s):[/yellow]")
+                for issue in report.issues:
+                    self.log_write(f"[dim]  - {escape(issue.issue_type)}: {escape(os.path.basename(issue.file_path))}[/dim]")
+                
+                # Perform sanitization
+                result = sanitizer.sanitize(dry_run=False)
+                
+                if result.success:
+                    self.log_write(f"[green]✓ Reparación completada: {len(result.moved_files)} archivo(s) movidos.[/green]")
+                    for moved in result.moved_files:
+                        self.log_write(f"[dim]  Movido: {escape(os.path.basename(moved['from']))} → plugins/[/dim]")
+                else:
+                    self.log_write(f"[red]Errores durante reparación:[/red]")
+                    for error in result.errors:
+                        self.log_write(f"[red]  {escape(str(error))}[/red]")
+            
+            # Duplicates, missing dependencies, cycles... (after moving stray jars into plugins/)
+            self.log_plugin_report(sanitizer.analyze_plugins(), verbose=True)
                     
         except Exception as e:
             self.log_write(f"[red]Error en sanitización: {escape(str(e))}[/red]")
 
+    def log_plugin_report(self, report, verbose: bool = False):
+        """Análisis de dependencias de plugins (solo si hay algo que corregir, salvo con `verbose`)."""
+        if not report.findings and not verbose:
+            return
+        color = "red" if report.errors else ("yellow" if report.findings else "green")
+        lines = report.lines()
+        self.log_write(f"[{color}]🧩 Plugins: {escape(lines[0])}[/{color}]")
+        for line in lines[1:]:
+            self.log_write(f"[dim]  {escape(line)}[/dim]")
+
+    def show_thread_report(self):
+        """Muestra el top-N de hilos de la JVM por uso de CPU (último muestreo del watcher)."""
+        if not self.resource_watcher or not self.resource_watcher.running:
+            self.log_write("[yellow]El servidor no está en ejecución.[/yellow]")
+            return
+        self.log_write("[cyan]🧵 CPU por hilo de la JVM:[/cyan]")
+        for line in format_report(self.resource_watcher.thread_sample):
+            self.log_write(f"[dim]{escape(line)}[/dim]")
+
+    def show_gc_report(self):
+        """Resumen de pausas de GC y recomendaciones de heap/colector."""
+        stats = self.resource_watcher.gc_stats if self.resource_watcher else None
+        if stats is None or not stats.pauses:
+            # Sin servidor activo: analiza el log de la ejecución anterior
+            stats = gc_log.GCStats.from_file(self.gc_log_path)
+        ram_mb = self._selected_ram_mb()
+        self.log_write("[cyan]♻️ Análisis de GC:[/cyan]")
+        for line in gc_log.format_report(stats, ram_mb):
+            self.log_write(f"[dim]{escape(line)}[/dim]")
+
+    def show_startup_report(self):
+        """Tiempo de arranque por plugin y fase, comparado con los arranques anteriores."""
+        runs = startup_profile.load_history(self.server_dir)
+        if not runs:
+            # Nunca se arrancó desde la app: analiza el último log del servidor
+            profile = startup_profile.from_log(os.path.join(self.server_dir, "logs", "latest.log"))
+            runs = [profile] if profile else []
+        self.log_write("[cyan]⏱ Tiempo de arranque:[/cyan]")
+        for line in startup_profile.format_report(runs):
+            self.log_write(f"[dim]{escape(line)}[/dim]")
+
+    def run_storage_benchmark(self):
+        """Mide el almacenamiento de server_bin y guarda la clase en .kcmc/storage.json."""
+        if not os.path.isdir(self.server_dir):
+            self.log_write("[yellow]No existe la carpeta del servidor todavía.[/yellow]")
+            return
+        self.log_write("[cyan]💽 Midiendo almacenamiento (unos segundos)...[/cyan]")
+
+        def do_work():
+            try:
+                profile = storage_bench.get_storage_profile(self.server_dir, refresh=True)
+            except OSError as e:
+                self.call_from_thread(self.log_write, f"[red]Error en test de disco: {escape(str(e))}[/red]")
+                return
+            self.call_from_thread(self.log_write, f"[dim]{escape(profile.describe())}[/dim]")
+            if profile.is_slow:
+                self.call_from_thread(self.log_write, "[yellow]Almacenamiento lento: la optimización desactivará sync-chunk-writes.[/yellow]")
+            else:
+                self.call_from_thread(self.log_write, "[green]Almacenamiento rápido: se mantiene sync-chunk-writes=true.[/green]")
+
+        self.run_worker(do_work, thread=True)
+
+    def _selected_ram_mb(self) -> int:
+        value = str(self.query_one("#ram-select").value or self.default_ram).upper()
+        return int(value[:-1]) * 1024 if value.endswith("G") else int(value.rstrip("M"))
+
     def open_properties_editor(self):
         """Opens the properties editor modal."""
         if not os.path.exists(os.path.join(self.server_dir, "server.properties")):
@@ -572,8 +707,22 @@ class MCSMApp(App):
             self.reset_tunnel_config()
         elif btn_id == "btn-optimize":
             self.optimize_server_config()
+        elif btn_id == "btn-config-rollback":
+            self.rollback_config()
+        elif btn_id == "btn-config-history":
+            self.show_config_history()
+        elif btn_id == "btn-jar-rollback":
+            self.rollback_jar()
         elif btn_id == "btn-sanitize":
             self.sanitize_server_structure()
+        elif btn_id == "btn-threads":
+            self.show_thread_report()
+        elif btn_id == "btn-gc":
+            self.show_gc_report()
+        elif btn_id == "btn-startup":
+            self.show_startup_report()
+        elif btn_id == "btn-storage":
+            self.run_storage_benchmark()
         elif btn_id == "btn-open-root": # Added button handler
             self.open_folder(self.server_dir)
         elif btn_id == "btn-open-plugins": # Added button handler
@@ -652,6 +801,15 @@ class MCSMApp(App):
             if not self.pi_mode:
                 ReprHighlighter().highlight(text_obj)
             log.write(text_obj)
+
+            if self.distance_tuner:
+                self.distance_tuner.feed_log(message)
+            if self.startup_profiler:
+                profile = self.startup_profiler.feed(message)
+                if profile:
+                    self.startup_profiler = None
+                    startup_profile.record(self.server_dir, profile)
+                    self.log_write(f"[cyan]⏱ {escape(profile.describe())}[/cyan]")
             
             # Parse for Players
             if self.player_manager:
@@ -702,9 +860,7 @@ class MCSMApp(App):
         self.log_write("[bold green]Bienvenido a KubeControlMC[/]")
         self.log_write("[italic]Gestor de Servidores Minecraft Avanzado[/italic]")
         if self.pi_mode:
-            for line in get_diagnostics():
-                self.log_write(line)
-            self.log_write("[dim]El servidor usará SerialGC y el preset de optimización Pi[/dim]")
+            self.run_worker(self._refine_memory_defaults, thread=True)
         
         # Init Player Table
         try:
@@ -717,15 +873,32 @@ class MCSMApp(App):
             
         self.check_installation()
 
+    def _refine_memory_defaults(self):
+        """Muestreo completo de memoria (~1s) fuera del hilo de la UI: diagnóstico y RAM por defecto."""
+        lines = get_diagnostics()
+        ram = get_default_ram()
+
+        def apply():
+            for line in lines:
+                self.log_write(line)
+            self.log_write("[dim]El servidor usará SerialGC y el preset de optimización Pi[/dim]")
+            ram_select = self.query_one("#ram-select")
+            # Solo si el usuario no eligió otro valor ni hay un servidor arrancado
+            if ram != self.default_ram and ram_select.value == self.default_ram and not ram_select.disabled:
+                ram_select.value = ram
+            self.default_ram = ram
+
+        self.call_from_thread(apply)
+
     def check_installation(self):
         # Simple check: look for any .jar in server_bin
         if not os.path.exists(self.server_dir):
             os.makedirs(self.server_dir)
             
-        jars = [f for f in os.listdir(self.server_dir) if f.endswith(".jar")]
-        if jars:
-            self.current_jar = os.path.join(self.server_dir, jars[0])
-            self.log_write(f"[blue]Detectado JAR:[/blue] {escape(jars[0])}")
+        jar = self.jar_manager.get_current_jar()
+        if jar:
+            self.current_jar = jar
+            self.log_write(f"[blue]Detectado JAR:[/blue] {escape(os.path.basename(jar))}")
             self.query_one("#btn-start").disabled = False
             self.query_one("#btn-install").label = "Actualizar/Cambiar"
             self.query_one("#status-label").update("Estado: LISTO PARA INICIAR")
@@ -758,44 +931,51 @@ class MCSMApp(App):
         self.log_write(f"[cyan]Iniciando descarga de {escape(project)}...[/cyan]")
         self.project_type = project
         
-        # Run in a thread - pass a lambda to ensure method is called correctly
-        def do_work():
-            return self._do_install_sync()
-        
-        self.run_worker(do_work, exclusive=True, thread=True)
+        # Async worker on the app's event loop: network I/O goes through
+        # http_client's asyncio pool, no thread needed
+        self.run_worker(self._do_install(), exclusive=True)
 
-    def _do_install_sync(self):
-        """Synchronous installation worker (runs in thread)."""
-        self.call_from_thread(self.log_write, "[dim]Worker iniciado...[/dim]")
+    async def _do_install(self):
+        """Installation worker (runs on the event loop)."""
+        self.log_write("[dim]Worker iniciado...[/dim]")
         try:
             project = self.project_type
-            self.call_from_thread(self.log_write, f"[dim]Buscando versiones para: {project}[/dim]")
+            self.log_write(f"[dim]Buscando versiones para: {project}[/dim]")
             
-            version = self.jar_manager.get_latest_version(project)
+            version = await self.jar_manager.get_latest_version_async(project)
             if not version:
                 raise Exception(f"No se encontraron versiones para '{project}'")
             
-            self.call_from_thread(self.log_write, f"Versión más reciente: {version}")
+            self.log_write(f"Versión más reciente: {version}")
             
-            self.call_from_thread(self.log_write, "[dim]Iniciando descarga...[/dim]")
-            path = self.jar_manager.download_jar(project, version)
+            self.log_write("[dim]Iniciando descarga...[/dim]")
+            path = await self.jar_manager.download_jar_async(project, version)
             
-            self.current_jar = path
-            self.call_from_thread(self.log_write, f"[green]Descarga completada:[/green] {path}")
+            self.log_write(f"[green]Descarga completada:[/green] {path}")
+            # Staged: swapped in at the next start, once Paperclip has pre-patched it
+            rel = releases.stage(path, callback=self._on_prepatched)
+            self.current_jar = self.jar_manager.get_current_jar()
+            if rel.active and rel.active != os.path.basename(path):
+                self.log_write("[cyan]El build nuevo se activará en el próximo arranque.[/cyan]")
             
             # Ensure EULA
-            self.call_from_thread(self.log_write, "[dim]Configurando EULA...[/dim]")
+            self.log_write("[dim]Configurando EULA...[/dim]")
             ConfigManager.ensure_eula(self.server_dir)
-            self.call_from_thread(self.log_write, "EULA aceptado automáticamente.")
+            self.log_write("EULA aceptado automáticamente.")
+            self.log_write("[dim]Pre-parcheando Paperclip en segundo plano...[/dim]")
             
             return True  # Signal success
             
         except Exception as e:
             import traceback
-            self.call_from_thread(self.log_write, f"[bold red]Error en instalación:[/bold red] {escape(str(e))}")
-            self.call_from_thread(self.log_write, f"[dim]{escape(traceback.format_exc())}[/dim]")
+            self.log_write(f"[bold red]Error en instalación:[/bold red] {escape(str(e))}")
+            self.log_write(f"[dim]{escape(traceback.format_exc())}[/dim]")
             return False
 
+    def _on_prepatched(self, result: "paperclip.PatchResult") -> None:
+        color = "green" if result.ok else "yellow"
+        self.log_write_safe(f"[{color}]{escape(result.describe())}[/{color}]")
+
     def on_worker_state_changed(self, event: Worker.StateChanged) -> None:
         if event.state == WorkerState.SUCCESS:
             if self.current_jar:
@@ -807,10 +987,13 @@ class MCSMApp(App):
         self.log_write("[cyan]Instalando Geyser y Floodgate...[/cyan]")
         def _do_install():
             try:
-                g = self.plugin_manager.download_geyser()
-                f = self.plugin_manager.download_floodgate()
-                self.log_write_safe(f"[green]Instalado:[/green] {escape(os.path.basename(g))}")
-                self.log_write_safe(f"[green]Instalado:[/green] {escape(os.path.basename(f))}")
+                # Both APIs queried at once, both jars downloaded in parallel
+                results = self.plugin_manager.install_plugins(["geyser", "floodgate"])
+                for result in results.values():
+                    if isinstance(result, Exception):
+                        self.log_write_safe(f"[red]Error instalando plugins: {escape(str(result))}[/red]")
+                    else:
+                        self.log_write_safe(f"[green]Instalado:[/green] {escape(os.path.basename(result))}")
                 self.log_write_safe("[bold]Reinicia el servidor para aplicar cambios.[/bold]")
             except Exception as e:
                 self.log_write_safe(f"[red]Error instalando plugins: {escape(str(e))}[/red]")
@@ -871,6 +1054,15 @@ class MCSMApp(App):
         if not self.current_jar:
             return
 
+        # Swap in a staged build (release manifest, see releases). promote
+        # waits for a running Paperclip patch instead of booting the old build
+        if paperclip.is_busy(self.server_dir):
+            self.log_write("[dim]Esperando al pre-parcheo de Paperclip...[/dim]")
+        promoted = await asyncio.to_thread(releases.promote, self.server_dir)
+        self.current_jar = self.jar_manager.get_current_jar() or self.current_jar
+        if promoted:
+            self.log_write(f"[cyan]Build activo: {escape(promoted)}[/cyan]")
+
         self.query_one("#btn-start").disabled = True
         self.query_one("#btn-install").disabled = True
         self.query_one("#btn-stop").disabled = False
@@ -889,17 +1081,45 @@ class MCSMApp(App):
             
         self.query_one("#status-label").update(f"Estado: EJECUTANDO ({ram_val} RAM)")
 
-        # Prepare arguments (en modo Pi: SerialGC + límites de metaspace)
-        java_args = get_java_args(ram_val)
+        # Prepare arguments (en modo Pi: SerialGC + límites de metaspace).
+        # Con --gc-log las pausas de la ejecución anterior deciden el colector.
+        gc_log_path = self.gc_log_path if gc_log.enabled() else None
+        previous_gc = gc_log.GCStats.from_file(gc_log_path) if gc_log_path else None
+        java_args = get_java_args(ram_val, gc_stats=previous_gc, server_dir=self.server_dir)
         self.log_write(f"[dim]Iniciando servidor con memoria: {ram_val}[/dim]") # System log
+        if previous_gc:
+            for rec in previous_gc.recommendations(self._selected_ram_mb()):
+                self.log_write(f"[dim]GC (ejecución anterior): {escape(rec)}[/dim]")
+
+        # Distancias decididas por el tuner durante la ejecución anterior
+        self.distance_tuner = DistanceTuner(self.server_dir)
+        applied = self.distance_tuner.apply_pending()
+        if applied:
+            self.log_write(f"[cyan]Tuner de distancias: {escape(applied.describe())}[/cyan]")
+
+        # Hilos de Paper/Folia según la topología de CPU
+        folia = os.path.basename(self.current_jar).lower().startswith("folia-")
+        for change in cpu_topology.apply_thread_config(self.server_dir, folia=folia):
+            self.log_write(f"[dim]Hilos: {escape(change)}[/dim]")
         
+        # Never race a background Paperclip patch in the same directory
+        await asyncio.to_thread(paperclip.wait_idle, self.server_dir)
+
+        # Duplicate / broken plugins cost startup time: warn before every start
+        self.log_plugin_report(await asyncio.to_thread(ServerSanitizer(self.server_dir).analyze_plugins))
+
+        # Per-plugin startup timing, fed from the console output
+        self.startup_profiler = startup_profile.StartupProfiler(self.current_jar)
+
         # Initialize Controller
-        self.server_controller = ServerController(self.current_jar, java_args=java_args)
+        self.server_controller = ServerController(self.current_jar, java_args=java_args,
+                                                  gc_log=gc_log_path)
         # Redirect Server Output to Console Tab
         self.server_controller.set_callback(self.log_server)
         
         # Resource Watcher - Write stats to System Log
-        self.resource_watcher = ResourceWatcher(self.log_write)
+        self.resource_watcher = ResourceWatcher(self.log_write, gc_log_path=gc_log_path,
+                                                heap_mb=self._selected_ram_mb(), server_dir=self.server_dir)
         
         # Switch to Console Tab automatically? Optional
         # self.query_one(TabbedContent).active = "tab-console" 
@@ -912,6 +1132,18 @@ class MCSMApp(App):
         # Start Sync Timer (cada 10s en escritorio, 15s en Pi para reducir CPU)
         self.set_interval(self.sync_interval, self.sync_player_list)
 
+    async def _evaluate_distance_tuner(self):
+        """Cierra la ventana del tuner si toca; aplica en caliente si hay comando configurado."""
+        decision = self.distance_tuner.evaluate()
+        if not decision:
+            return
+        self.log_write(f"[cyan]Tuner de distancias: {escape(decision.describe())}[/cyan]")
+        commands = self.distance_tuner.live_commands()
+        for cmd in commands:
+            await self.server_controller.write(cmd)
+        if not commands:
+            self.log_write("[dim]Se aplicará en el próximo reinicio del servidor.[/dim]")
+
     async def sync_player_list(self):
         """Syncs server state (JSON + Command)."""
         if self.server_controller and self.server_controller.process:
@@ -919,6 +1151,11 @@ class MCSMApp(App):
             stats = self.player_manager.sync_with_json()
             if stats:
                 tps = stats.get("tps", 20.0)
+                if self.resource_watcher:
+                    self.resource_watcher.record_tps(tps)
+                if self.distance_tuner:
+                    self.distance_tuner.record_tps(tps)
+                    await self._evaluate_distance_tuner()
                 # Update status label with TPS if running
                 try:
                      status_lbl = self.query_one("#status-label")
@@ -0,0 +1,86 @@
+from textual.screen import ModalScreen
+from textual.widgets import Button, RichLog, Label
+from textual.containers import Horizontal, Container
+from textual.app import ComposeResult
+from rich.markup import escape
+
+from src.core import preset_catalog
+
+
+class PresetPreviewScreen(ModalScreen):
+    """Vista previa de un preset del catálogo: cambios y diff antes de aplicar.
+
+    Devuelve True si se aplicó (con snapshot previo en config_history), False al cancelar.
+    """
+
+    CSS = """
+    PresetPreviewScreen {
+        align: center middle;
+        background: rgba(0,0,0,0.7);
+    }
+
+    #preset-dialog {
+        width: 85%;
+        height: 85%;
+        background: $surface;
+        border: solid $accent;
+        padding: 1;
+    }
+
+    #preset-log {
+        height: 1fr;
+        border: solid $secondary;
+        margin: 1 0;
+    }
+
+    #preset-actions {
+        align: center middle;
+        height: auto;
+    }
+
+    Button {
+        margin-right: 1;
+    }
+    """
+
+    def __init__(self, server_dir: str, plan: preset_catalog.PresetPlan):
+        super().__init__()
+        self.server_dir = server_dir
+        self.plan = plan
+
+    def compose(self) -> ComposeResult:
+        yield Container(
+            Label(f"[bold]⚡ Preset: {escape(self.plan.preset.title)}[/bold]", id="preset-title"),
+            RichLog(id="preset-log", markup=True, wrap=False),
+            Horizontal(
+                Button("Aplicar", id="btn-preset-apply", variant="success", disabled=not self.plan.files),
+                Button("Cancelar", id="btn-preset-cancel", variant="error"),
+                id="preset-actions"
+            ),
+            id="preset-dialog"
+        )
+
+    def on_mount(self):
+        log = self.query_one("#preset-log", RichLog)
+        log.write(f"[dim]{escape(self.plan.preset.description)}[/dim]")
+        for line in self.plan.summary():
+            log.write(escape(line))
+        for fp in self.plan.files:
+            log.write("")
+            for line in fp.diff():
+                color = "green" if line.startswith("+") else "red" if line.startswith("-") else "dim"
+                log.write(f"[{color}]{escape(line)}[/{color}]")
+
+    def on_button_pressed(self, event: Button.Pressed):
+        if event.button.id == "btn-preset-apply":
+            try:
+                preset_catalog.apply_plan(self.server_dir, self.plan)
+            except (OSError, ValueError) as e:
+                # Configuración de solo lectura o con formato inesperado: se queda abierto
+                self.query_one("#preset-log", RichLog).write(
+                    f"[red]Error aplicando el preset: {escape(str(e))}[/red]")
+                event.button.disabled = True
+                return
+            self.dismiss(True)
+        else:
+            self.dismiss(False)
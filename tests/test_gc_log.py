@@ -0,0 +1,93 @@
+"""Análisis del log de GC unificado (-Xlog:gc*) y elección de colector."""
+
+import os
+
+from src.core import gc_log
+
+SERIAL_LOG = """\
+[0.012s][info][gc,init] Using 4 workers of 4 for evacuation
+[0.013s][info][gc] Using Serial
+[10.000s][info][gc] GC(0) Pause Young (Allocation Failure) 100M->40M(256M) 4.000ms
+[20.000s][info][gc] GC(1) Pause Young (Allocation Failure) 140M->60M(256M) 12.500ms
+[20.100s][info][gc,promotion] GC(2) Promotion failed
+[20.200s][info][gc,promotion] GC(2) promotion failed again
+[30.000s][info][gc] GC(2) Pause Full (Allocation Failure) 250M->200M(256M) 300.000ms
+"""
+
+
+def _stats(text: str) -> gc_log.GCStats:
+    stats = gc_log.GCStats()
+    for line in text.splitlines():
+        stats.feed(line)
+    return stats
+
+
+def _slow_serial(count: int = 6) -> gc_log.GCStats:
+    lines = ["[0.010s][info][gc] Using Serial"]
+    lines += [f"[{i + 1}.000s][info][gc] GC({i}) Pause Young (Allocation Failure) "
+              f"100M->40M(256M) 150.000ms" for i in range(count)]
+    return _stats("\n".join(lines))
+
+
+def test_parses_pauses_and_failures():
+    stats = _stats(SERIAL_LOG)
+    assert stats.collector == "Serial"
+    assert [p.gc_id for p in stats.pauses] == [0, 1, 2]
+    assert stats.pauses[0].before_mb == 100 and stats.pauses[0].after_mb == 40
+    assert stats.full_gcs == 1
+    # Varias líneas del mismo GC cuentan un solo fallo
+    assert stats.promotion_failures == 1
+    assert stats.histogram[0] == 1 and stats.histogram[2] == 1 and stats.histogram[6] == 1
+    assert stats.live_set_mb() == 200
+    # 100 MB asignados en 10 s entre GC(0) y GC(1)
+    assert stats.alloc_rate[0][1] == 10.0
+
+
+def test_collector_from_generation_names_after_rotation():
+    stats = _stats("[500.000s][info][gc] GC(40) Pause Young (Allocation Failure) "
+                   "DefNew: 80M->10M 100M->40M(256M) 5.000ms")
+    assert stats.collector == "Serial"
+    assert _stats("[0.010s][info][gc] Using G1").collector == "G1"
+
+
+def test_only_serial_pauses_ask_for_g1(tmp_path):
+    assert _slow_serial().prefers_g1()
+    g1 = _slow_serial()
+    g1.collector = "G1"
+    assert not g1.prefers_g1()
+    assert not _slow_serial(count=3).prefers_g1()
+
+
+def test_g1_choice_sticks_for_the_same_heap(tmp_path):
+    server_dir = str(tmp_path)
+    assert gc_log.choose_collector(_slow_serial(), 1024, server_dir) == "G1"
+    assert os.path.exists(os.path.join(server_dir, gc_log.CHOICE_FILE))
+    # La ejecución siguiente ya va con G1 y pausas cortas: no vuelve a SerialGC
+    calm = _stats("[0.010s][info][gc] Using G1\n"
+                  "[1.000s][info][gc] GC(0) Pause Young (Normal) (G1 Evacuation Pause) "
+                  "100M->40M(256M) 3.000ms")
+    assert gc_log.choose_collector(calm, 1024, server_dir) == "G1"
+    assert gc_log.choose_collector(calm, 2048, server_dir) is None
+
+
+def test_tailer_handles_partial_lines_and_rotation(tmp_path):
+    path = tmp_path / "gc.log"
+    lines = SERIAL_LOG.splitlines(keepends=True)
+    path.write_text(lines[1] + lines[2][:30])
+    tailer = gc_log.GCLogTailer(str(path))
+    assert tailer.poll() == []
+    with open(path, "a") as f:
+        f.write(lines[2][30:] + lines[3])
+    assert [p.gc_id for p in tailer.poll()] == [0, 1]
+
+    os.rename(path, str(path) + ".0")
+    path.write_text(lines[6])
+    assert [p.gc_id for p in tailer.poll()] == [2]
+
+
+def test_report_explains_disabled_logging(monkeypatch):
+    monkeypatch.delenv(gc_log.GC_LOG_ENV, raising=False)
+    assert "--gc-log" in gc_log.format_report(None, 1024)[0]
+    monkeypatch.setenv(gc_log.GC_LOG_ENV, "1")
+    report = gc_log.format_report(_stats(SERIAL_LOG), 1024)
+    assert report[0] == "Colector: Serial"
@@ -0,0 +1,228 @@
+"""Descargas reanudables (stream único y segmentadas) contra un servidor HTTP local."""
+
+import asyncio
+import hashlib
+import http.server
+import json
+import os
+import re
+import threading
+
+import pytest
+
+from src.core import http_client
+
+SIZE = 1 << 20
+ETAG = '"v1"'
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(dict(self.headers))
+            budget = server.budget
+        if budget is not None and budget <= 0:
+            # "Corte" de red: se cierra sin responder
+            self.close_connection = True
+            return
+        data, etag = server.data, server.etag
+        start, end, status = 0, len(data) - 1, 200
+        match = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range", ""))
+        if match and self.headers.get("If-Range", etag) == etag:
+            start = int(match.group(1))
+            end = min(int(match.group(2)), end) if match.group(2) else end
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status = 206
+        body = data[start:end + 1]
+        self.send_response(status)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        self.end_headers()
+        if budget is not None:
+            with server.lock:
+                allowed = min(len(body), server.budget)
+                server.budget -= allowed
+            if allowed < len(body):
+                self.wfile.write(body[:allowed])
+                self.close_connection = True
+                return
+        self.wfile.write(body)
+
+
+class _Server(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # los cortes provocados dejan sockets rotos a propósito
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.delenv("KCMC_MIRROR", raising=False)
+    monkeypatch.setattr(http_client, "_backoff", lambda attempt: 0)
+    monkeypatch.setattr(http_client, "MIN_SEGMENT_BYTES", 64 * 1024)
+    httpd = _Server(("127.0.0.1", 0), _Handler)
+    httpd.lock = threading.Lock()
+    httpd.requests = []
+    httpd.budget = None
+    httpd.data = os.urandom(SIZE)
+    httpd.etag = ETAG
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}/paper.jar"
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+    http_client._pool.close_all()
+
+
+def _sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _requested_bytes(requests) -> int:
+    total = 0
+    for headers in requests:
+        match = re.match(r"bytes=(\d+)-(\d*)$", headers.get("Range", ""))
+        if not match:
+            total += SIZE
+        else:
+            end = int(match.group(2)) if match.group(2) else SIZE - 1
+            total += min(end, SIZE - 1) - int(match.group(1)) + 1
+    return total
+
+
+def _interrupt(server, run):
+    """Corta la red a mitad de archivo; después el servidor vuelve a servir todo."""
+    server.budget = SIZE // 2
+    with pytest.raises(http_client.HTTPError):
+        run()
+    server.budget = None
+    server.requests.clear()
+
+
+def _missing(dest: str) -> int:
+    """Bytes que el sidecar da por pendientes."""
+    with open(dest + http_client.SIDECAR_SUFFIX, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return sum(end + 1 - start - done for (start, end), done in zip(data["ranges"], data["progress"]))
+
+
+def _assert_resumed(server, dest: str, missing: int):
+    with open(dest, "rb") as f:
+        assert f.read() == server.data
+    # Tras la sonda solo se piden los rangos que faltaban
+    assert missing < SIZE
+    assert _requested_bytes(server.requests[1:]) == missing
+    assert not os.path.exists(dest + http_client.SEGMENTS_SUFFIX)
+    assert not os.path.exists(dest + http_client.SIDECAR_SUFFIX)
+
+
+def test_segmented_download_resumes_after_interruption(server, tmp_path):
+    dest = str(tmp_path / "paper.jar")
+    run = lambda: http_client.download(server.url, dest, retries=0, sha256=_sha(server.data))
+    _interrupt(server, run)
+    # El archivo preasignado no se confunde con el `.part` de un solo stream
+    assert not os.path.exists(dest)
+    assert not os.path.exists(dest + ".part")
+    missing = _missing(dest)
+
+    assert run() == dest
+    _assert_resumed(server, dest, missing)
+
+
+def test_segmented_resume_discards_progress_of_another_file(server, tmp_path):
+    dest = str(tmp_path / "paper.jar")
+    _interrupt(server, lambda: http_client.download(server.url, dest, retries=0))
+    server.data, server.etag = os.urandom(SIZE), '"v2"'
+
+    http_client.download(server.url, dest, retries=0, sha256=_sha(server.data))
+    with open(dest, "rb") as f:
+        assert f.read() == server.data
+
+
+def test_segmented_download_without_sidecar_starts_over(server, tmp_path):
+    dest = str(tmp_path / "paper.jar")
+    # Archivo preasignado de una ejecución matada antes de guardar ningún avance
+    with open(dest + http_client.SEGMENTS_SUFFIX, "wb") as f:
+        f.truncate(SIZE)
+    http_client.download(server.url, dest, retries=0, sha256=_sha(server.data))
+    with open(dest, "rb") as f:
+        assert f.read() == server.data
+
+
+def test_async_segmented_download_resumes(server, tmp_path):
+    dest = str(tmp_path / "paper.jar")
+    run = lambda: asyncio.run(http_client.download_async(server.url, dest, retries=0,
+                                                         sha256=_sha(server.data)))
+    _interrupt(server, run)
+    missing = _missing(dest)
+
+    assert run() == dest
+    _assert_resumed(server, dest, missing)
+
+
+def test_single_stream_resumes_with_range(server, tmp_path):
+    dest = str(tmp_path / "paper.jar")
+    run = lambda: http_client.download(server.url, dest, retries=0, segments=1)
+    _interrupt(server, run)
+    assert os.path.getsize(dest + ".part") == SIZE // 2
+
+    # El validador sobrevive al proceso: la reanudación lleva If-Range
+    assert os.path.exists(dest + ".part.json")
+    run()
+    with open(dest, "rb") as f:
+        assert f.read() == server.data
+    assert server.requests[0]["Range"] == f"bytes={SIZE // 2}-"
+    assert server.requests[0]["If-Range"] == ETAG
+    assert not os.path.exists(dest + ".part.json")
+
+
+def test_single_stream_resume_of_changed_file_starts_over(server, tmp_path):
+    dest = str(tmp_path / "paper.jar")
+    run = lambda: http_client.download(server.url, dest, retries=0, segments=1)
+    _interrupt(server, run)
+    server.data, server.etag = os.urandom(SIZE), '"v2"'
+
+    run()
+    with open(dest, "rb") as f:
+        assert f.read() == server.data
+
+
+def test_single_stream_part_without_validator_starts_over(server, tmp_path):
+    dest = str(tmp_path / "paper.jar")
+    # `.part` de una versión anterior sin sidecar: no se sabe de qué archivo es
+    with open(dest + ".part", "wb") as f:
+        f.write(os.urandom(SIZE // 2))
+
+    http_client.download(server.url, dest, retries=0, segments=1)
+    with open(dest, "rb") as f:
+        assert f.read() == server.data
+    assert "Range" not in server.requests[0]
+
+
+def test_async_pool_forgets_closed_loops(server, tmp_path):
+    dest = str(tmp_path / "paper.jar")
+
+    async def run():
+        await http_client.download_async(server.url, dest, segments=1)
+        return list(http_client._async_pool._idle.keys())
+
+    first = asyncio.run(run())
+    # asyncio.run cierra su loop: la siguiente llamada no arrastra sus conexiones
+    second = asyncio.run(run())
+    assert len(first) == 1 and first[0].is_closed()
+    assert first[0] not in second and len(second) == 1
@@ -0,0 +1,114 @@
+"""Pre-parcheo de Paperclip con un `java` falso que registra cómo se le llama."""
+
+import hashlib
+import os
+import stat
+import zipfile
+
+import pytest
+
+from src.core import paperclip
+
+# Escribe en versions/ el nombre del jar lanzado: cada build "parchea" otro contenido
+FAKE_JAVA = """#!/bin/sh
+echo "$PWD $@" >> "$CALLS"
+[ -n "$FAIL" ] && { echo "Error: patch failed"; exit 3; }
+mkdir -p versions/1.21.4 libraries/org/lib
+printf '%s' "$(basename "$3")" > versions/1.21.4/paper-1.21.4.jar
+printf 'lib' > libraries/org/lib/lib.jar
+"""
+
+
+def _sha(data: str) -> str:
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def _paperclip_jar(server_dir, name: str, patched: str = None) -> str:
+    path = os.path.join(str(server_dir), name)
+    with zipfile.ZipFile(path, "w") as jar:
+        jar.writestr("META-INF/versions.list",
+                     f"{_sha(patched or name)}\t1.21.4\t1.21.4/paper-1.21.4.jar\n")
+        jar.writestr("META-INF/libraries.list", f"{_sha('lib')}\torg:lib:1\torg/lib/lib.jar\n")
+        jar.writestr("io/papermc/paperclip/Main.class", "")
+    return path
+
+
+@pytest.fixture
+def java(tmp_path, monkeypatch):
+    path = tmp_path / "bin" / "java"
+    path.parent.mkdir()
+    path.write_text(FAKE_JAVA)
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("CALLS", str(tmp_path / "calls.log"))
+    monkeypatch.delenv("FAIL", raising=False)
+    return str(path)
+
+
+def _calls(tmp_path):
+    log = tmp_path / "calls.log"
+    return log.read_text().splitlines() if log.exists() else []
+
+
+@pytest.fixture
+def server_dir(tmp_path):
+    path = tmp_path / "server_bin"
+    path.mkdir()
+    return str(path)
+
+
+def test_prepatch_runs_patch_only_mode_and_marks_warm(tmp_path, server_dir, java):
+    jar = _paperclip_jar(server_dir, "paper-1.21.4-100.jar")
+    result = paperclip.prepatch(jar, server_dir, java=java)
+    assert result.ok, result.errors
+    assert result.files == 2
+    assert _calls(tmp_path) == [f"{server_dir} -Dpaperclip.patchonly=true -jar {jar}"]
+    assert paperclip.is_warm(jar, server_dir)
+    # Ya caliente: no se vuelve a lanzar java
+    assert paperclip.prepatch(jar, server_dir, java=java) is None
+    assert len(_calls(tmp_path)) == 1
+
+
+def test_not_paperclip(tmp_path, server_dir, java):
+    jar = os.path.join(server_dir, "velocity-3.4.0.jar")
+    with zipfile.ZipFile(jar, "w") as z:
+        z.writestr("com/velocitypowered/proxy/Velocity.class", "")
+    assert paperclip.prepatch(jar, server_dir, java=java) is None
+    assert _calls(tmp_path) == []
+
+
+def test_java_failure(server_dir, java, monkeypatch):
+    monkeypatch.setenv("FAIL", "1")
+    jar = _paperclip_jar(server_dir, "paper-1.21.4-100.jar")
+    result = paperclip.prepatch(jar, server_dir, java=java)
+    assert not result.ok
+    assert result.errors == ["java salió con código 3: Error: patch failed"]
+    assert not paperclip.is_warm(jar, server_dir)
+
+
+def test_verification_catches_wrong_output(server_dir, java):
+    jar = _paperclip_jar(server_dir, "paper-1.21.4-100.jar", patched="otro contenido")
+    result = paperclip.prepatch(jar, server_dir, java=java)
+    assert not result.ok
+    assert result.errors == [f"sha256 distinto en {os.path.join('versions', '1.21.4', 'paper-1.21.4.jar')}"]
+    assert not paperclip.is_warm(jar, server_dir)
+
+
+def test_patching_another_build_cools_the_previous_one(tmp_path, server_dir, java):
+    old = _paperclip_jar(server_dir, "paper-1.21.4-100.jar")
+    new = _paperclip_jar(server_dir, "paper-1.21.4-101.jar")
+    assert paperclip.prepatch(old, server_dir, java=java).ok
+    assert paperclip.prepatch(new, server_dir, java=java).ok
+    # versions/1.21.4/ ahora tiene el parche del 101: el 100 tendría que volver a parchear
+    assert paperclip.is_warm(new, server_dir)
+    assert not paperclip.is_warm(old, server_dir)
+
+
+def test_background_prepatch_and_wait_idle(tmp_path, server_dir, java):
+    jar = _paperclip_jar(server_dir, "paper-1.21.4-100.jar")
+    results = []
+    thread = paperclip.prepatch_in_background(jar, callback=results.append,
+                                              server_dir=server_dir, java=java)
+    paperclip.wait_idle(server_dir)
+    assert not paperclip.is_busy(server_dir)
+    thread.join()
+    assert [r.ok for r in results] == [True]
@@ -0,0 +1,98 @@
+"""Lectura de descriptores de plugin (plugin.yml, paper-plugin.yml...)."""
+
+import zipfile
+
+from src.core import plugin_index
+from src.core.plugin_index import parse_descriptor_yaml
+
+PLUGIN_YML = """\
+# Generado por el build
+name: 'Essentials'   # nombre visible
+version: "2.21.0 #beta"
+main: com.earth2me.essentials.Essentials
+api-version: 1.13
+description: |
+  Línea con clave: valor
+  name: NoEsElNombre
+depend: [Vault, 'LuckPerms']
+softdepend:
+- PlaceholderAPI
+- ProtocolLib # opcional
+loadbefore:
+  - EssentialsChat
+commands:
+  home:
+    aliases: [h]
+"""
+
+PAPER_PLUGIN_YML = """\
+name: Geyser
+version: 2.4
+main: org.geysermc.Geyser
+dependencies:
+  server:
+    floodgate:
+      load: AFTER
+      required: false
+    ViaVersion:
+      required: true
+"""
+
+
+def test_scalars_lists_and_comments():
+    data = parse_descriptor_yaml(PLUGIN_YML)
+    assert data["name"] == "Essentials"
+    # Un '#' dentro de comillas no es un comentario
+    assert data["version"] == "2.21.0 #beta"
+    assert data["api-version"] == "1.13"
+    assert data["depend"] == ["Vault", "LuckPerms"]
+    assert data["softdepend"] == ["PlaceholderAPI", "ProtocolLib"]
+    assert data["loadbefore"] == ["EssentialsChat"]
+    assert data["commands"] == {"home": {"aliases": ["h"]}}
+
+
+def test_block_scalars_are_skipped():
+    data = parse_descriptor_yaml(PLUGIN_YML)
+    assert "description" not in data
+    assert data["name"] == "Essentials"
+
+
+def test_crlf_and_nested_maps():
+    data = parse_descriptor_yaml(PAPER_PLUGIN_YML.replace("\n", "\r\n"))
+    assert data["main"] == "org.geysermc.Geyser"
+    assert data["dependencies"]["server"]["floodgate"] == {"load": "AFTER", "required": "false"}
+
+
+def _jar(path, files):
+    with zipfile.ZipFile(path, "w") as jar:
+        for name, text in files.items():
+            jar.writestr(name, text)
+    return str(path)
+
+
+def test_paper_dependencies(tmp_path):
+    kind, info = plugin_index.read_jar(_jar(tmp_path / "geyser.jar",
+                                            {"paper-plugin.yml": PAPER_PLUGIN_YML}))
+    assert kind == plugin_index.PLUGIN
+    assert info.platform == "paper"
+    assert info.depend == ["ViaVersion"]
+    assert info.softdepend == ["floodgate"]
+    assert info.loadbefore == ["floodgate"]
+
+
+def test_multi_platform_jar(tmp_path):
+    kind, info = plugin_index.read_jar(_jar(tmp_path / "viaversion.jar", {
+        "plugin.yml": "name: ViaVersion\nversion: 5.0\n",
+        "velocity-plugin.json": '{"id": "viaversion", "name": "ViaVersion"}',
+    }))
+    assert info.platform == "bukkit"
+    assert info.platforms == ["bukkit", "velocity"]
+
+
+def test_server_jars(tmp_path):
+    paper = _jar(tmp_path / "paper-1.21.4-100.jar", {"META-INF/versions.list": ""})
+    velocity = _jar(tmp_path / "velocity-3.4.0.jar", {"com/velocitypowered/proxy/Velocity.class": ""})
+    assert plugin_index.read_jar(paper) == (plugin_index.SERVER, None)
+    assert plugin_index.server_platform(paper) == "paper"
+    assert plugin_index.server_platform(velocity) == "velocity"
+    assert plugin_index.read_jar(str(tmp_path / "missing.jar")) == (plugin_index.OTHER, None)
@@ -0,0 +1,65 @@
+"""Manifiesto de builds: adopción de jars copiados a mano y poda."""
+
+import os
+import time
+
+import pytest
+
+from src.core import releases
+
+
+@pytest.fixture
+def server_dir(tmp_path):
+    return str(tmp_path)
+
+
+def _jar(server_dir: str, name: str, age: float) -> str:
+    path = os.path.join(server_dir, name)
+    with open(path, "w") as f:
+        f.write(name)  # no es un zip: ni Paperclip ni plugin, decide el nombre
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_first_load_adopts_newest_as_active(server_dir):
+    _jar(server_dir, "paper-1.21.4-100.jar", age=300)
+    _jar(server_dir, "paper-1.21.4-101.jar", age=200)
+    rel = releases.load(server_dir)
+    assert rel.active == "paper-1.21.4-101.jar"
+    assert rel.history == ["paper-1.21.4-100.jar"]
+
+
+def test_hand_placed_jar_is_staged_and_promoted(server_dir):
+    _jar(server_dir, "paper-1.21.4-100.jar", age=300)
+    releases.load(server_dir)
+    _jar(server_dir, "paper-1.21.4-120.jar", age=10)
+    assert releases.load(server_dir).staged == "paper-1.21.4-120.jar"
+    assert releases.promote(server_dir) == "paper-1.21.4-120.jar"
+    rel = releases.load(server_dir)
+    assert rel.active == "paper-1.21.4-120.jar"
+    assert rel.history == ["paper-1.21.4-100.jar"]
+
+
+def test_prune_keeps_builds_and_never_deletes_unregistered_jars(server_dir):
+    for build in (100, 110, 120):
+        _jar(server_dir, f"paper-1.21.4-{build}.jar", age=1000 - build)
+    releases.load(server_dir)
+    releases.stage(_jar(server_dir, "paper-1.21.4-130.jar", age=50))
+    releases.promote(server_dir, keep=2)
+    assert sorted(n for n in os.listdir(server_dir) if n.endswith(".jar")) == [
+        "paper-1.21.4-120.jar", "paper-1.21.4-130.jar"]
+
+    # Un jar viejo copiado a mano entra en el historial y la poda no lo toca
+    _jar(server_dir, "paper-1.21.4-90.jar", age=5000)
+    assert releases.prune(server_dir, keep=2) == []
+    assert os.path.exists(os.path.join(server_dir, "paper-1.21.4-90.jar"))
+
+
+def test_rollback_refuses_other_minecraft_version(server_dir):
+    _jar(server_dir, "paper-1.21.3-50.jar", age=300)
+    _jar(server_dir, "paper-1.21.4-100.jar", age=200)
+    releases.load(server_dir)
+    with pytest.raises(ValueError):
+        releases.rollback(server_dir)
+    assert releases.rollback(server_dir, force=True) == "paper-1.21.3-50.jar"
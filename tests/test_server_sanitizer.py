@@ -0,0 +1,66 @@
+"""Manifiesto de listados del escaneo de ServerSanitizer."""
+
+import json
+import os
+import time
+import zipfile
+
+import pytest
+
+from src.core.server_sanitizer import ServerSanitizer
+
+OLD = time.time() - 3600
+
+
+def _plugin(path: str, name: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with zipfile.ZipFile(path, "w") as jar:
+        jar.writestr("plugin.yml", f"name: {name}\nversion: 1.0\nmain: x.{name}\n")
+
+
+def _age(*dirs: str, mtime: float = OLD):
+    for path in dirs:
+        os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def server_dir(tmp_path):
+    server = str(tmp_path)
+    _plugin(os.path.join(server, "world", "datapacks", "Stray.jar"), "Stray")
+    _plugin(os.path.join(server, "world", "region", "Hidden.jar"), "Hidden")
+    _age(os.path.join(server, "world"), os.path.join(server, "world", "datapacks"))
+    return server
+
+
+def _deep(report):
+    return sorted(os.path.basename(i.file_path) for i in report.issues if i.issue_type == "misplaced_jar_deep")
+
+
+def test_scan_skips_pruned_dirs_and_saves_listings(server_dir):
+    assert _deep(ServerSanitizer(server_dir).scan()) == ["Stray.jar"]
+    with open(os.path.join(server_dir, ServerSanitizer.SCAN_MANIFEST), encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert manifest["world"]["dirs"] == ["datapacks"]
+    assert manifest[os.path.join("world", "datapacks")]["jars"] == ["Stray.jar"]
+
+
+def test_unchanged_dirs_reuse_the_listing(server_dir):
+    datapacks = os.path.join(server_dir, "world", "datapacks")
+    ServerSanitizer(server_dir).scan()
+    # Mismo mtime: el listado guardado manda (un stat en vez de leer el directorio)
+    _plugin(os.path.join(datapacks, "Second.jar"), "Second")
+    _age(datapacks)
+    assert _deep(ServerSanitizer(server_dir).scan()) == ["Stray.jar"]
+    # Con otro mtime se vuelve a listar
+    _age(datapacks, mtime=OLD + 1)
+    assert _deep(ServerSanitizer(server_dir).scan()) == ["Second.jar", "Stray.jar"]
+
+
+def test_recently_modified_dirs_are_not_cached(server_dir):
+    datapacks = os.path.join(server_dir, "world", "datapacks")
+    _age(datapacks, mtime=time.time())
+    ServerSanitizer(server_dir).scan()
+    with open(os.path.join(server_dir, ServerSanitizer.SCAN_MANIFEST), encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert os.path.join("world", "datapacks") not in manifest
+    assert "world" in manifest
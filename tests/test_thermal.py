@@ -0,0 +1,69 @@
+"""Lectura de sensores contra un árbol sysfs falso."""
+
+import os
+
+from src.core import thermal
+
+
+def _write(root, rel: str, text: str):
+    path = os.path.join(str(root), rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text + "\n")
+
+
+def _pi(root, throttled: str = None):
+    _write(root, "class/thermal/thermal_zone0/temp", "82500")
+    _write(root, "class/thermal/thermal_zone0/type", "cpu-thermal")
+    _write(root, "class/thermal/thermal_zone1/temp", "45000")
+    for cpu in ("cpu0", "cpu1"):
+        _write(root, f"devices/system/cpu/{cpu}/cpufreq/scaling_cur_freq", "600000")
+        _write(root, f"devices/system/cpu/{cpu}/cpufreq/cpuinfo_max_freq", "1500000")
+    if throttled is not None:
+        _write(root, "devices/platform/soc/soc:firmware/get_throttled", throttled)
+
+
+def test_reads_zones_and_frequencies(tmp_path):
+    _pi(tmp_path)
+    sensor = thermal.ThermalSensor(str(tmp_path))
+    assert sensor.available()
+    reading = sensor.read()
+    assert reading.zones == {"cpu-thermal": 82.5, "thermal_zone1": 45.0}
+    assert reading.temp_c == 82.5
+    assert reading.cpu_mhz == 600 and reading.cpu_max_mhz == 1500
+    assert reading.freq_ratio == 0.4
+    # Sin flags del firmware decide la temperatura con la CPU por debajo del máximo
+    assert reading.throttled_flags is None
+    assert reading.is_throttled
+    assert reading.cause() == "thermal throttling at 82°C"
+
+
+def test_firmware_flags(tmp_path):
+    _pi(tmp_path, throttled="0x50005")
+    reading = thermal.ThermalSensor(str(tmp_path)).read()
+    assert reading.throttled_flags == 0x50005
+    assert reading.under_voltage and reading.is_throttled
+    assert reading.cause() == "under-voltage throttling"
+    assert any("Bajo voltaje AHORA" in line for line in reading.describe())
+
+
+def test_past_events_are_not_current_throttling(tmp_path):
+    _pi(tmp_path, throttled="0x50000")
+    reading = thermal.ThermalSensor(str(tmp_path)).read()
+    assert not reading.is_throttled
+    assert "Hubo bajo voltaje desde el arranque." in reading.describe()
+
+
+def test_rpi_volt_hwmon_reports_under_voltage(tmp_path):
+    _pi(tmp_path)
+    _write(tmp_path, "class/hwmon/hwmon0/name", "rpi_volt")
+    _write(tmp_path, "class/hwmon/hwmon0/in0_lcrit_alarm", "1")
+    assert thermal.ThermalSensor(str(tmp_path)).read().throttled_flags == thermal.UNDER_VOLTAGE
+
+
+def test_empty_tree(tmp_path):
+    sensor = thermal.ThermalSensor(str(tmp_path))
+    assert not sensor.available()
+    reading = sensor.read()
+    assert reading.temp_c is None and reading.freq_ratio is None
+    assert not reading.is_throttled